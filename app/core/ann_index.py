@@ -0,0 +1,275 @@
+from array import array
+from pathlib import Path
+import numpy as np
+import json
+import logging
+import os
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows assigned to centroids per matrix multiply
+_ASSIGN_BLOCK = 65536
+
+def default_nlist(count):
+    """
+    Number of inverted lists for a corpus of count vectors (~2*sqrt(n))
+    """
+    return int(min(65536, max(16, 2 * np.sqrt(count))))
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over a LocalVectorStore
+    matrix. Vectors are clustered with spherical k-means; a query only scores
+    the rows in its nprobe closest lists, so with nlist ~ sqrt(n) the work per
+    query grows with sqrt(n) instead of n.
+
+    Tuning knobs:
+    - nprobe: lists scanned per query; higher means better recall, more latency
+    - nlist: lists to train (default ~2*sqrt(n)); more lists means smaller,
+      faster lists but needs a higher nprobe for the same recall
+    - retrain_growth: retrain once the corpus grows by this factor
+
+    Row -> list assignments live in a memory-mapped int32 file beside the
+    vectors; inserts are assigned to their nearest centroid and deletes just
+    clear the assignment, so neither needs a rebuild.
+
+    Retraining is split so it never blocks searches: begin_training()
+    starts recording inserts and deletes, fit() clusters and assigns a
+    snapshot of rows without touching the live index (run it in a
+    background thread), and install() swaps the result in, replaying the
+    changes recorded meanwhile. train() does all three inline, e.g. as an
+    offline step.
+    """
+    def __init__(self, directory, dimension, nprobe=8, nlist=None, min_train_size=4096,
+                 retrain_growth=4.0, kmeans_iterations=8, seed=0):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._assignments_path = self.directory / "ivf_assignments.i32"
+        self._centroids_path = self.directory / "ivf_centroids.npy"
+        self._meta_path = self.directory / "ivf_meta.json"
+        self._assignments = None
+        self._capacity = 0
+        self._lists = []
+        self._entries = 0
+        self._stale = 0
+        self._lock = threading.RLock()
+        # Inserted/deleted row arrays recorded between begin_training() and install()
+        self._pending = None
+
+        if self._centroids_path.exists() and self._meta_path.exists():
+            self.centroids = np.load(self._centroids_path)
+            with open(self._meta_path) as f:
+                self.trained_size = json.load(f)["trained_size"]
+            logger.info(f"Loaded IVF index with {len(self.centroids)} lists")
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    @property
+    def training(self):
+        return self._pending is not None
+
+    def resize(self, capacity):
+        """
+        Grow the assignment file to match the vector matrix capacity
+        """
+        with self._lock:
+            if capacity <= self._capacity:
+                return
+            if self._assignments is not None:
+                self._assignments.flush()
+                self._assignments = None
+            existing = self._assignments_path.stat().st_size // 4 if self._assignments_path.exists() else 0
+            with open(self._assignments_path, "ab") as f:
+                if capacity > existing:
+                    # Fill new rows with -1 (unassigned)
+                    f.write(np.full(capacity - existing, -1, dtype=np.int32).tobytes())
+            self._capacity = max(capacity, existing)
+            self._assignments = np.memmap(
+                self._assignments_path, dtype=np.int32, mode="r+", shape=(self._capacity,)
+            )
+
+    def load_lists(self, size):
+        """
+        Rebuild the in-memory inverted lists from the persisted assignments
+        """
+        with self._lock:
+            if not self.trained:
+                return
+            assignments = np.asarray(self._assignments[:size])
+            rows = np.flatnonzero(assignments >= 0)
+            self._lists = self._build_lists(rows, assignments[rows], len(self.centroids))
+            self._entries = len(rows)
+            self._stale = 0
+
+    @staticmethod
+    def _build_lists(rows, labels, nlist):
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=nlist)
+        lists = [array("q") for _ in range(nlist)]
+        for list_id, members in enumerate(np.split(rows[order], np.cumsum(counts)[:-1])):
+            lists[list_id].frombytes(members.astype(np.int64).tobytes())
+        return lists
+
+    def needs_training(self, live_count):
+        if live_count < self.min_train_size or self.training:
+            return False
+        return not self.trained or live_count >= self.trained_size * self.retrain_growth
+
+    def begin_training(self):
+        """Start recording inserts and deletes for install() to replay"""
+        with self._lock:
+            self._pending = []
+
+    def abort_training(self):
+        """Stop recording after a failed fit(); the current index stays live"""
+        with self._lock:
+            self._pending = None
+
+    def fit(self, matrix, rows):
+        """
+        Cluster the vectors at rows with spherical k-means and assign every
+        row to its nearest centroid. Reads only matrix, so it can run
+        alongside searches and writes. Returns a model for install().
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or default_nlist(len(rows))
+        nlist = min(nlist, len(rows))
+        sample_size = min(len(rows), max(nlist * 32, 10000))
+        sample = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        vectors = np.asarray(matrix[sample])
+        logger.info(f"Training IVF index: {nlist} lists from {sample_size} of {len(rows)} vectors")
+
+        centroids = vectors[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists from random sample points
+            sums[empty] = vectors[rng.choice(sample_size, size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        labels = np.concatenate([
+            np.argmax(np.asarray(matrix[rows[start:start + _ASSIGN_BLOCK]]) @ centroids.T, axis=1)
+            for start in range(0, len(rows), _ASSIGN_BLOCK)
+        ]).astype(np.int32) if len(rows) else np.empty(0, dtype=np.int32)
+        return {"centroids": centroids, "rows": rows, "labels": labels,
+                "lists": self._build_lists(rows, labels, nlist)}
+
+    def install(self, model, matrix):
+        """
+        Make a fitted model live: write its assignments, swap in its
+        centroids and lists, then re-assign rows inserted and clear rows
+        deleted since begin_training()
+        """
+        with self._lock:
+            assignments = np.full(self._capacity, -1, dtype=np.int32)
+            assignments[model["rows"]] = model["labels"]
+            tmp_path = self._assignments_path.with_suffix(".tmp")
+            assignments.tofile(tmp_path)
+            if self._assignments is not None:
+                self._assignments.flush()
+                self._assignments = None
+            os.replace(tmp_path, self._assignments_path)
+            self._assignments = np.memmap(
+                self._assignments_path, dtype=np.int32, mode="r+", shape=(self._capacity,)
+            )
+            self.centroids = model["centroids"]
+            self.trained_size = len(model["rows"])
+            self._lists = model["lists"]
+            self._entries = len(model["rows"])
+            self._stale = 0
+            pending, self._pending = self._pending or [], None
+            for kind, rows in pending:
+                if kind == "add":
+                    self.add(rows, np.asarray(matrix[rows]))
+                else:
+                    self.remove(rows)
+            np.save(self._centroids_path, self.centroids)
+            with open(self._meta_path, "w") as f:
+                json.dump({"trained_size": self.trained_size, "nlist": len(self.centroids)}, f)
+            self._assignments.flush()
+        logger.info(f"Installed IVF index: {len(self.centroids)} lists over {self.trained_size} vectors, "
+                    f"{len(pending)} writes replayed")
+
+    def train(self, matrix, rows):
+        """
+        Fit and install inline: cluster the vectors at rows and assign every row
+        """
+        self.begin_training()
+        self.install(self.fit(matrix, rows), matrix)
+
+    def add(self, rows, vectors):
+        """
+        Assign new or updated rows to their nearest list
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("add", rows))
+            if not self.trained:
+                return
+            labels = np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1)
+            previous = self._assignments[rows]
+            self._stale += int((previous >= 0).sum())
+            self._assignments[rows] = labels
+            order = np.argsort(labels, kind="stable")
+            sorted_labels = labels[order]
+            boundaries = np.flatnonzero(np.diff(sorted_labels)) + 1
+            for group in np.split(order, boundaries):
+                self._lists[int(labels[group[0]])].frombytes(rows[group].tobytes())
+            self._entries += len(rows)
+
+    def remove(self, rows):
+        """
+        Drop rows from the index; their list entries are skipped until compaction
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", rows))
+            if self._assignments is None:
+                return
+            self._stale += int((self._assignments[rows] >= 0).sum())
+            self._assignments[rows] = -1
+
+    def candidates(self, query, nprobe=None):
+        """
+        Rows in the nprobe lists closest to a (normalized) query vector
+        """
+        with self._lock:
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            scores = self.centroids @ query
+            probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+            # Views of the lists; concatenate copies them before add() can grow one
+            members = [np.frombuffer(self._lists[p], dtype=np.int64) for p in probes if len(self._lists[p])]
+            if not members:
+                return np.empty(0, dtype=np.int64)
+            rows = np.concatenate(members)
+            del members
+            # Skip entries left behind by updates and deletes
+            rows = np.unique(rows[np.isin(self._assignments[rows], probes)])
+            if self._stale > 0.2 * self._entries:
+                self.load_lists(self._capacity)
+            return rows
+
+    def flush(self):
+        with self._lock:
+            if self._assignments is not None:
+                self._assignments.flush()
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+import numpy as np
+import itertools
+import logging
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of generated answers, looked up by query embedding.
+    Entries are scoped to (namespace, document_id); a question hits when a
+    cached question in the same scope has cosine similarity >= threshold.
+    Entries expire after ttl seconds, the least recently used entries are
+    evicted beyond max_entries, and invalidate() drops a scope whenever the
+    vectors behind it change. Each invalidation also advances the scope's
+    generation, so an answer generated from chunks retrieved before it is
+    not stored afterwards.
+    """
+    def __init__(self, threshold=0.97, ttl=3600, max_entries=5000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_stores = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._entries = OrderedDict()  # entry id -> entry, in LRU order
+        self._scopes = {}  # scope -> {"ids": [...], "matrix": ndarray or None}
+        self._generations = {}  # namespace or scope -> invalidation count
+
+    @staticmethod
+    def scope(namespace, document_id=None):
+        return (namespace, document_id)
+
+    def generation(self, scope):
+        """
+        Capture before retrieval and pass to store(): it changes whenever
+        invalidate() touches the scope
+        """
+        with self._lock:
+            return (self._generations.get(scope[0], 0), self._generations.get(scope, 0))
+
+    def _scope_matrix(self, scope):
+        index = self._scopes[scope]
+        if index["matrix"] is None:
+            index["matrix"] = np.stack([self._entries[i]["embedding"] for i in index["ids"]])
+        return index["matrix"]
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        index = self._scopes[entry["scope"]]
+        index["ids"].remove(entry_id)
+        index["matrix"] = None
+        if not index["ids"]:
+            del self._scopes[entry["scope"]]
+
+    def lookup(self, scope, embedding):
+        """
+        Return the cached entry for the most similar question in scope, or None
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        now = time.time()
+        with self._lock:
+            if scope in self._scopes:
+                ids = self._scopes[scope]["ids"]
+                similarities = self._scope_matrix(scope) @ query
+                best = int(np.argmax(similarities))
+                entry_id = ids[best]
+                entry = self._entries[entry_id]
+                if entry["expires_at"] <= now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                elif similarities[best] >= self.threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return {**entry["value"], "similarity": round(float(similarities[best]), 4)}
+            self.misses += 1
+            return None
+
+    def store(self, scope, embedding, value, generation=None):
+        """
+        Cache value (answer, sources, ...) for a question embedding in scope.
+        With the generation captured before retrieval, the value is dropped
+        if the scope was invalidated since.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if generation is not None and generation != (self._generations.get(scope[0], 0),
+                                                         self._generations.get(scope, 0)):
+                self.stale_stores += 1
+                return False
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "scope": scope,
+                "embedding": vector,
+                "value": value,
+                "expires_at": time.time() + self.ttl
+            }
+            index = self._scopes.setdefault(scope, {"ids": [], "matrix": None})
+            index["ids"].append(entry_id)
+            index["matrix"] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, namespace, document_id=None):
+        """
+        Drop answers that may depend on changed vectors: every scope in the
+        namespace, or just the document's scope plus namespace-wide answers
+        """
+        with self._lock:
+            if document_id is None:
+                stale = [scope for scope in self._scopes if scope[0] == namespace]
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            else:
+                stale = [self.scope(namespace), self.scope(namespace, document_id)]
+                for scope in stale:
+                    self._generations[scope] = self._generations.get(scope, 0) + 1
+            for scope in stale:
+                for entry_id in list(self._scopes.get(scope, {"ids": []})["ids"]):
+                    self._remove(entry_id)
+                    self.invalidations += 1
+        if stale:
+            logger.info(f"Invalidated cached answers for namespace '{namespace}' document {document_id}")
+
+    def stats(self):
+        """
+        Return hit-rate and eviction counters
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_stores": self.stale_stores,
+        }
@@ -0,0 +1,257 @@
+from .query_manager import agenerate_answer, astream_answer
+from .context_packer import pack_context
+from .lexical_index import reciprocal_rank_fusion
+from .metrics import TOKENS, observe_stage, record_cache, record_usage
+from contextlib import contextmanager
+import asyncio
+import logging
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NO_ANSWER = "I'm sorry, I couldn't find any relevant information in the document. Please try rephrasing your question."
+
+class AskTimer:
+    """
+    Wall-clock time per stage of one /api/ask request; each stage is also
+    observed in the doctalk_stage_seconds histogram
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            observe_stage(name, elapsed)
+
+    def mark(self, name):
+        """Record the time elapsed since the request started, e.g. first token"""
+        if name not in self.stages:
+            self.stages[name] = time.perf_counter() - self.started_at
+            observe_stage(name, self.stages[name])
+
+    def to_dict(self):
+        timings = {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started_at) * 1000, 2)
+        return timings
+
+def retrieve(question, vectorstore, embeddings, timer, k=8, search_kwargs=None, embedding=None,
+             lexical_index=None):
+    """
+    Embed the question once (unless embedding is given) and run a single
+    vector search with that embedding. With a lexical_index, a BM25 search
+    over the same namespace/filter runs too and the two rankings are merged
+    by reciprocal rank fusion, so exact terms the embedding misses still
+    surface.
+    Returns (embedding, [(document, score), ...]).
+    """
+    if embedding is None:
+        with timer.stage("embed"):
+            embedding = embeddings.embed_query(question)
+    with timer.stage("retrieve"):
+        matches = vectorstore.similarity_search_by_vector_with_score(
+            embedding,
+            k=k,
+            **(search_kwargs or {})
+        )
+    if lexical_index is None:
+        return embedding, matches
+    with timer.stage("lexical"):
+        lexical_matches = lexical_index.search(
+            question,
+            k=k,
+            namespace=(search_kwargs or {}).get("namespace"),
+            filter=(search_kwargs or {}).get("filter")
+        )
+    return embedding, reciprocal_rank_fusion([matches, lexical_matches], k=k)
+
+def rerank(reranker, question, matches, timer):
+    """Rescore over-fetched matches; returns (matches, RerankStats)"""
+    with timer.stage("rerank"):
+        return reranker.rerank(question, matches)
+
+def describe_match(doc, score):
+    """
+    Compact, JSON-friendly description of a retrieved chunk
+    """
+    return {
+        "id": doc.id,
+        "source": doc.metadata.get("source"),
+        "chunk_id": doc.metadata.get("chunk_id"),
+        "score": round(float(score), 4)
+    }
+
+def record_packing(packing):
+    TOKENS.inc(packing.tokens_in, kind="context_in")
+    TOKENS.inc(packing.tokens_out, kind="context_out")
+
+def check_cache(question, embeddings, timer, answer_cache, cache_scope):
+    """
+    Embed the question and look it up in the semantic answer cache.
+    Returns (embedding, cached entry or None).
+    """
+    with timer.stage("embed"):
+        embedding = embeddings.embed_query(question)
+    if answer_cache is None:
+        return embedding, None
+    with timer.stage("cache"):
+        cached = answer_cache.lookup(cache_scope, embedding)
+    record_cache("answer", cached is not None)
+    return embedding, cached
+
+async def answer_question(question, vectorstore, embeddings, k=8, search_kwargs=None,
+                          answer_cache=None, cache_scope=None, run_blocking=asyncio.to_thread,
+                          lexical_index=None, session=None, reranker=None):
+    """
+    Embed, retrieve and generate an answer, each exactly once.
+    With a ConversationSession, a follow-up is first rewritten as a
+    standalone question (from the rolling summary and recent turns), which
+    is then used for the cache lookup, retrieval and the answer, and the
+    exchange is added to the session.
+    With a Reranker, reranker.candidates chunks are retrieved and only its
+    best top_n are kept.
+    A near-duplicate question found in answer_cache skips retrieval and the LLM.
+    Blocking embedding/search calls go through run_blocking (e.g. a WorkPool's
+    run); the LLM call is awaited directly.
+    Retrieved chunks are merged, deduplicated and fitted to the context
+    token budget before the LLM call.
+    Returns a dict with the answer, its sources, the retrieved documents,
+    reranking and context packing stats, the standalone question (with a
+    session) and a per-stage timing breakdown.
+    """
+    timer = AskTimer()
+    asked = question
+    if session is not None:
+        question = await session.standalone_question(question, timer)
+    standalone = question if session is not None else None
+    # Taken before retrieval: an ingest finishing during the LLM call must not let the answer be cached
+    generation = answer_cache.generation(cache_scope) if answer_cache is not None else None
+    embedding, cached = await run_blocking(check_cache, question, embeddings, timer, answer_cache, cache_scope)
+    if cached is not None:
+        timings = timer.to_dict()
+        logger.info(f"Answer cache hit (similarity {cached['similarity']}): {timings}")
+        if session is not None:
+            session.record_turn(asked, cached["answer"])
+        return {"answer": cached["answer"], "sources": cached["sources"], "documents": [],
+                "context": None, "rerank": None, "standalone_question": standalone,
+                "timings": timings, "cached": True}
+
+    _, matches = await run_blocking(retrieve, question, vectorstore, embeddings, timer,
+                                    k=reranker.candidates if reranker is not None else k,
+                                    search_kwargs=search_kwargs, embedding=embedding,
+                                    lexical_index=lexical_index)
+    reranking = None
+    if reranker is not None and matches:
+        matches, reranking = await run_blocking(rerank, reranker, question, matches, timer)
+    documents = [doc for doc, _ in matches]
+    sources = [describe_match(doc, score) for doc, score in matches]
+    logger.debug(f"Retrieved {len(documents)} relevant documents")
+
+    packing = None
+    if not documents:
+        answer = NO_ANSWER
+    else:
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, doc in enumerate(documents):
+                logger.debug(f"Document {i+1} content preview: {doc.page_content[:200]}...")
+        with timer.stage("pack"):
+            context, packing = pack_context(documents)
+        record_packing(packing)
+        with timer.stage("llm"):
+            answer = await agenerate_answer(question, context)
+        if answer_cache is not None:
+            answer_cache.store(cache_scope, embedding, {"answer": answer, "sources": sources}, generation)
+    if session is not None:
+        session.record_turn(asked, answer)
+
+    timings = timer.to_dict()
+    observe_stage("ask", time.perf_counter() - timer.started_at)
+    packing = packing.to_dict() if packing is not None else None
+    reranking = reranking.to_dict() if reranking is not None else None
+    logger.info(f"Ask timings: {timings}; context: {packing}; rerank: {reranking}")
+    return {"answer": answer, "sources": sources, "documents": documents, "context": packing,
+            "rerank": reranking, "standalone_question": standalone, "timings": timings, "cached": False}
+
+async def stream_answer_events(question, vectorstore, embeddings, k=8, search_kwargs=None,
+                               answer_cache=None, cache_scope=None, run_blocking=asyncio.to_thread,
+                               lexical_index=None, session=None, reranker=None):
+    """
+    Async generator of (event, data) pairs for a streamed answer:
+    "sources" with the retrieved chunks first, then one "token" per LLM chunk,
+    then "done" with token usage, reranking and context packing stats, the
+    standalone question and the timing breakdown (incl. first_token_ms).
+    A cached answer is sent as a single token event. A session is handled
+    as in answer_question; the exchange is recorded once the answer is
+    complete.
+    """
+    timer = AskTimer()
+    asked = question
+    if session is not None:
+        question = await session.standalone_question(question, timer)
+    standalone = question if session is not None else None
+    # Taken before retrieval: an ingest finishing during the LLM call must not let the answer be cached
+    generation = answer_cache.generation(cache_scope) if answer_cache is not None else None
+    embedding, cached = await run_blocking(
+        check_cache, question, embeddings, timer, answer_cache, cache_scope
+    )
+    if cached is not None:
+        yield "sources", cached["sources"]
+        timer.mark("first_token")
+        yield "token", {"text": cached["answer"]}
+        if session is not None:
+            session.record_turn(asked, cached["answer"])
+        yield "done", {"usage": None, "context": None, "rerank": None, "standalone_question": standalone,
+                       "timings": timer.to_dict(), "cached": True}
+        return
+
+    _, matches = await run_blocking(
+        retrieve, question, vectorstore, embeddings, timer, reranker.candidates if reranker is not None else k,
+        search_kwargs, embedding, lexical_index
+    )
+    reranking = None
+    if reranker is not None and matches:
+        matches, reranking = await run_blocking(rerank, reranker, question, matches, timer)
+    documents = [doc for doc, _ in matches]
+    sources = [describe_match(doc, score) for doc, score in matches]
+    yield "sources", sources
+
+    usage = None
+    packing = None
+    if not documents:
+        timer.mark("first_token")
+        yield "token", {"text": NO_ANSWER}
+        answer = NO_ANSWER
+    else:
+        with timer.stage("pack"):
+            context, packing = pack_context(documents)
+        record_packing(packing)
+        parts = []
+        with timer.stage("llm"):
+            async for chunk in astream_answer(question, context):
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+                if chunk.content:
+                    timer.mark("first_token")
+                    parts.append(chunk.content)
+                    yield "token", {"text": chunk.content}
+        record_usage(usage)
+        answer = "".join(parts)
+        if answer_cache is not None:
+            answer_cache.store(cache_scope, embedding, {"answer": answer, "sources": sources}, generation)
+    if session is not None:
+        session.record_turn(asked, answer)
+
+    timings = timer.to_dict()
+    observe_stage("ask_stream", time.perf_counter() - timer.started_at)
+    packing = packing.to_dict() if packing is not None else None
+    reranking = reranking.to_dict() if reranking is not None else None
+    logger.info(f"Streamed ask timings: {timings}; context: {packing}; rerank: {reranking}")
+    yield "done", {"usage": usage, "context": packing, "rerank": reranking, "standalone_question": standalone,
+                   "timings": timings, "cached": False}
@@ -0,0 +1,92 @@
+from .metrics import record_cache
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import logging
+import os
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AudioCache:
+    """
+    On-disk cache of synthesized audio, one file per (voice, model, text).
+    Files are named by the sha256 of the key; the LRU order is rebuilt from
+    file modification times on startup and kept in memory afterwards. Once
+    the files exceed max_bytes the least recently used ones are deleted.
+    """
+    def __init__(self, directory=".cache/tts", max_bytes=512 * 1024 * 1024, suffix=".mp3"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, in LRU order
+        self._bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob(f"*{suffix}"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._bytes += size
+        logger.info(f"Audio cache opened at {self.directory} with {len(self._entries)} clips")
+
+    def _name(self, voice_id, model_id, text):
+        key = "\0".join((voice_id, model_id, " ".join(text.split())))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + self.suffix
+
+    def get(self, voice_id, model_id, text):
+        """
+        Return the cached audio bytes, or None
+        """
+        name = self._name(voice_id, model_id, text)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                record_cache("tts", False)
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        record_cache("tts", True)
+        path = self.directory / name
+        try:
+            os.utime(path)
+            return path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._bytes -= self._entries.pop(name, 0)
+            return None
+
+    def put(self, voice_id, model_id, text, audio):
+        """
+        Store audio bytes, evicting least recently used clips past max_bytes
+        """
+        name = self._name(voice_id, model_id, text)
+        path = self.directory / name
+        # Write to a temp name first so readers never see a partial file
+        partial = path.with_suffix(f".{threading.get_ident()}.part")
+        partial.write_bytes(audio)
+        os.replace(partial, path)
+        with self._lock:
+            self._bytes += len(audio) - self._entries.pop(name, 0)
+            self._entries[name] = len(audio)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                (self.directory / evicted).unlink(missing_ok=True)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "clips": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+        }
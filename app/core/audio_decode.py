@@ -0,0 +1,145 @@
+from math import gcd
+import numpy as np
+import logging
+import os
+import struct
+import subprocess
+import tempfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_RAW_SUFFIXES = {".pcm", ".raw"}
+# Containers ffmpeg cannot always read from a pipe (index at the end of the file)
+_SEEKABLE_SUFFIXES = {".m4a", ".mp4", ".mov", ".3gp"}
+
+def _parse_wav(data):
+    """
+    Walk the RIFF chunks of a WAV file held in memory.
+    Returns (format tag, channels, sample rate, bits per sample, memoryview of the samples).
+    """
+    view = memoryview(data)
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            format_tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The real format is the first two bytes of the sub-format GUID
+                format_tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (format_tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streamed WAVs may carry a placeholder size; clamp to what arrived
+            end = min(body + chunk_size, len(data))
+            return (*fmt, view[body:end])
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+def _to_float32(samples, format_tag, bits):
+    """
+    Convert raw little-endian samples to float32 in [-1, 1] without copying
+    more than once
+    """
+    width = bits // 8
+    samples = samples[:len(samples) - len(samples) % width]
+    if format_tag == _WAVE_FORMAT_IEEE_FLOAT:
+        if bits == 32:
+            return np.frombuffer(samples, dtype="<f4").astype(np.float32, copy=False)
+        if bits == 64:
+            return np.frombuffer(samples, dtype="<f8").astype(np.float32)
+    elif format_tag == _WAVE_FORMAT_PCM:
+        if bits == 8:
+            return (np.frombuffer(samples, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        if bits == 16:
+            return np.frombuffer(samples, dtype="<i2").astype(np.float32) / 32768.0
+        if bits == 24:
+            raw = np.frombuffer(samples, dtype=np.uint8).reshape(-1, 3)
+            # Place the three bytes in the top of an int32 so the sign carries over
+            padded = np.zeros((len(raw), 4), dtype=np.uint8)
+            padded[:, 1:] = raw
+            return padded.view("<i4").ravel().astype(np.float32) / 2147483648.0
+        if bits == 32:
+            return np.frombuffer(samples, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise ValueError(f"Unsupported WAV encoding: format {format_tag}, {bits} bits")
+
+def resample(audio, rate, target_rate=SAMPLE_RATE):
+    """
+    Polyphase resampling of a float32 signal to target_rate
+    """
+    if rate == target_rate:
+        return audio
+    from scipy.signal import resample_poly
+
+    divisor = gcd(int(rate), int(target_rate))
+    return resample_poly(audio, target_rate // divisor, int(rate) // divisor).astype(np.float32, copy=False)
+
+def decode_wav(data):
+    """
+    Decode WAV bytes to 16 kHz mono float32, entirely in memory
+    """
+    format_tag, channels, rate, bits, samples = _parse_wav(data)
+    audio = _to_float32(samples, format_tag, bits)
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+    return resample(audio, rate)
+
+def decode_pcm(data, rate=SAMPLE_RATE):
+    """
+    Decode headerless 16-bit little-endian mono PCM
+    """
+    return resample(_to_float32(memoryview(data), _WAVE_FORMAT_PCM, 16), rate)
+
+def _ffmpeg_command(source):
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"
+    ]
+
+def decode_with_ffmpeg(data, suffix=""):
+    """
+    Fallback for compressed formats: decode through ffmpeg, feeding the bytes
+    over stdin, or via a temp file for containers that need seeking
+    """
+    if suffix.lower() not in _SEEKABLE_SUFFIXES:
+        process = subprocess.run(_ffmpeg_command("pipe:0"), input=data, capture_output=True)
+        if process.returncode == 0 and process.stdout:
+            return decode_pcm(process.stdout)
+        logger.info(f"ffmpeg could not decode {suffix or 'audio'} from a pipe, retrying from a file")
+
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        process = subprocess.run(_ffmpeg_command(path), capture_output=True)
+    finally:
+        os.remove(path)
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {process.stderr.decode(errors='ignore')[-500:]}")
+    return decode_pcm(process.stdout)
+
+def decode_audio(data, suffix=""):
+    """
+    Decode uploaded audio bytes to the 16 kHz mono float32 array Whisper takes.
+    WAV and raw 16 kHz PCM are decoded in memory; anything else goes through ffmpeg.
+    """
+    suffix = suffix.lower()
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return decode_wav(data)
+        except ValueError as e:
+            logger.info(f"In-memory WAV decode failed ({e}), falling back to ffmpeg")
+    elif suffix in _RAW_SUFFIXES:
+        return decode_pcm(data)
+    return decode_with_ffmpeg(data, suffix)
@@ -0,0 +1,243 @@
+from dataclasses import dataclass
+import logging
+import os
+import re
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# cl100k_base is the encoding of both text-embedding-ada-002 and gpt-4
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Separator extract_text_from_pdf puts between pages; char offsets index that text
+PAGE_SEPARATOR = "\n"
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\S+")
+_APPROX_PIECE = re.compile(r"\w+|[^\w\s]")
+
+class _ApproximateTokenizer:
+    """
+    Used when tiktoken or its encoding files are unavailable (e.g. offline):
+    one token per word or punctuation mark plus one per 8 characters of
+    long words, which roughly tracks cl100k_base on English prose
+    """
+    name = "approximate"
+
+    def count(self, text):
+        return sum(1 + len(piece) // 8 for piece in _APPROX_PIECE.findall(text))
+
+class _TiktokenTokenizer:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = encoding.name
+
+    def count(self, text):
+        return len(self.encoding.encode_ordinary(text))
+
+_tokenizer = None
+
+def get_tokenizer():
+    """
+    The shared token counter: tiktoken when it can load its encoding,
+    otherwise an approximation
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            import tiktoken
+            _tokenizer = _TiktokenTokenizer(tiktoken.get_encoding(TOKEN_ENCODING))
+        except Exception as e:
+            logger.warning(f"tiktoken encoding {TOKEN_ENCODING} unavailable ({e}); approximating token counts")
+            _tokenizer = _ApproximateTokenizer()
+    return _tokenizer
+
+def count_tokens(text):
+    return get_tokenizer().count(text)
+
+def truncate_tokens(text, tokens):
+    """The longest run of whole words from the start of text within tokens"""
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+def chunk_tokens_for_context(context_window, k, prompt_tokens=600, answer_tokens=1000):
+    """
+    Largest chunk size (in tokens) that lets k retrieved chunks plus the
+    prompt and the answer fit in the model's context window
+    """
+    return max(32, (context_window - prompt_tokens - answer_tokens) // k)
+
+@dataclass
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+    char_start: int
+    char_end: int
+    tokens: int
+
+    def metadata(self):
+        return {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+            "tokens": self.tokens,
+        }
+
+@dataclass
+class _Unit:
+    text: str
+    start: int  # document character offsets
+    end: int
+    page: int
+    tokens: int
+    heading: bool = False
+    page_first: bool = False
+
+def _is_heading(paragraph):
+    """
+    A short, single-line paragraph without closing punctuation
+    (extraction already splits headings off by font size)
+    """
+    return "\n" not in paragraph and len(paragraph) < 100 and not paragraph.rstrip().endswith((".", ",", ";", ":", "?", "!"))
+
+def _spans(pattern, text, offset):
+    """(piece, start, end) for the pieces of text between pattern matches"""
+    position = 0
+    for match in pattern.finditer(text):
+        if match.start() > position:
+            yield text[position:match.start()], offset + position, offset + match.start()
+        position = match.end()
+    if position < len(text):
+        yield text[position:], offset + position, offset + len(text)
+
+def _page_units(page_number, page_text, offset, max_tokens, tokenizer):
+    """
+    Split a page into paragraphs, and paragraphs longer than max_tokens into
+    sentences, then word runs; every unit fits in max_tokens
+    """
+    first = True
+    for paragraph, start, end in _spans(_PARAGRAPH_BREAK, page_text, offset):
+        stripped = paragraph.strip()
+        if not stripped:
+            continue
+        start += len(paragraph) - len(paragraph.lstrip())
+        end -= len(paragraph) - len(paragraph.rstrip())
+        tokens = tokenizer.count(stripped)
+        if tokens <= max_tokens:
+            yield _Unit(stripped, start, end, page_number, tokens, _is_heading(stripped), first)
+            first = False
+            continue
+        for sentence, s_start, s_end in _spans(_SENTENCE_END, stripped, start):
+            tokens = tokenizer.count(sentence)
+            if tokens <= max_tokens:
+                yield _Unit(sentence, s_start, s_end, page_number, tokens, False, first)
+                first = False
+                continue
+            # Overlong sentence: greedy runs of whole words
+            run_start = run_end = None
+            run_tokens = 0
+            for word in _WORD.finditer(sentence):
+                word_tokens = tokenizer.count(word.group()) + 1
+                if run_start is not None and run_tokens + word_tokens > max_tokens:
+                    yield _Unit(sentence[run_start:run_end], s_start + run_start, s_start + run_end,
+                                page_number, run_tokens, False, first)
+                    first = False
+                    run_start, run_tokens = None, 0
+                if run_start is None:
+                    run_start = word.start()
+                run_end = word.end()
+                run_tokens += word_tokens
+            if run_start is not None:
+                yield _Unit(sentence[run_start:run_end], s_start + run_start, s_start + run_end,
+                            page_number, run_tokens, False, first)
+                first = False
+
+def _join(units):
+    """Chunk text: a blank line between paragraphs, a space between sentences"""
+    parts = [units[0].text]
+    for previous, unit in zip(units, units[1:]):
+        parts.append("\n\n" if unit.page_first or unit.start - previous.end > 1 else " ")
+        parts.append(unit.text)
+    return "".join(parts)
+
+def iter_token_chunks(pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                      min_fill=0.5, align_pages=False, min_chars=50):
+    """
+    Single-pass, linear-time chunker over (page_number, page_text) pairs.
+    Paragraphs (then sentences, then word runs) are packed greedily into
+    chunks of at most chunk_tokens tokens. A heading or page break closes
+    the current chunk once it is at least min_fill full, so chunks follow
+    the document's structure; cuts forced by size carry up to overlap_tokens
+    of trailing units into the next chunk. With align_pages every page
+    starts a new chunk, so editing one page only changes that page's chunks.
+    Chunks record their pages and character offsets into the text
+    extract_text_from_pdf returns; chunks of min_chars or fewer are dropped
+    unless they are the only chunk.
+    """
+    tokenizer = get_tokenizer()
+    max_unit = max(1, chunk_tokens - overlap_tokens)
+    current = []
+    current_tokens = 0
+    offset = 0
+    pending_small = None
+    emitted = False
+
+    def make_chunk(units):
+        return Chunk(_join(units), units[0].page, units[-1].page, units[0].start, units[-1].end,
+                     sum(unit.tokens for unit in units))
+
+    def close(overlap):
+        nonlocal current, current_tokens
+        chunk = make_chunk(current)
+        carried = []
+        if overlap:
+            carried_tokens = 0
+            for unit in reversed(current[1:]):
+                if carried_tokens + unit.tokens > overlap_tokens:
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit.tokens
+        current = carried
+        current_tokens = sum(unit.tokens for unit in carried)
+        return chunk
+
+    def emit(chunk):
+        nonlocal pending_small, emitted
+        if len(chunk.text) > min_chars:
+            emitted = True
+            yield chunk
+        elif pending_small is None:
+            pending_small = chunk
+
+    for page_number, page_text in pages:
+        for unit in _page_units(page_number, page_text, offset, max_unit, tokenizer):
+            if current:
+                structural = unit.heading or unit.page_first
+                if (unit.page_first and align_pages) or (structural and current_tokens >= min_fill * chunk_tokens):
+                    yield from emit(close(overlap=False))
+                elif current_tokens + unit.tokens > chunk_tokens:
+                    yield from emit(close(overlap=not structural))
+                    # Drop carried units that would not leave room for this one
+                    while current and current_tokens + unit.tokens > chunk_tokens:
+                        current_tokens -= current.pop(0).tokens
+            current.append(unit)
+            current_tokens += unit.tokens
+        offset += len(page_text) + len(PAGE_SEPARATOR)
+
+    if current:
+        yield from emit(close(overlap=False))
+    if not emitted and pending_small is not None:
+        # Tiny document: keep its only chunk
+        yield pending_small
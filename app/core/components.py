@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ComponentUnavailable(Exception):
+    """
+    Raised when a component failed to initialize; the API turns this into a 503
+    """
+    def __init__(self, name, error):
+        super().__init__(f"Component '{name}' is unavailable: {error}")
+        self.name = name
+        self.error = error
+
+class Component:
+    """
+    A subsystem built on first use by factory(), so a slow or failing
+    dependency (Pinecone, Whisper, ElevenLabs) neither delays startup nor
+    takes the other components down. Concurrent first calls share one
+    initialization; a failed one is retried after retry_after seconds.
+    """
+    def __init__(self, name, factory, required=False, retry_after=30.0):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self.retry_after = retry_after
+        self.state = "idle"  # idle -> initializing -> ready | failed
+        self.error = None
+        self.init_seconds = None
+        self._value = None
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def get(self):
+        """
+        Return the component, initializing it (blocking) if needed
+        """
+        if self.state == "ready":
+            return self._value
+        with self._lock:
+            if self.state == "ready":
+                return self._value
+            if self.state == "failed" and time.monotonic() - self._failed_at < self.retry_after:
+                raise ComponentUnavailable(self.name, self.error)
+            self.state = "initializing"
+            start = time.perf_counter()
+            try:
+                self._value = self.factory()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+                logger.error(f"Error initializing {self.name}: {e}")
+                raise ComponentUnavailable(self.name, e) from e
+            self.init_seconds = time.perf_counter() - start
+            self.state = "ready"
+            self.error = None
+            logger.info(f"Initialized {self.name} in {self.init_seconds:.2f}s")
+            return self._value
+
+    async def aget(self):
+        """
+        Return the component without blocking the event loop on first use
+        """
+        if self.state == "ready":
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def peek(self):
+        """The component if it is already initialized, else None"""
+        return self._value if self.state == "ready" else None
+
+    def status(self):
+        return {
+            "state": self.state,
+            "required": self.required,
+            "init_seconds": round(self.init_seconds, 3) if self.init_seconds is not None else None,
+            "error": self.error,
+        }
+
+class ComponentRegistry:
+    """
+    The app's lazily built subsystems, with background warm-up and
+    per-component readiness reporting
+    """
+    def __init__(self):
+        self.components = {}
+
+    def register(self, name, factory, required=False):
+        self.components[name] = Component(name, factory, required=required)
+        return self.components[name]
+
+    def __getitem__(self, name):
+        return self.components[name]
+
+    def warm_up(self, names=None):
+        """
+        Initialize components in background threads, one per component, so
+        a slow one doesn't hold up the rest; failures are only recorded
+        """
+        def warm(component):
+            try:
+                component.get()
+            except ComponentUnavailable:
+                pass
+
+        names = list(self.components) if names is None else names
+        for name in names:
+            threading.Thread(target=warm, args=(self.components[name],), name=f"warm-{name}", daemon=True).start()
+        logger.info(f"Warming up: {', '.join(names)}")
+
+    def readiness(self):
+        """
+        Per-component status; ready when every required component is
+        """
+        statuses = {name: component.status() for name, component in self.components.items()}
+        ready = all(component.ready for component in self.components.values() if component.required)
+        return ready, statuses
@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import logging
+import os
+
+from .metrics import POOL_REJECTED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """
+    Raised when a pool is full; the API turns this into a 429 response
+    """
+    def __init__(self, pool_name, retry_after=1):
+        super().__init__(f"Server busy: too many pending '{pool_name}' requests")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+class _Admission:
+    """
+    Counts admitted work (running + queued) and rejects past the limit.
+    Only touched from the event loop thread, so no lock is needed.
+    """
+    def __init__(self, name, max_running, max_queue):
+        self.name = name
+        self.max_running = max_running
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def check(self):
+        """
+        Raise Overloaded if work would be rejected now, without admitting
+        any; lets a streaming endpoint answer 429 before its response starts
+        """
+        if self.pending >= self.max_running + self.max_queue:
+            self.rejected += 1
+            POOL_REJECTED.inc(pool=self.name)
+            logger.warning(f"Rejecting '{self.name}' work: {self.pending} pending")
+            raise Overloaded(self.name)
+
+    def admit(self):
+        self.check()
+        self.pending += 1
+
+    def release(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def stats(self):
+        return {
+            "max_running": self.max_running,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+class WorkPool(_Admission):
+    """
+    Bounded executor for one class of blocking work (model inference, sync
+    network clients, PDF parsing). At most max_workers calls run at once and
+    at most max_queue more wait; anything beyond that is shed with Overloaded
+    instead of queueing forever.
+    kind options: "thread", "process"
+    """
+    def __init__(self, name, max_workers, max_queue=None, kind="thread"):
+        super().__init__(name, max_workers, max_workers * 4 if max_queue is None else max_queue)
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the pool without blocking the event loop
+        """
+        self.admit()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class AsyncLimit(_Admission):
+    """
+    The same admission control for work that is already async (HTTP calls
+    made with an async client): a semaphore plus a bounded wait queue
+    """
+    def __init__(self, name, max_concurrency, max_queue=None):
+        super().__init__(name, max_concurrency, max_concurrency * 4 if max_queue is None else max_queue)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def slot(self):
+        """
+        Admit now (raising Overloaded when full) and return a context manager
+        that waits for a free slot; admitting eagerly lets a streaming endpoint
+        reject with 429 before its response starts
+        """
+        self.admit()
+        return self._hold()
+
+    @asynccontextmanager
+    async def _hold(self):
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.release()
+
+    def shutdown(self):
+        pass
+
+def _limit(name, setting, default):
+    return int(os.getenv(f"POOL_{name.upper()}_{setting}", str(default)))
+
+# name -> (kind, workers, queue)
+POOL_DEFAULTS = {
+    "ask": ("thread", 16, 64),         # embedding + vector search (blocking clients)
+    "ingest": ("thread", 2, 8),        # PDF ingestion jobs
+    "io": ("thread", 8, 32),           # misc blocking vector store calls
+    "tts": ("async", 8, 32),           # ElevenLabs requests
+}
+
+def create_pools():
+    """
+    Build every pool, with limits overridable via POOL_<NAME>_WORKERS / POOL_<NAME>_QUEUE
+    """
+    pools = {}
+    for name, (kind, workers, queue) in POOL_DEFAULTS.items():
+        workers = _limit(name, "WORKERS", workers)
+        queue = _limit(name, "QUEUE", queue)
+        if kind == "async":
+            pools[name] = AsyncLimit(name, workers, queue)
+        else:
+            pools[name] = WorkPool(name, workers, queue, kind=kind)
+    return pools
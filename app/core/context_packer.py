@@ -0,0 +1,180 @@
+from .chunker import count_tokens, truncate_tokens
+from langchain_core.documents import Document
+import logging
+import os
+import re
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2048"))
+# Share of a passage's word shingles found in a better-ranked one above
+# which it counts as a near-duplicate
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+
+_WORD = re.compile(r"\w+")
+_SHINGLE_WORDS = 3
+# Shared text shorter than this is not treated as chunk overlap
+_MIN_OVERLAP = 16
+
+class PackingStats:
+    """
+    What packing did to one request's context
+    """
+    def __init__(self):
+        self.chunks_in = 0
+        self.passages = 0
+        self.merged = 0
+        self.duplicates = 0
+        self.over_budget = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_in - self.tokens_out
+
+    def to_dict(self):
+        return {
+            "chunks_in": self.chunks_in,
+            "passages": self.passages,
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "over_budget": self.over_budget,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_saved,
+        }
+
+class _Passage:
+    """
+    A run of overlapping chunks from one document, ranked by its best chunk.
+    Chunks are joined only where their text verifiably overlaps: chunk_id
+    and char offsets come from the ingest run that wrote each chunk, and
+    incremental re-ingest keeps unchanged chunks from older runs, so
+    positions from different chunks are not comparable.
+    """
+    def __init__(self, doc, rank):
+        self.rank = rank
+        self.source = doc.metadata.get("source")
+        self.chunk_ids = [doc.metadata.get("chunk_id")]
+        self.page_start = doc.metadata.get("page_start")
+        self.page_end = doc.metadata.get("page_end")
+        self.text = doc.page_content
+
+    def join(self, doc, rank):
+        """Add doc at whichever end of the passage its text overlaps; False if neither does"""
+        overlap = _overlap(self.text, doc.page_content)
+        if overlap:
+            self.text = self.text + doc.page_content[overlap:]
+            self.chunk_ids.append(doc.metadata.get("chunk_id"))
+        else:
+            overlap = _overlap(doc.page_content, self.text)
+            if not overlap:
+                return False
+            self.text = doc.page_content + self.text[overlap:]
+            self.chunk_ids.insert(0, doc.metadata.get("chunk_id"))
+        self.rank = min(self.rank, rank)
+        page_start = doc.metadata.get("page_start")
+        if page_start is not None:
+            self.page_start = page_start if self.page_start is None else min(self.page_start, page_start)
+        if doc.metadata.get("page_end") is not None:
+            self.page_end = max(self.page_end or 0, doc.metadata["page_end"])
+        return True
+
+    def document(self, text=None):
+        metadata = {"source": self.source, "chunk_ids": self.chunk_ids}
+        if self.page_start is not None:
+            metadata.update(page_start=self.page_start, page_end=self.page_end)
+        return Document(page_content=self.text if text is None else text, metadata=metadata)
+
+def _overlap(previous, following):
+    """
+    Length of the longest suffix of previous that is also a prefix of
+    following (the text two overlapping chunks share), or 0 if shorter
+    than _MIN_OVERLAP
+    """
+    probe = following[:_MIN_OVERLAP]
+    if len(probe) < _MIN_OVERLAP:
+        return 0
+    position = previous.find(probe, max(0, len(previous) - len(following)))
+    while position != -1:
+        length = len(previous) - position
+        if following.startswith(previous[position:]):
+            return length
+        position = previous.find(probe, position + 1)
+    return 0
+
+def _position(doc):
+    """
+    Sort key for a document's chunks: char offset when known, else chunk_id.
+    Only an ordering hint for finding overlaps; join checks the text.
+    """
+    char_start = doc.metadata.get("char_start")
+    chunk_id = doc.metadata.get("chunk_id")
+    return (char_start if char_start is not None else -1, chunk_id if isinstance(chunk_id, int) else -1)
+
+def _shingles(text):
+    words = _WORD.findall(text.lower())
+    if len(words) < _SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+
+def pack_context(documents, token_budget=CONTEXT_TOKEN_BUDGET,
+                 duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD):
+    """
+    Turn retrieved chunks (best first) into the documents the prompt is
+    built from:
+    - chunks from one source whose text overlaps (a suffix of one is a
+      prefix of the other) are merged into one passage, and the text they
+      share is kept once
+    - passages whose word shingles are mostly contained in a better-ranked
+      passage are dropped
+    - passages are added best first while they fit in token_budget; the
+      best one is truncated rather than dropped
+    Returns (documents, PackingStats).
+    """
+    stats = PackingStats()
+    stats.chunks_in = len(documents)
+    stats.tokens_in = sum(count_tokens(doc.page_content) for doc in documents)
+
+    by_source = {}
+    for rank, doc in enumerate(documents):
+        by_source.setdefault(doc.metadata.get("source"), []).append((rank, doc))
+    passages = []
+    for chunks in by_source.values():
+        chunks.sort(key=lambda item: _position(item[1]))
+        source_passages = []
+        for rank, doc in chunks:
+            if any(passage.join(doc, rank) for passage in source_passages):
+                stats.merged += 1
+            else:
+                source_passages.append(_Passage(doc, rank))
+        passages.extend(source_passages)
+    passages.sort(key=lambda passage: passage.rank)
+
+    kept = []
+    kept_shingles = []
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        if any(len(shingles & other) >= duplicate_threshold * len(shingles) for other in kept_shingles):
+            stats.duplicates += 1
+            continue
+        kept.append(passage)
+        kept_shingles.append(shingles)
+
+    packed = []
+    for passage in kept:
+        tokens = count_tokens(passage.text)
+        remaining = token_budget - stats.tokens_out
+        if tokens <= remaining:
+            packed.append(passage.document())
+            stats.tokens_out += tokens
+        elif not packed:
+            text = truncate_tokens(passage.text, remaining)
+            packed.append(passage.document(text))
+            stats.tokens_out += count_tokens(text)
+        else:
+            stats.over_budget += 1
+    stats.passages = len(packed)
+    return packed, stats
@@ -0,0 +1,296 @@
+from .chunker import count_tokens, truncate_tokens
+from .manifest import normalize_text
+from .metrics import record_cache
+from .query_manager import acondense_question, asummarize_turns
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exchanges kept verbatim; older ones are folded into the rolling summary
+SESSION_RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "3"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "256"))
+# Answers are kept in the history truncated to this many tokens
+SESSION_ANSWER_TOKENS = int(os.getenv("SESSION_ANSWER_TOKENS", "200"))
+SESSION_MEMORY_MB = float(os.getenv("SESSION_MEMORY_MB", "64"))
+# Sessions evicted from memory are written here; empty disables spilling
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", ".cache/sessions")
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+
+# Condensed questions remembered per session
+_MAX_CONDENSED = 16
+# Rough per-session bookkeeping cost on top of the text it holds
+_SESSION_OVERHEAD_BYTES = 512
+
+class ConversationSession:
+    """
+    Server-side history of one conversation: a rolling summary of older
+    exchanges plus the last few (question, answer) turns verbatim, so the
+    condense prompt stays about the same size however long the
+    conversation runs. Standalone rewrites of follow-up questions are
+    cached per history version, so retrying a question whose ask failed
+    before its turn was recorded reuses the rewrite.
+    """
+    def __init__(self, key, summary="", turns=None, condensed=None, version=0, updated_at=None):
+        self.key = key
+        self.summary = summary
+        self.turns = turns or []
+        self.condensed = condensed or {}  # "version:normalized question" -> standalone question
+        self.version = version
+        self.updated_at = updated_at or time.time()
+        self.store = None
+        self._lock = None
+
+    @property
+    def lock(self):
+        """Serializes summarization for this session (created on first use, not persisted)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def size(self):
+        text = self.summary + "".join(question + answer for question, answer in self.turns)
+        text += "".join(key + value for key, value in self.condensed.items())
+        return len(text.encode("utf-8")) + _SESSION_OVERHEAD_BYTES
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "summary": self.summary,
+            "turns": self.turns,
+            "condensed": self.condensed,
+            "version": self.version,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["key"], data["summary"], [tuple(turn) for turn in data["turns"]],
+                   data["condensed"], data["version"], data["updated_at"])
+
+    def describe(self):
+        return {
+            "turns": self.version,
+            "recent_turns": len(self.turns),
+            "summary": self.summary,
+            "summary_tokens": count_tokens(self.summary) if self.summary else 0,
+            "updated_at": self.updated_at,
+        }
+
+    async def standalone_question(self, question, timer):
+        """
+        The question to retrieve and answer with: the question itself on the
+        first turn, otherwise an LLM rewrite that folds in what the
+        follow-up refers to (cached until the history changes)
+        """
+        if not self.turns and not self.summary:
+            return question
+        # Keyed by the history the rewrite was made against, which a
+        # concurrent turn may change while the LLM call is in flight
+        version = self.version
+        cache_key = f"{version}:{normalize_text(question).lower()}"
+        standalone = self.condensed.get(cache_key)
+        record_cache("condense", standalone is not None)
+        if standalone is not None:
+            return standalone
+        with timer.stage("condense"):
+            standalone = await acondense_question(question, self.summary, self.turns)
+        if version == self.version:
+            self.condensed[cache_key] = standalone
+            for stale in list(self.condensed)[:-_MAX_CONDENSED]:
+                del self.condensed[stale]
+        logger.debug(f"Condensed follow-up {question!r} to {standalone!r}")
+        if self.store is not None:
+            self.store.touch(self)
+        return standalone
+
+    def record_turn(self, question, answer):
+        """
+        Append an exchange; once more than recent_turns are held, the
+        oldest are summarized in the background
+        """
+        answer_tokens = self.store.answer_tokens if self.store is not None else SESSION_ANSWER_TOKENS
+        self.turns.append((question, truncate_tokens(answer, answer_tokens)))
+        self.version += 1
+        # Rewrites were made against the old history and can no longer hit
+        self.condensed = {}
+        if self.store is not None:
+            self.store.touch(self)
+            if len(self.turns) > self.store.recent_turns:
+                self.store.compact_later(self)
+
+    async def compact(self, recent_turns, summary_tokens):
+        """Fold all but the last recent_turns exchanges into the summary"""
+        async with self.lock:
+            folded = self.turns[:-recent_turns] if recent_turns else list(self.turns)
+            if not folded:
+                return
+            start = time.perf_counter()
+            summary = await asummarize_turns(self.summary, folded, max_words=summary_tokens * 3 // 4)
+            # Turns are only ever appended, so the folded ones are still first
+            self.summary = truncate_tokens(summary, summary_tokens)
+            self.turns = self.turns[len(folded):]
+            logger.debug(
+                f"Summarized {len(folded)} turns of session {self.key[:12]} in {time.perf_counter() - start:.2f}s"
+            )
+
+class SessionStore:
+    """
+    Conversation sessions keyed by (namespace, session_id) in an LRU bounded
+    by max_bytes of held text. Evicted sessions are written to spill_dir (one
+    JSON file each) and read back on their next turn; sessions idle for
+    longer than ttl seconds are dropped.
+    """
+    def __init__(self, max_bytes=int(SESSION_MEMORY_MB * 1024 * 1024), spill_dir=SESSION_SPILL_DIR,
+                 ttl=SESSION_TTL, recent_turns=SESSION_RECENT_TURNS, summary_tokens=SESSION_SUMMARY_TOKENS,
+                 answer_tokens=SESSION_ANSWER_TOKENS):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.ttl = ttl
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.answer_tokens = answer_tokens
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+        self.restored = 0
+        self._sessions = OrderedDict()  # key -> session, in LRU order
+        self._sizes = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_spilled()
+
+    @staticmethod
+    def _key(namespace, session_id):
+        return hashlib.sha256(f"{namespace}\0{session_id}".encode("utf-8")).hexdigest()
+
+    def _spill_path(self, key):
+        return self.spill_dir / f"{key}.json"
+
+    def _prune_spilled(self):
+        cutoff = time.time() - self.ttl
+        for path in self.spill_dir.glob("*.json"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+    def _spill(self, session):
+        if self.spill_dir is None:
+            return
+        path = self._spill_path(session.key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(session.to_dict(), f)
+        os.replace(tmp_path, path)
+        self.spilled += 1
+
+    def _restore(self, key):
+        if self.spill_dir is None:
+            return None
+        path = self._spill_path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path) as f:
+                session = ConversationSession.from_dict(json.load(f))
+        except Exception as e:
+            logger.error(f"Error reading spilled session {key[:12]}: {e}")
+            return None
+        finally:
+            path.unlink(missing_ok=True)
+        self.restored += 1
+        return session
+
+    def touch(self, session):
+        """Mark session most recently used and account for its new size"""
+        session.updated_at = time.time()
+        size = session.size()
+        evicted = []
+        with self._lock:
+            self.bytes += size - self._sizes.get(session.key, 0)
+            self._sizes[session.key] = size
+            self._sessions[session.key] = session
+            self._sessions.move_to_end(session.key)
+            while self.bytes > self.max_bytes and len(self._sessions) > 1:
+                key, old = self._sessions.popitem(last=False)
+                self.bytes -= self._sizes.pop(key)
+                evicted.append(old)
+        for old in evicted:
+            self._spill(old)
+
+    def get(self, namespace, session_id):
+        """The session for (namespace, session_id), created empty if unknown or expired"""
+        key = self._key(namespace, session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is None:
+            session = self._restore(key)
+        if session is not None and time.time() - session.updated_at > self.ttl:
+            self.delete(namespace, session_id)
+            session = None
+        if session is None:
+            self.misses += 1
+            session = ConversationSession(key)
+        else:
+            self.hits += 1
+        session.store = self
+        self.touch(session)
+        return session
+
+    def peek(self, namespace, session_id):
+        """The session if it exists, without creating or restoring it"""
+        key = self._key(namespace, session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is None and self.spill_dir is not None and self._spill_path(key).exists():
+            return self.get(namespace, session_id)
+        return session
+
+    def delete(self, namespace, session_id):
+        key = self._key(namespace, session_id)
+        with self._lock:
+            session = self._sessions.pop(key, None)
+            if session is not None:
+                self.bytes -= self._sizes.pop(key)
+        if self.spill_dir is not None:
+            self._spill_path(key).unlink(missing_ok=True)
+        return session is not None
+
+    def compact_later(self, session):
+        """Summarize old turns on the running event loop, off the request path"""
+        task = asyncio.get_running_loop().create_task(self._compact(session))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session):
+        try:
+            await session.compact(self.recent_turns, self.summary_tokens)
+        except Exception as e:
+            # The turns stay verbatim and are folded on the next attempt
+            logger.error(f"Error summarizing session {session.key[:12]}: {e}")
+            return
+        self.touch(session)
+
+    def stats(self):
+        with self._lock:
+            sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "spilled": self.spilled,
+            "restored": self.restored,
+            "summarizing": len(self._tasks),
+        }
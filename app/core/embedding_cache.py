@@ -0,0 +1,176 @@
+from langchain_core.embeddings import Embeddings
+from .manifest import normalize_text
+from .metrics import record_cache
+from array import array
+from pathlib import Path
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+# Hit recency is buffered and written with the next insert, or once this many
+# keys or seconds have accumulated, so a cache hit costs no commit
+_TOUCH_BATCH = 1000
+_TOUCH_INTERVAL = 30.0
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent, content-addressed cache in front of another Embeddings object.
+    Vectors are keyed by (model, sha256 of the normalized text) and stored in
+    SQLite; once the cache holds more than max_entries vectors the least
+    recently used ones are evicted. Recency from hits is buffered in memory
+    and written in batches; losing it on a crash only makes eviction less
+    precise.
+    """
+    def __init__(self, embeddings, model_name, db_path=".cache/embeddings.sqlite3", max_entries=200000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last hit time, not yet written
+        self._touches_written_at = time.monotonic()
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"Embedding cache opened at {self.db_path} with {self._size} entries")
+        except Exception as e:
+            logger.error(f"Error opening embedding cache: {e}")
+            raise
+
+    def _key(self, text):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _lookup(self, keys):
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        return found
+
+    def _write_touches(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touches_written_at = time.monotonic()
+
+    def _store(self, hit_keys, new_vectors):
+        now = time.time()
+        self._touched.update(dict.fromkeys(hit_keys, now))
+        write = (bool(new_vectors) or len(self._touched) >= _TOUCH_BATCH
+                 or time.monotonic() - self._touches_written_at >= _TOUCH_INTERVAL)
+        if new_vectors:
+            # Another thread may have stored the same text since the lookup;
+            # rowcount only counts the rows actually inserted
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in new_vectors.items()]
+            )
+            self._size += cursor.rowcount
+        if not write and self._size <= self.max_entries:
+            return
+        self._write_touches()
+        if self._size > self.max_entries:
+            evict = self._size - self.max_entries
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (evict,)
+            )
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"Evicted {evict} entries from embedding cache")
+        self._conn.commit()
+
+    def embed_documents(self, texts):
+        """
+        Embed texts, calling the wrapped model only for cache misses
+        """
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            cached = self._lookup(list(set(keys)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        new_vectors = {}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), vectors))
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            self._store(list(cached.keys()), new_vectors)
+
+        record_cache("embedding", True, len(texts) - len(missing))
+        record_cache("embedding", False, len(missing))
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        return [cached[key] if key in cached else new_vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        """
+        Embed a single query through the cache
+        """
+        key = self._key(text)
+        with self._lock:
+            cached = self._lookup([key])
+        if key in cached:
+            vector = cached[key]
+            with self._lock:
+                self.hits += 1
+                self._store([key], {})
+            record_cache("embedding", True)
+            return vector
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self.misses += 1
+            self._store([], {key: vector})
+        record_cache("embedding", False)
+        return vector
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current cache size
+        """
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
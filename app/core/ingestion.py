@@ -0,0 +1,271 @@
+from .pdf_processor import iter_pdf_pages, iter_chunks
+from .manifest import chunk_vector_id
+from .chunker import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from .upsert_engine import UpsertFailed
+from .metrics import ITEMS, TOKENS, observe_stage
+from .ocr import OcrStats
+from langchain_core.documents import Document
+import logging
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IngestionStats:
+    """
+    Counters and per-stage timings for one ingestion run
+    """
+    def __init__(self):
+        self.pages = 0
+        self.characters = 0
+        self.chunks = 0
+        self.vectors = 0
+        self.unchanged = 0
+        self.lexical_backfilled = 0
+        self.deleted = 0
+        self.extract_seconds = 0.0
+        self.chunk_seconds = 0.0
+        self.upsert_seconds = 0.0
+        self.ocr = OcrStats()
+        self.started_at = time.perf_counter()
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def _rate(count, seconds):
+        return round(count / seconds, 2) if seconds > 0 else None
+
+    def to_dict(self):
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "vectors": self.vectors,
+            "unchanged": self.unchanged,
+            "lexical_backfilled": self.lexical_backfilled,
+            "deleted": self.deleted,
+            "pages_per_second": self._rate(self.pages, self.extract_seconds),
+            "ocr_pages": self.ocr.pages,
+            "ocr_cached_pages": self.ocr.cached,
+            "ocr_pages_per_second": self._rate(self.ocr.pages, self.ocr.wall_seconds),
+            "chunks_per_second": self._rate(self.chunks, self.chunk_seconds),
+            "vectors_per_second": self._rate(self.vectors, self.upsert_seconds),
+            "total_seconds": round(self.total_seconds, 3),
+        }
+
+def _timed(iterable, on_elapsed):
+    """
+    Re-yield items from iterable, reporting the time spent producing each one
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            on_elapsed(time.perf_counter() - start)
+            return
+        on_elapsed(time.perf_counter() - start)
+        yield item
+
+def ingest_pdf(pdf_path, vectorstore, source, batch_size=64, max_workers=None,
+               chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, before_upsert=None,
+               manifests=None, delete_ids=None, namespace="", lexical_index=None, create_upserter=None,
+               on_progress=None):
+    """
+    Stream a PDF through extraction, chunking and embedding/upsert.
+    Pages are extracted (or OCRed, for scans) in a process pool, fed into the chunker as they
+    arrive, and chunks are upserted in batches of batch_size, so peak memory
+    is bounded by the batch rather than the document.
+    before_upsert is called once, right before the first batch is stored.
+
+    With a ManifestStore in manifests, ingestion is incremental: chunks get
+    content-hash IDs, chunks the source already owns are skipped, and IDs
+    that vanished from the source are removed through delete_ids. Chunks are
+    page-aligned in this mode so an edit only re-chunks the pages it touches.
+    Vectors are written to the given namespace, and each stored batch is
+    also added to lexical_index when one is given. Unchanged chunks missing
+    from lexical_index (ingested before it existed, or after it was reset)
+    are added to it too, without re-embedding them.
+
+    create_upserter(on_stored=...) (e.g. PineconeManager.upserter) hands
+    batches to a background UpsertEngine instead of storing them inline, so
+    embedding and upserts run concurrently with extraction and retry on
+    transient errors. Chunks stored before a permanent failure are kept in
+    the manifest, so the next upload only sends the rest.
+
+    on_progress(stats) is called with the running IngestionStats after each
+    stored batch.
+    """
+    stats = IngestionStats()
+    manifest = manifests.load(source, namespace) if manifests is not None else None
+    previous_ids = set(manifest["ids"]) if manifest else set()
+    current_ids = set()
+    stored_ids = set()
+
+    def count_pages(pages):
+        for page_number, page_text in pages:
+            stats.pages += 1
+            stats.characters += len(page_text)
+            yield page_number, page_text
+
+    def add_extract_time(seconds):
+        stats.extract_seconds += seconds
+
+    def add_chunk_time(seconds):
+        stats.chunk_seconds += seconds
+
+    pages = _timed(iter_pdf_pages(pdf_path, max_workers=max_workers, ocr_stats=stats.ocr), add_extract_time)
+    chunks = _timed(
+        iter_chunks(
+            count_pages(pages),
+            chunk_tokens=chunk_tokens,
+            overlap_tokens=overlap_tokens,
+            align_pages=manifest is not None
+        ),
+        add_chunk_time
+    )
+
+    batch = []
+    batch_ids = []
+    backfill = []
+    backfill_ids = []
+
+    def report_progress():
+        if on_progress is not None:
+            if upserter is not None:
+                stats.upsert_seconds = upserter.progress()["elapsed_seconds"]
+            stats.total_seconds = time.perf_counter() - stats.started_at
+            on_progress(stats)
+
+    def on_stored(documents, ids):
+        if manifest is not None:
+            stored_ids.update(ids)
+        if lexical_index is not None:
+            lexical_index.add(ids, [doc.page_content for doc in documents], [doc.metadata for doc in documents], namespace)
+        stats.vectors += len(ids)
+        report_progress()
+
+    upserter = create_upserter(on_stored=on_stored) if create_upserter is not None else None
+
+    def flush():
+        nonlocal before_upsert
+        if before_upsert is not None:
+            before_upsert()
+            before_upsert = None
+        if upserter is not None:
+            upserter.submit(list(batch), list(batch_ids) or None)
+            batch.clear()
+            batch_ids.clear()
+            return
+        start = time.perf_counter()
+        if manifest is not None:
+            ids = vectorstore.add_documents(batch, ids=batch_ids, namespace=namespace)
+            stored_ids.update(batch_ids)
+        else:
+            ids = vectorstore.add_documents(batch, namespace=namespace)
+        if lexical_index is not None:
+            lexical_index.add(ids, [doc.page_content for doc in batch], [doc.metadata for doc in batch], namespace)
+        elapsed = time.perf_counter() - start
+        # Inline add_documents embeds and upserts in one call
+        observe_stage("upsert", elapsed)
+        TOKENS.inc(sum(doc.metadata.get("tokens", 0) for doc in batch), kind="embedded")
+        stats.upsert_seconds += elapsed
+        stats.vectors += len(ids)
+        logger.debug(f"Stored batch of {len(ids)} documents ({stats.vectors} total)")
+        batch.clear()
+        batch_ids.clear()
+        report_progress()
+
+    def flush_backfill():
+        lexical_index.add(backfill_ids, [doc.page_content for doc in backfill], [doc.metadata for doc in backfill],
+                          namespace)
+        stats.lexical_backfilled += len(backfill_ids)
+        backfill.clear()
+        backfill_ids.clear()
+
+    try:
+        for chunk in chunks:
+            chunk_index = stats.chunks
+            stats.chunks += 1
+            document = Document(
+                page_content=chunk.text,
+                metadata={
+                    "source": source,
+                    "chunk_id": chunk_index,
+                    "text": chunk.text,
+                    **chunk.metadata()
+                }
+            )
+            if manifest is not None:
+                vector_id = chunk_vector_id(source, chunk.text)
+                if vector_id in current_ids:
+                    continue
+                current_ids.add(vector_id)
+                if vector_id in previous_ids:
+                    stats.unchanged += 1
+                    if lexical_index is not None and not lexical_index.contains(vector_id, namespace):
+                        backfill.append(document)
+                        backfill_ids.append(vector_id)
+                        if len(backfill) >= batch_size:
+                            flush_backfill()
+                    continue
+                batch_ids.append(vector_id)
+            batch.append(document)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+        if backfill:
+            flush_backfill()
+        if upserter is not None:
+            upserter.close()
+    except Exception:
+        if upserter is not None:
+            # Let in-flight batches finish so stored_ids is complete
+            try:
+                upserter.close()
+            except UpsertFailed:
+                pass
+        if manifest is not None and stored_ids:
+            # Keep track of what did get stored so a later run can clean it up
+            manifests.save(source, previous_ids | stored_ids, manifest["version"], namespace)
+        raise
+    finally:
+        # Pulling a chunk also pulls pages; only count the chunker's own time
+        stats.chunk_seconds = max(0.0, stats.chunk_seconds - stats.extract_seconds)
+        if upserter is not None:
+            stats.upsert_seconds = upserter.progress()["elapsed_seconds"]
+        observe_stage("extract", stats.extract_seconds)
+        observe_stage("chunk", stats.chunk_seconds)
+        stats.total_seconds = time.perf_counter() - stats.started_at
+        observe_stage("ingest", stats.total_seconds)
+        ITEMS.inc(stats.pages, kind="pages")
+        ITEMS.inc(stats.chunks, kind="chunks")
+        ITEMS.inc(stats.vectors, kind="vectors")
+
+    if stats.chunks == 0:
+        if stats.characters == 0:
+            logger.error("No text could be extracted from the PDF")
+            raise ValueError("PDF appears to be empty or unreadable")
+        raise ValueError("Could not create chunks from PDF text")
+
+    if manifest is not None:
+        vanished = previous_ids - current_ids
+        if vanished:
+            if delete_ids(sorted(vanished)) is False:
+                # Keep them in the manifest so the next run retries the delete
+                current_ids |= vanished
+            else:
+                stats.deleted = len(vanished)
+        version = manifest["version"]
+        if stored_ids or vanished:
+            version += 1
+        manifests.save(source, current_ids, version, namespace)
+        logger.info(
+            f"Incremental ingest of {source}: {len(stored_ids)} new, "
+            f"{stats.unchanged} unchanged ({stats.lexical_backfilled} added to the lexical index), "
+            f"{stats.deleted} deleted"
+        )
+
+    logger.info(f"Ingestion throughput for {source}: {stats.to_dict()}")
+    return stats
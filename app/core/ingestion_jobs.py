@@ -0,0 +1,314 @@
+from .concurrency import Overloaded
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INGEST_JOBS_DB = os.getenv("INGEST_JOBS_DB", ".cache/ingest_jobs.sqlite3")
+# Uploads wait here until their job runs, so queued jobs survive a restart
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", ".cache/uploads")
+INGEST_MAX_QUEUED_JOBS = int(os.getenv("INGEST_MAX_QUEUED_JOBS", "100"))
+# Finished jobs are kept this many seconds for status lookups
+INGEST_JOB_RETENTION = float(os.getenv("INGEST_JOB_RETENTION", str(7 * 24 * 3600)))
+# A job interrupted by this many restarts is failed instead of retried
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+# Progress is written to SQLite at most this often per job
+_PROGRESS_INTERVAL = 0.5
+
+def _lock_key(namespace, source, options):
+    """
+    What a job must hold exclusively: its (namespace, source), since jobs
+    for one source read and rewrite the same manifest, or (namespace, None)
+    for a non-incremental job, which replaces the whole namespace
+    """
+    return (namespace, source if options.get("incremental", True) else None)
+
+def _conflicts(key, other):
+    return key[0] == other[0] and (key[1] is None or other[1] is None or key[1] == other[1])
+
+class JobStore:
+    """
+    Ingestion jobs in SQLite: one row per upload with its status
+    (queued -> running -> succeeded | failed), options, latest progress,
+    result and error
+    """
+    def __init__(self, db_path=INGEST_JOBS_DB):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, source TEXT NOT NULL, namespace TEXT NOT NULL, "
+            "path TEXT NOT NULL, options TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "progress TEXT, result TEXT, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "source": row["source"],
+            "namespace": row["namespace"],
+            "options": json.loads(row["options"]),
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "path": row["path"],
+        }
+        end = row["finished_at"] or time.time()
+        job["elapsed_seconds"] = round(end - row["started_at"], 3) if row["started_at"] else None
+        job["queued_seconds"] = round((row["started_at"] or end) - row["created_at"], 3)
+        return job
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def create(self, source, namespace, path, options):
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, status, source, namespace, path, options, created_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, source, namespace, str(path), json.dumps(options), time.time())
+        )
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status=None, namespace=None, limit=50):
+        """Most recent jobs first"""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if namespace is not None:
+            clauses.append("namespace = ?")
+            params.append(namespace)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def queued(self):
+        """Jobs waiting to run, oldest first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def start(self, job_id):
+        """Mark a queued job running; False if it is no longer queued"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, progress = NULL "
+            "WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        )
+        return cursor.rowcount == 1
+
+    def update_progress(self, job_id, progress):
+        self._execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def finish(self, job_id, result=None, error=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+            (
+                "failed" if error is not None else "succeeded",
+                time.time(),
+                json.dumps(result) if result is not None else None,
+                error,
+                job_id
+            )
+        )
+
+    def recover(self, max_attempts=INGEST_JOB_MAX_ATTEMPTS):
+        """
+        Requeue jobs a previous process left running; fail the ones that
+        have already been interrupted max_attempts times
+        """
+        with self._lock:
+            paths = self._conn.execute(
+                "SELECT path FROM jobs WHERE status = 'running' AND attempts >= ?", (max_attempts,)
+            ).fetchall()
+        for row in paths:
+            Path(row["path"]).unlink(missing_ok=True)
+        failed = self._execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE status = 'running' AND attempts >= ?",
+            (time.time(), f"Interrupted {max_attempts} times", max_attempts)
+        ).rowcount
+        requeued = self._execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+        ).rowcount
+        if failed or requeued:
+            logger.warning(f"Recovered interrupted ingestion jobs: {requeued} requeued, {failed} failed")
+        return requeued
+
+    def prune(self, max_age=INGEST_JOB_RETENTION):
+        """Delete finished jobs older than max_age seconds"""
+        return self._execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+            (time.time() - max_age,)
+        ).rowcount
+
+class IngestionJobQueue:
+    """
+    Runs uploaded PDFs through ingestion in the background. submit() stores
+    the upload and a queued job and returns its ID at once; `workers` async
+    workers take jobs in arrival order and await run_job(job, report), which
+    does the blocking work in a bounded pool and calls report(progress) as
+    it goes. Jobs for the same document never run at once (see _lock_key):
+    a job taken while a conflicting one is claimed is deferred, and deferred
+    jobs are requeued in arrival order as conflicts clear. Jobs live in a
+    JobStore, so queued and interrupted jobs resume after a restart; past
+    max_queued waiting jobs, submit() raises Overloaded.
+    """
+    def __init__(self, store, run_job, workers=2, max_queued=INGEST_MAX_QUEUED_JOBS,
+                 upload_dir=INGEST_UPLOAD_DIR):
+        self.store = store
+        self.run_job = run_job
+        self.workers = workers
+        self.max_queued = max_queued
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = None
+        self._tasks = []
+        self._rejected = 0
+        self._claimed = {}  # job ID -> lock key, for jobs running or requeued to run next
+        self._deferred = []  # (job ID, lock key) waiting on a conflicting job, in arrival order
+
+    def start(self):
+        """Start the workers on the running event loop and resume stored jobs"""
+        self.store.prune()
+        self.store.recover()
+        self._queue = asyncio.Queue()
+        for job in self.store.queued():
+            self._queue.put_nowait((job["job_id"], _lock_key(job["namespace"], job["source"], job["options"])))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Ingestion jobs: {self._queue.qsize()} queued, {self.workers} workers")
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, content, source, namespace, options):
+        """Persist an upload and queue it; returns the job ID"""
+        if self._queue.qsize() + len(self._deferred) >= self.max_queued:
+            self._rejected += 1
+            raise Overloaded("ingest-jobs", retry_after=5)
+        path = self.upload_dir / f"{uuid.uuid4().hex}.pdf"
+        await asyncio.to_thread(path.write_bytes, content)
+        job_id = await asyncio.to_thread(self.store.create, source, namespace, path, options)
+        self._queue.put_nowait((job_id, _lock_key(namespace, source, options)))
+        logger.info(f"Queued ingestion job {job_id} for {source} (namespace '{namespace}')")
+        return job_id
+
+    def _reporter(self, job_id):
+        """report(progress) for run_job, throttled to one write per _PROGRESS_INTERVAL"""
+        last = 0.0
+
+        def report(progress, force=False):
+            nonlocal last
+            now = time.monotonic()
+            if force or now - last >= _PROGRESS_INTERVAL:
+                last = now
+                self.store.update_progress(job_id, progress)
+
+        return report
+
+    def _blocked(self, key, deferred):
+        """Whether a job must wait: a conflicting job is claimed, or deferred ahead of it"""
+        others = list(self._claimed.values()) + [other for _, other in deferred]
+        return any(_conflicts(key, other) for other in others)
+
+    def _release(self):
+        """Requeue deferred jobs that no longer wait on a conflicting job"""
+        waiting = []
+        for job_id, key in self._deferred:
+            if self._blocked(key, waiting):
+                waiting.append((job_id, key))
+            else:
+                self._claimed[job_id] = key
+                self._queue.put_nowait((job_id, key))
+        self._deferred = waiting
+
+    async def _worker(self):
+        while True:
+            job_id, key = await self._queue.get()
+            try:
+                if job_id not in self._claimed:
+                    if self._blocked(key, self._deferred):
+                        self._deferred.append((job_id, key))
+                        continue
+                    self._claimed[job_id] = key
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion job {job_id} could not be run: {e}")
+            finally:
+                if job_id in self._claimed:
+                    del self._claimed[job_id]
+                    self._release()
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        if not await asyncio.to_thread(self.store.start, job_id):
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        path = Path(job["path"])
+        try:
+            if not path.exists():
+                raise FileNotFoundError(f"Upload for job {job_id} is missing")
+            result = await self.run_job(job, self._reporter(job_id))
+        except asyncio.CancelledError:
+            # Shutting down: the job stays 'running' and is requeued on the next start
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} ({job['source']}) failed: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, error=str(e))
+        else:
+            await asyncio.to_thread(self.store.finish, job_id, result=result)
+            logger.info(f"Ingestion job {job_id} ({job['source']}) succeeded")
+        path.unlink(missing_ok=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "waiting": self._queue.qsize() if self._queue is not None else 0,
+            "deferred": len(self._deferred),
+            "max_queued": self.max_queued,
+            "rejected": self._rejected,
+            "jobs": self.store.counts(),
+        }
@@ -0,0 +1,364 @@
+from langchain_core.documents import Document
+from .vector_backends import DEFAULT_NAMESPACE
+from array import array
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words, plus identifiers joined by - . / : such as "A-113/7" or "4.2.1"
+_TERM = re.compile(r"\w+(?:[-./:]\w+)*")
+_TERM_SEPARATOR = re.compile(r"[-./:]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or such that the "
+    "their then there these they this to was were which will with what how does do".split()
+)
+# Compact postings once this share of indexed chunks has been deleted
+_COMPACT_DEAD_FRACTION = 0.5
+
+def tokenize(text):
+    """
+    Lowercased index terms. Compound identifiers are kept whole and also
+    indexed by their parts, so "clause 4.2.1" matches "4.2.1" and "4"
+    """
+    terms = [term for term in _TERM.findall(text.lower()) if term not in _STOPWORDS]
+    compounds = [term for term in terms if not term.isalnum() and _TERM_SEPARATOR.search(term)]
+    for compound in compounds:
+        terms.extend(part for part in _TERM_SEPARATOR.split(compound) if part and part not in _STOPWORDS)
+    return terms
+
+def _fusion_key(doc):
+    # Vector IDs are content hashes; chunk_ids are positions, which
+    # incremental re-ingest can give to two different chunks
+    return doc.id or doc.page_content
+
+def reciprocal_rank_fusion(result_lists, k=8, rrf_k=60):
+    """
+    Merge ranked [(document, score), ...] lists: each document scores
+    sum(1 / (rrf_k + rank)) over the lists it appears in. Raw scores are
+    ignored, so lists with incomparable scales (cosine, BM25) fuse cleanly.
+    Returns the k best as [(document, fused score), ...].
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = _fusion_key(doc)
+            entry = fused.setdefault(key, [doc, 0.0])
+            entry[1] += 1.0 / (rrf_k + rank)
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, score) for doc, score in ranked[:k]]
+
+class LexicalIndex:
+    """
+    BM25 inverted index over ingested chunks, kept next to the vector store
+    so exact-term queries (part numbers, clause IDs) are answered locally in
+    microseconds. Postings are compact int32 arrays per term (chunk numbers
+    and term frequencies) that grow by appending; deleted chunks are masked
+    out and compacted away in bulk. Chunks, with their term vectors, are
+    stored in SQLite and the postings are rebuilt from them on startup.
+    BM25 statistics (chunk count, document frequency, average length) are
+    per namespace, so one tenant's scores do not move with another's uploads.
+
+    directory=None keeps the index in memory only.
+    """
+    def __init__(self, directory=None, k1=1.2, b=0.75):
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._term_ids = {}
+        self._postings = []  # term id -> (array of chunk numbers, array of term frequencies)
+        self._keys = {}  # (namespace, id) -> chunk number
+        self._size = 0
+        self._count = 0
+        self._total_length = 0
+        # Live chunks and their summed lengths per namespace code
+        self._namespace_counts = Counter()
+        self._namespace_lengths = Counter()
+        self._dead_chunks = 0
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._codes = {"namespace": {}, "source": {}}
+        self._code_arrays = {"namespace": np.zeros(0, dtype=np.int32), "source": np.zeros(0, dtype=np.int32)}
+
+        database = str(self.directory / "lexical.sqlite3") if self.directory is not None else ":memory:"
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, id INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "number INTEGER PRIMARY KEY, namespace TEXT NOT NULL, id TEXT NOT NULL, source TEXT, "
+            "length INTEGER NOT NULL, terms BLOB NOT NULL, frequencies BLOB NOT NULL, "
+            "metadata TEXT NOT NULL, text TEXT NOT NULL, UNIQUE (namespace, id))"
+        )
+        self._conn.commit()
+        self._load()
+
+    # Storage
+
+    def _load(self):
+        self._term_ids = dict(self._conn.execute("SELECT term, id FROM terms"))
+        rows = self._conn.execute(
+            "SELECT number, namespace, id, source, length, terms, frequencies FROM chunks ORDER BY number"
+        ).fetchall()
+        self._ensure_capacity(rows[-1][0] + 1 if rows else 0)
+        self._size = rows[-1][0] + 1 if rows else 0
+        numbers, term_ids, frequencies = [], [], []
+        for number, namespace, vector_id, source, length, terms, counts in rows:
+            self._set_chunk(number, namespace, vector_id, source, length)
+            terms = np.frombuffer(terms, dtype=np.int32)
+            numbers.append(np.full(len(terms), number, dtype=np.int32))
+            term_ids.append(terms)
+            frequencies.append(np.frombuffer(counts, dtype=np.int32))
+
+        self._postings = [(array("i"), array("i")) for _ in range(len(self._term_ids))]
+        if rows:
+            numbers = np.concatenate(numbers)
+            term_ids = np.concatenate(term_ids)
+            frequencies = np.concatenate(frequencies)
+            # Group by term; the stable sort keeps each term's chunks in order
+            order = np.argsort(term_ids, kind="stable")
+            bounds = np.searchsorted(term_ids[order], np.arange(len(self._term_ids) + 1))
+            numbers, frequencies = numbers[order], frequencies[order]
+            for term_id in range(len(self._term_ids)):
+                start, stop = bounds[term_id], bounds[term_id + 1]
+                self._postings[term_id][0].frombytes(numbers[start:stop].tobytes())
+                self._postings[term_id][1].frombytes(frequencies[start:stop].tobytes())
+        logger.info(f"Lexical index loaded {self._count} chunks and {len(self._term_ids)} terms "
+                    f"from {self.directory or 'memory'}")
+
+    def _ensure_capacity(self, needed):
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        grow = max(needed, capacity * 2, 1024) - capacity
+        self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+        self._lengths = np.concatenate([self._lengths, np.zeros(grow, dtype=np.int32)])
+        for field, codes in self._code_arrays.items():
+            self._code_arrays[field] = np.concatenate([codes, np.full(grow, -1, dtype=np.int32)])
+
+    def _code(self, field, value, create=False):
+        codes = self._codes[field]
+        if value not in codes:
+            if not create:
+                return None
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _set_chunk(self, number, namespace, vector_id, source, length):
+        self._keys[(namespace, vector_id)] = number
+        self._alive[number] = True
+        self._lengths[number] = length
+        code = self._code("namespace", namespace, create=True)
+        self._code_arrays["namespace"][number] = code
+        self._code_arrays["source"][number] = -1 if source is None else self._code("source", source, create=True)
+        self._count += 1
+        self._total_length += length
+        self._namespace_counts[code] += 1
+        self._namespace_lengths[code] += length
+
+    def _new_term(self, term, new_terms):
+        term_id = self._term_ids[term] = len(self._postings)
+        self._postings.append((array("i"), array("i")))
+        new_terms.append((term, term_id))
+        return term_id
+
+    # Writes
+
+    def add(self, ids, texts, metadatas=None, namespace=None):
+        """
+        Index chunks under their vector IDs, replacing chunks already indexed
+        under the same IDs (within the batch, the last copy of an ID wins)
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+        ids, texts = list(ids), list(texts)
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if len(set(ids)) < len(ids):
+            last = sorted({vector_id: i for i, vector_id in enumerate(ids)}.values())
+            ids, texts, metadatas = [ids[i] for i in last], [texts[i] for i in last], [metadatas[i] for i in last]
+        counted = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            self._delete_keys([(namespace, vector_id) for vector_id in ids])
+            self._ensure_capacity(self._size + len(texts))
+            new_terms = []
+            records = []
+            postings = self._postings
+            for vector_id, text, metadata, counts in zip(ids, texts, metadatas, counted):
+                number = self._size
+                self._size += 1
+                term_ids = array("i")
+                for term, frequency in counts.items():
+                    term_id = self._term_ids.get(term)
+                    if term_id is None:
+                        term_id = self._new_term(term, new_terms)
+                    term_ids.append(term_id)
+                    numbers, frequencies = postings[term_id]
+                    numbers.append(number)
+                    frequencies.append(frequency)
+                frequencies = array("i", counts.values())
+                length = sum(frequencies)
+                source = metadata.get("source")
+                self._set_chunk(number, namespace, vector_id, source, length)
+                records.append((number, namespace, vector_id, source, length, term_ids.tobytes(),
+                                frequencies.tobytes(), json.dumps(metadata), text))
+            self._conn.executemany("INSERT INTO terms (term, id) VALUES (?, ?)", new_terms)
+            self._conn.executemany(
+                "INSERT INTO chunks (number, namespace, id, source, length, terms, frequencies, metadata, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            self._conn.commit()
+        return ids
+
+    def contains(self, vector_id, namespace=None):
+        with self._lock:
+            return (namespace or DEFAULT_NAMESPACE, vector_id) in self._keys
+
+    def _delete_keys(self, keys):
+        numbers = [self._keys.pop(key) for key in keys if key in self._keys]
+        if not numbers:
+            return
+        for number in numbers:
+            code = int(self._code_arrays["namespace"][number])
+            length = int(self._lengths[number])
+            self._alive[number] = False
+            self._count -= 1
+            self._total_length -= length
+            self._namespace_counts[code] -= 1
+            self._namespace_lengths[code] -= length
+            self._dead_chunks += 1
+        self._conn.executemany("DELETE FROM chunks WHERE number = ?", [(number,) for number in numbers])
+        if self._dead_chunks > _COMPACT_DEAD_FRACTION * max(self._count, 1000):
+            self._compact()
+
+    def _compact(self):
+        """Drop deleted chunks from every posting list"""
+        alive = self._alive
+        for term_id, (numbers, frequencies) in enumerate(self._postings):
+            numbers_array = np.array(numbers, dtype=np.int32)
+            keep = alive[numbers_array]
+            if keep.all():
+                continue
+            self._postings[term_id] = (
+                array("i", numbers_array[keep].tobytes()),
+                array("i", np.array(frequencies, dtype=np.int32)[keep].tobytes())
+            )
+        self._dead_chunks = 0
+
+    def delete(self, ids=None, delete_all=None, namespace=None):
+        """
+        Remove chunks by vector ID, or every chunk in the namespace
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+        with self._lock:
+            if delete_all:
+                keys = [key for key in self._keys if key[0] == namespace]
+            else:
+                keys = [(namespace, vector_id) for vector_id in ids or []]
+            self._delete_keys(keys)
+            self._conn.commit()
+        return True
+
+    # Search
+
+    def _filter_mask(self, numbers, filter):
+        mask = np.ones(len(numbers), dtype=bool)
+        for field, condition in (filter or {}).items():
+            if field != "source":
+                raise ValueError(f"Cannot filter the lexical index on '{field}'")
+            if isinstance(condition, dict):
+                values = [condition["$eq"]] if "$eq" in condition else condition.get("$in", [])
+            else:
+                values = [condition]
+            codes = [c for c in (self._code("source", v) for v in values) if c is not None]
+            mask &= np.isin(self._code_arrays["source"][numbers], codes)
+        return mask
+
+    def search(self, query, k=8, namespace=None, filter=None):
+        """
+        BM25 top-k for query. Returns [(document, score), ...], best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            code = self._code("namespace", namespace or DEFAULT_NAMESPACE)
+            count = self._namespace_counts[code] if code is not None else 0
+            if not count:
+                return []
+            average_length = self._namespace_lengths[code] / count
+            numbers_parts, score_parts = [], []
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    continue
+                scored = self._term_scores(term_id, code, count, average_length)
+                if scored is not None:
+                    numbers_parts.append(scored[0])
+                    score_parts.append(scored[1])
+            if not numbers_parts:
+                return []
+            numbers = np.concatenate(numbers_parts)
+            scores = np.concatenate(score_parts)
+            mask = self._filter_mask(numbers, filter)
+            numbers, scores = numbers[mask], scores[mask]
+            if not len(numbers):
+                return []
+            # Sum the per-term scores of each chunk
+            unique, inverse = np.unique(numbers, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores)
+            k = min(k, len(unique))
+            best = np.argpartition(-totals, k - 1)[:k]
+            best = best[np.argsort(-totals[best])]
+            chunks = self._fetch(unique[best])
+        return [(chunks[int(number)], float(totals[i])) for number, i in zip(unique[best], best)]
+
+    def _term_scores(self, term_id, namespace_code, count, average_length):
+        """
+        BM25 contributions of one term within one namespace (count live
+        chunks of average_length): (chunk numbers, scores), or None.
+        The postings are read in place; only copies leave this method, since
+        an array viewed by numpy cannot grow.
+        """
+        numbers = np.frombuffer(self._postings[term_id][0], dtype=np.int32)
+        frequencies = np.frombuffer(self._postings[term_id][1], dtype=np.int32)
+        live = self._alive[numbers] & (self._code_arrays["namespace"][numbers] == namespace_code)
+        document_frequency = int(live.sum())
+        if not document_frequency:
+            return None
+        numbers = numbers[live]
+        frequencies = frequencies[live].astype(np.float32)
+        idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+        norms = self.k1 * (1 - self.b + self.b * self._lengths[numbers] / average_length)
+        return numbers, idf * frequencies * (self.k1 + 1) / (frequencies + norms)
+
+    def _fetch(self, numbers):
+        numbers = [int(number) for number in numbers]
+        placeholders = ",".join("?" * len(numbers))
+        records = self._conn.execute(
+            f"SELECT number, id, metadata, text FROM chunks WHERE number IN ({placeholders})", numbers
+        ).fetchall()
+        return {
+            number: Document(id=vector_id, page_content=text, metadata=json.loads(metadata))
+            for number, vector_id, metadata, text in records
+        }
+
+    def stats(self):
+        with self._lock:
+            postings = sum(len(numbers) for numbers, _ in self._postings)
+            return {
+                "chunks": self._count,
+                "terms": len(self._term_ids),
+                "postings": postings,
+                "deleted_chunks": self._dead_chunks,
+                "postings_bytes": postings * 8,
+                "average_length": round(self._total_length / self._count, 1) if self._count else 0,
+            }
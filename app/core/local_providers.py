@@ -0,0 +1,152 @@
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from .text_to_speech import DEFAULT_VOICE_ID, split_sentences
+import numpy as np
+import asyncio
+import hashlib
+import logging
+import re
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic, offline embedder: each lowercased word and word bigram is
+    hashed to a signed position in a dimension-sized vector, and the vector
+    is L2-normalized. Texts sharing words get similar embeddings, which is
+    enough for retrieval to behave sensibly in benchmarks.
+    """
+    def __init__(self, dimension=1536):
+        self.dimension = dimension
+
+    def _embed(self, text):
+        words = _TOKEN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        if not features:
+            vector[0] = 1.0
+            return vector.tolist()
+        digests = [hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest() for feature in features]
+        hashes = np.frombuffer(b"".join(digests), dtype=np.uint64)
+        positions = (hashes % self.dimension).astype(np.int64)
+        signs = np.where((hashes >> np.uint64(63)) == 1, -1.0, 1.0)
+        np.add.at(vector, positions, signs)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model with realistic timing: the first token arrives after
+    latency seconds and the rest at tokens_per_second. The answer is the
+    first answer_tokens words of the prompt's context, so it is reproducible
+    and depends on what retrieval returned. Prompts without a context
+    (condensing a follow-up, summarizing a conversation) get the first
+    words of their last paragraph.
+    """
+    latency: float = 0.3
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 80
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _answer(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "Context:" in prompt:
+            context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0]
+        else:
+            context = prompt.rsplit("\n\n", 1)[-1]
+        words = context.split()[:self.answer_tokens] or ["No", "context", "provided."]
+        tokens = [words[0]] + [f" {word}" for word in words[1:]]
+        usage = {
+            "input_tokens": len(prompt.split()),
+            "output_tokens": len(tokens),
+            "total_tokens": len(prompt.split()) + len(tokens)
+        }
+        return tokens, usage
+
+    def _delay(self, index):
+        return self.latency if index == 0 else 1.0 / self.tokens_per_second
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, usage = self._answer(messages)
+        time.sleep(self.latency + (len(tokens) - 1) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, usage = self._answer(messages)
+        await asyncio.sleep(self.latency + (len(tokens) - 1) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, usage = self._answer(messages)
+        for i, token in enumerate(tokens):
+            time.sleep(self._delay(i))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, usage = self._answer(messages)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self._delay(i))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+# One MPEG-1 Layer III frame (128 kbps, 44.1 kHz) with zeroed side info,
+# which decoders play as 26 ms of silence
+_SILENT_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+_FRAME_SECONDS = 1152 / 44100
+
+class SilentTTS:
+    """
+    Offline stand-in for ElevenLabsTTS that returns silent MP3 audio.
+    Each sentence takes latency seconds and lasts as long as it would take
+    to read at chars_per_second, so streaming behaves like the real service.
+    """
+    def __init__(self, latency=0.2, chars_per_second=15.0, max_concurrency=4):
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.max_concurrency = max_concurrency
+        self.cache = None
+
+    def _audio(self, text):
+        frames = max(1, int(len(text) / self.chars_per_second / _FRAME_SECONDS))
+        return _SILENT_FRAME * frames
+
+    def synthesize_speech(self, text, voice_id=DEFAULT_VOICE_ID):
+        if not text:
+            return b""
+        time.sleep(self.latency)
+        return self._audio(text)
+
+    async def stream_speech(self, text, voice_id=DEFAULT_VOICE_ID):
+        sentences = split_sentences(text) if text else []
+        # Sentences are "synthesized" concurrently, so later ones are ready sooner
+        batches = range(0, len(sentences), self.max_concurrency)
+        for start in batches:
+            await asyncio.sleep(self.latency)
+            for sentence in sentences[start:start + self.max_concurrency]:
+                yield self._audio(sentence)
+
+    async def asynthesize_speech(self, text, voice_id=DEFAULT_VOICE_ID):
+        return b"".join([chunk async for chunk in self.stream_speech(text, voice_id)])
+
+    async def aclose(self):
+        pass
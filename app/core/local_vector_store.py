@@ -0,0 +1,666 @@
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from .vector_backends import DEFAULT_NAMESPACE, EMBEDDING_DIMENSION, build_embeddings
+from .ann_index import IVFIndex
+from contextlib import contextmanager
+from collections import Counter, deque
+from pathlib import Path
+import numpy as np
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix multiply; bounds the temporary score buffer
+_SCAN_BLOCK = 65536
+# Below this fraction of live rows, gather the candidates instead of scanning everything
+_GATHER_SELECTIVITY = 0.25
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _top_k(scores, k):
+    """
+    Indices of the k highest scores in each row, best first
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+class _Selection:
+    """
+    The rows one search may return: namespace/filter conditions plus the
+    arrays they are checked against, captured under the store lock.
+    bound is an upper bound on the matching rows, from per-code counts.
+    """
+    def __init__(self, conditions, alive, row_codes, size, bound, live_count):
+        self.conditions = conditions
+        self.alive = alive
+        self.row_codes = row_codes
+        self.size = size
+        self.bound = bound
+        # Every live row matches (one namespace, no narrowing filter): only
+        # liveness needs checking
+        self.unrestricted = conditions is not None and bound >= live_count
+
+    def matches(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.conditions is None:
+            return np.zeros(len(rows), dtype=bool)
+        keep = self.alive[rows]
+        if not self.unrestricted:
+            for column, codes in self.conditions:
+                keep &= np.isin(self.row_codes[rows, column], codes)
+        return keep
+
+    def mask(self):
+        """Boolean mask over every row; O(rows), so only for exact scans"""
+        if self.unrestricted:
+            return self.alive[:self.size].copy()
+        return self.matches(np.arange(self.size))
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for single-node deployments and offline testing.
+    Unit-normalized embeddings live in a memory-mapped float32 matrix, so
+    startup maps the file instead of loading it, and search is a vectorized
+    cosine top-k. Metadata and text are kept in SQLite next to the matrix
+    and read by row only for the hits a search returns.
+    Namespaces and the fields in indexed_fields are mirrored into a
+    memory-mapped matrix of integer codes (one column per field, -1 for an
+    empty row), so namespace and filter masks are vectorized too and
+    startup needs no per-row Python work.
+
+    index_type options: "flat" (exact scan), "ivf" (approximate; see IVFIndex).
+    The IVF index is trained in a background thread once enough vectors are
+    stored; until then, and for highly selective namespaces/filters, search
+    is exact.
+
+    Writes hold the store lock throughout; searches take it only to snapshot
+    their selection and to read the hits' metadata, so concurrent asks
+    score in parallel. Per-code row counts tell a search how selective its
+    namespace and filter are without scanning them, so an IVF search checks
+    only its probed rows. Hits are re-checked against the namespace and filter
+    when their metadata is read, and deleted rows are not reused until every
+    search that started before the delete has finished, so a search never
+    returns a row that changed owner while it was scoring.
+
+    directory=None keeps everything in memory (flat index only), for tests
+    and offline benchmarks.
+    """
+    def __init__(self, directory, embedding, dimension=EMBEDDING_DIMENSION,
+                 indexed_fields=("source",), text_key="text", index_type="flat", **ann_options):
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding
+        self.dimension = dimension
+        self.indexed_fields = tuple(indexed_fields)
+        self.text_key = text_key
+        self._lock = threading.RLock()
+        self._vectors_path = self.directory / "vectors.f32" if self.directory is not None else None
+        self._codes_path = self.directory / "row_codes.i32" if self.directory is not None else None
+        self._matrix = None
+        self._row_codes = None
+        self._capacity = 0
+        self._size = 0  # high-water mark of used rows
+        self._count = 0  # live rows
+        self._free_rows = []
+        # (search epoch at delete time, row); see _release_retired_rows
+        self._retired_rows = deque()
+        self._search_epoch = 0
+        self._active_searches = Counter()
+        self._alive = np.zeros(0, dtype=bool)
+        self._columns = {field: i for i, field in enumerate(("__namespace__",) + self.indexed_fields)}
+        self._codes = {field: {} for field in self._columns}
+        # Live rows per code, one Counter per column
+        self._code_counts = [Counter() for _ in self._columns]
+        self._training_thread = None
+        if index_type == "ivf":
+            if self.directory is None:
+                raise ValueError("The IVF index needs a directory; in-memory stores are flat only")
+            self.ann_index = IVFIndex(self.directory, dimension, **ann_options)
+        elif index_type == "flat":
+            self.ann_index = None
+        else:
+            raise ValueError(f"Unknown index type: {index_type}. Use 'flat' or 'ivf'")
+
+        try:
+            database = str(self.directory / "metadata.sqlite3") if self.directory is not None else ":memory:"
+            self._conn = sqlite3.connect(database, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                "namespace TEXT NOT NULL, id TEXT NOT NULL, row INTEGER NOT NULL UNIQUE, "
+                "fields TEXT NOT NULL, metadata TEXT NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS codes ("
+                "field TEXT NOT NULL, value TEXT NOT NULL, code INTEGER NOT NULL, PRIMARY KEY (field, value))"
+            )
+            self._conn.commit()
+            self._load()
+        except Exception as e:
+            logger.error(f"Error opening local vector store at {self.directory}: {e}")
+            raise
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # Storage
+
+    def _load(self):
+        for field, value, code in self._conn.execute("SELECT field, value, code FROM codes"):
+            if field in self._codes:
+                self._codes[field][json.loads(value)] = code
+        size = (self._conn.execute("SELECT MAX(row) FROM vectors").fetchone()[0] or -1) + 1
+        stored = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        if self._vectors_path is not None and self._vectors_path.exists():
+            existing = self._vectors_path.stat().st_size // (4 * self.dimension)
+            self._map(max(existing, size))
+        self._ensure_capacity(size)
+        self._size = size
+        self._alive[:size] = np.asarray(self._row_codes[:size, 0]) >= 0
+        self._count = int(self._alive.sum())
+        for column in self._columns.values():
+            values = np.asarray(self._row_codes[:size, column])[self._alive[:size]]
+            counts = np.bincount(values[values >= 0])
+            self._code_counts[column] = Counter({code: int(n) for code, n in enumerate(counts) if n})
+        if self._count != stored:
+            # Row codes missing (a store from before they were persisted) or
+            # out of step with SQLite after a crash
+            self._rebuild_row_codes()
+        self._free_rows = np.flatnonzero(~self._alive[:size]).tolist()
+        if self.ann_index is not None:
+            self.ann_index.load_lists(size)
+        logger.info(f"Local vector store mapped {self._count} vectors from {self.directory or 'memory'}")
+
+    def _rebuild_row_codes(self):
+        logger.warning(f"Rebuilding row codes of the local vector store at {self.directory} from its metadata")
+        self._row_codes[:] = -1
+        self._alive[:] = False
+        self._count = 0
+        self._codes = {field: {} for field in self._columns}
+        self._code_counts = [Counter() for _ in self._columns]
+        self._conn.execute("DELETE FROM codes")
+        for namespace, row, fields in self._conn.execute("SELECT namespace, row, fields FROM vectors").fetchall():
+            self._set_row(row, namespace, json.loads(fields))
+        self._conn.commit()
+        self._flush()
+
+    def _map(self, capacity):
+        columns = len(self._columns)
+        if self._vectors_path is None:
+            matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+            codes = np.full((capacity, columns), -1, dtype=np.int32)
+            if self._matrix is not None:
+                matrix[:len(self._matrix)] = self._matrix
+                codes[:len(self._row_codes)] = self._row_codes
+            self._matrix = matrix
+            self._row_codes = codes
+            self._capacity = capacity
+            return
+        self._flush()
+        # Searches may still hold the old maps; they stay valid since the files only grow
+        self._matrix = None
+        self._row_codes = None
+        existing_codes = self._codes_path.stat().st_size // (4 * columns) if self._codes_path.exists() else 0
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dimension * 4)
+        with open(self._codes_path, "ab") as f:
+            f.truncate(capacity * columns * 4)
+        self._capacity = capacity
+        if capacity:
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+            )
+            self._row_codes = np.memmap(self._codes_path, dtype=np.int32, mode="r+", shape=(capacity, columns))
+            if capacity > existing_codes:
+                self._row_codes[existing_codes:] = -1
+
+    def _flush(self):
+        for array in (self._matrix, self._row_codes):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def _ensure_capacity(self, needed):
+        if needed > self._capacity or self._row_codes is None:
+            self._map(max(needed, self._capacity * 2, 1024))
+        grow = self._capacity - len(self._alive)
+        if grow > 0:
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+        if self.ann_index is not None:
+            self.ann_index.resize(self._capacity)
+
+    def _code(self, field, value, create=False):
+        codes = self._codes[field]
+        if value not in codes:
+            if not create:
+                return None
+            codes[value] = len(codes)
+            # Committed with the write that needed it
+            self._conn.execute(
+                "INSERT INTO codes (field, value, code) VALUES (?, ?, ?)", (field, json.dumps(value), codes[value])
+            )
+        return codes[value]
+
+    def _column(self, field, size):
+        return self._row_codes[:size, self._columns[field]]
+
+    def _count_codes(self, codes, change):
+        for column, code in enumerate(codes):
+            if code >= 0:
+                self._code_counts[column][int(code)] += change
+
+    def _set_row(self, row, namespace, fields):
+        if self._alive[row]:
+            self._count_codes(self._row_codes[row], -1)
+        else:
+            self._count += 1
+        self._alive[row] = True
+        codes = [self._code("__namespace__", namespace, create=True)]
+        for field in self.indexed_fields:
+            value = fields.get(field)
+            codes.append(-1 if value is None else self._code(field, value, create=True))
+        self._row_codes[row] = codes
+        self._count_codes(codes, 1)
+
+    def _clear_row(self, row):
+        self._count -= 1
+        self._count_codes(self._row_codes[row], -1)
+        self._alive[row] = False
+        self._row_codes[row] = -1
+        self._retired_rows.append((self._search_epoch, row))
+
+    def _release_retired_rows(self):
+        """
+        Make deleted rows reusable once no search that started before their
+        delete is still running; until then such a search may return them
+        """
+        oldest = min(self._active_searches) if self._active_searches else None
+        while self._retired_rows and (oldest is None or self._retired_rows[0][0] < oldest):
+            self._free_rows.append(self._retired_rows.popleft()[1])
+
+    @contextmanager
+    def _search(self):
+        with self._lock:
+            self._search_epoch += 1
+            epoch = self._search_epoch
+            self._active_searches[epoch] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_searches[epoch] -= 1
+                if not self._active_searches[epoch]:
+                    del self._active_searches[epoch]
+
+    def _allocate_row(self):
+        if self._free_rows:
+            return self._free_rows.pop()
+        self._ensure_capacity(self._size + 1)
+        self._size += 1
+        return self._size - 1
+
+    def _rows_for_ids(self, namespace, ids):
+        """{id: row} for the IDs stored in namespace, looked up in SQLite"""
+        ids = list(dict.fromkeys(ids))
+        rows = {}
+        # Stay under SQLite's bound-variable limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(
+                f"SELECT id, row FROM vectors WHERE namespace = ? AND id IN ({placeholders})", (namespace, *batch)
+            ).fetchall())
+        return rows
+
+    # Writes
+
+    def add_texts(self, texts, metadatas=None, ids=None, namespace=None, **kwargs):
+        """
+        Embed and store texts, replacing any vectors that already use the same IDs
+        """
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids, namespace=namespace)
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None, namespace=None):
+        """
+        Store precomputed embeddings
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+
+        with self._lock:
+            self._release_retired_rows()
+            id_rows = self._rows_for_ids(namespace, ids)
+            rows = []
+            records = []
+            for vector_id, text, metadata in zip(ids, texts, metadatas):
+                row = id_rows.get(vector_id)
+                if row is None:
+                    row = id_rows[vector_id] = self._allocate_row()
+                fields = {field: metadata.get(field) for field in self.indexed_fields if field in metadata}
+                self._set_row(row, namespace, fields)
+                rows.append(row)
+                records.append((namespace, vector_id, row, json.dumps(fields), json.dumps(metadata), text))
+            self._matrix[rows] = vectors
+            self._flush()
+            if self.ann_index is not None:
+                self.ann_index.add(rows, vectors)
+                self.ann_index.flush()
+                if self.ann_index.needs_training(self._count):
+                    self._train_in_background()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (namespace, id, row, fields, metadata, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                records
+            )
+            self._conn.commit()
+        return ids
+
+    def _train_in_background(self):
+        """
+        (Re)train the IVF index on the rows stored now, in a thread; searches
+        keep using the current index until the new one is installed
+        """
+        self.ann_index.begin_training()
+        matrix = self._matrix
+        rows = np.flatnonzero(self._alive[:self._size])
+
+        def train():
+            try:
+                model = self.ann_index.fit(matrix, rows)
+                with self._lock:
+                    self.ann_index.install(model, self._matrix)
+            except Exception as e:
+                logger.error(f"Error training the IVF index: {e}")
+                # The next insert retries
+                self.ann_index.abort_training()
+
+        self._training_thread = threading.Thread(target=train, name="ivf-train", daemon=True)
+        self._training_thread.start()
+
+    def wait_for_training(self, timeout=None):
+        """Block until a background IVF training run finishes, e.g. in benchmarks"""
+        thread = self._training_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def delete(self, ids=None, delete_all=None, namespace=None, **kwargs):
+        """
+        Delete vectors by ID, or every vector in the namespace
+        """
+        namespace = namespace or DEFAULT_NAMESPACE
+        with self._lock:
+            if delete_all:
+                code = self._code("__namespace__", namespace)
+                rows = [] if code is None else np.flatnonzero(
+                    self._alive[:self._size] & (self._column("__namespace__", self._size) == code)
+                ).tolist()
+                self._conn.execute("DELETE FROM vectors WHERE namespace = ?", (namespace,))
+            else:
+                rows = list(self._rows_for_ids(namespace, ids or []).values())
+                self._conn.executemany(
+                    "DELETE FROM vectors WHERE namespace = ? AND id = ?",
+                    [(namespace, i) for i in ids or []]
+                )
+            for row in rows:
+                self._clear_row(row)
+            self._flush()
+            if self.ann_index is not None:
+                self.ann_index.remove(rows)
+                self.ann_index.flush()
+            self._conn.commit()
+        return True
+
+    # Search
+
+    def _conditions(self, namespace, filter):
+        """
+        [(column, allowed codes)] for the namespace and filter, or None when
+        a value was never stored so nothing can match
+        """
+        code = self._code("__namespace__", namespace or DEFAULT_NAMESPACE)
+        if code is None:
+            return None
+        conditions = [(self._columns["__namespace__"], [code])]
+        for field, condition in (filter or {}).items():
+            if field not in self.indexed_fields:
+                raise ValueError(f"Cannot filter on '{field}'; indexed fields are {self.indexed_fields}")
+            if isinstance(condition, dict):
+                if "$eq" in condition:
+                    values = [condition["$eq"]]
+                elif "$in" in condition:
+                    values = condition["$in"]
+                else:
+                    raise ValueError(f"Unsupported filter operator in {condition}")
+            else:
+                values = [condition]
+            codes = [c for c in (self._code(field, v) for v in values) if c is not None]
+            if not codes:
+                return None
+            conditions.append((self._columns[field], codes))
+        return conditions
+
+    def _select(self, conditions):
+        """A _Selection over the rows as they are now; call under the lock"""
+        if conditions is None:
+            bound = 0
+        else:
+            bound = min(sum(self._code_counts[column][code] for code in set(codes)) for column, codes in conditions)
+        return _Selection(conditions, self._alive, self._row_codes, self._size, bound, self._count)
+
+    def _search_rows(self, matrix, queries, k, selection, live_count, exact=False, nprobe=None):
+        """
+        Cosine top-k over the rows in selection, for a batch of queries.
+        matrix, selection and live_count are a snapshot taken under the lock,
+        so this runs without it. Returns (rows, scores) arrays of shape
+        (len(queries), <=k).
+        """
+        n_queries = queries.shape[0]
+        empty = np.empty((n_queries, 0), dtype=np.int64), np.empty((n_queries, 0), dtype=np.float32)
+        if selection.bound == 0 or k <= 0:
+            return empty
+
+        if selection.bound < _GATHER_SELECTIVITY * live_count:
+            # Few candidates (e.g. one small namespace): score just those rows
+            candidates = np.flatnonzero(selection.mask())
+            if len(candidates) == 0:
+                return empty
+            scores = queries @ matrix[candidates].T
+            best = _top_k(scores, k)
+            return candidates[best], np.take_along_axis(scores, best, axis=1)
+
+        if not exact and self.ann_index is not None and self.ann_index.trained:
+            return self._search_ann(matrix, queries, k, selection, live_count, nprobe)
+
+        # Scan the matrix block by block, keeping a running top-k per query
+        mask = selection.mask()
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        for start in range(0, len(mask), _SCAN_BLOCK):
+            stop = min(start + _SCAN_BLOCK, len(mask))
+            block_mask = mask[start:stop]
+            if not block_mask.any():
+                continue
+            scores = queries @ matrix[start:stop].T
+            scores[:, ~block_mask] = -np.inf
+            block_best = _top_k(scores, k)
+            best_rows = np.concatenate([best_rows, block_best + start], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, block_best, axis=1)], axis=1)
+            keep = _top_k(best_scores, k)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        return best_rows, best_scores
+
+    def _search_ann(self, matrix, queries, k, selection, live_count, nprobe):
+        rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = self.ann_index.candidates(query, nprobe=nprobe)
+            # Rows added since the snapshot may not be in the matrix yet
+            candidates = candidates[candidates < selection.size]
+            candidates = candidates[selection.matches(candidates)]
+            if len(candidates) < k:
+                # Probed lists too sparse for this filter; fall back to an exact scan
+                exact_rows, exact_scores = self._search_rows(
+                    matrix, query[None, :], k, selection, live_count, exact=True
+                )
+                rows[i, :exact_rows.shape[1]] = exact_rows[0]
+                scores[i, :exact_scores.shape[1]] = exact_scores[0]
+                continue
+            candidate_scores = matrix[candidates] @ query
+            best = _top_k(candidate_scores[None, :], k)[0]
+            rows[i, :len(best)] = candidates[best]
+            scores[i, :len(best)] = candidate_scores[best]
+        return rows, scores
+
+    def _documents_for_rows(self, rows, namespace, conditions):
+        """
+        Documents of the hit rows that still satisfy the search's namespace
+        and filter; a row updated in place since the snapshot may not
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = [int(row) for row in rows[self._select(conditions).matches(rows)]]
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        # Unary + keeps SQLite on the row index rather than scanning the namespace's primary key
+        records = self._conn.execute(
+            f"SELECT row, id, metadata, text FROM vectors WHERE row IN ({placeholders}) AND +namespace = ?",
+            (*rows, namespace or DEFAULT_NAMESPACE)
+        ).fetchall()
+        documents = {}
+        for row, vector_id, metadata, text in records:
+            documents[row] = Document(id=vector_id, page_content=text, metadata=json.loads(metadata))
+        return documents
+
+    def batch_similarity_search_by_vector_with_score(self, embeddings, k=4, filter=None, namespace=None,
+                                                     exact=False, nprobe=None):
+        """
+        Search many query embeddings with one matrix multiply per block.
+        exact skips the ANN index; nprobe overrides its recall/latency knob.
+        """
+        queries = _normalize(embeddings)
+        with self._search():
+            with self._lock:
+                conditions = self._conditions(namespace, filter)
+                selection = self._select(conditions)
+                matrix, live_count = self._matrix, self._count
+            rows, scores = self._search_rows(matrix, queries, k, selection, live_count, exact=exact, nprobe=nprobe)
+            with self._lock:
+                documents = self._documents_for_rows(np.unique(rows[rows >= 0]), namespace, conditions)
+        results = []
+        for query_rows, query_scores in zip(rows, scores):
+            results.append([
+                (documents[int(row)], float(score))
+                for row, score in zip(query_rows, query_scores)
+                if np.isfinite(score) and int(row) in documents
+            ])
+        return results
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, namespace=None, **kwargs):
+        return self.batch_similarity_search_by_vector_with_score(
+            [embedding], k=k, filter=filter, namespace=namespace, **kwargs
+        )[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, namespace=None, **kwargs):
+        results = self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, namespace=namespace, **kwargs)
+        return [doc for doc, _ in results]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, namespace=None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, namespace=namespace, **kwargs)
+
+    def similarity_search(self, query, k=4, filter=None, namespace=None, **kwargs):
+        results = self.similarity_search_with_score(query, k=k, filter=filter, namespace=namespace, **kwargs)
+        return [doc for doc, _ in results]
+
+    @staticmethod
+    def _cosine_relevance_score_fn(score):
+        return (score + 1) / 2
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, directory=".cache/local_index", **kwargs):
+        store = cls(directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def describe_index_stats(self):
+        """
+        Vector counts per namespace, shaped like Pinecone's index stats
+        """
+        with self._lock:
+            size = self._size
+            alive = self._alive[:size]
+            counts = np.bincount(self._column("__namespace__", size)[alive])
+            namespaces = {
+                namespace: {"vector_count": int(counts[code])}
+                for namespace, code in self._codes["__namespace__"].items()
+                if code < len(counts) and counts[code] > 0
+            }
+            return {
+                "dimension": self.dimension,
+                "total_vector_count": self._count,
+                "namespaces": namespaces
+            }
+
+class LocalVectorManager:
+    """
+    Drop-in replacement for PineconeManager backed by a LocalVectorStore
+    """
+    def __init__(self, index_name="doctalk", directory=".cache/local_index", embeddings=None,
+                 index_type="flat", **ann_options):
+        self.index_name = index_name
+        self.embeddings = embeddings or build_embeddings()
+        self.vectorstore = LocalVectorStore(
+            Path(directory) / index_name if directory is not None else None,
+            self.embeddings, index_type=index_type, **ann_options
+        )
+
+    def describe_index_stats(self):
+        """Return vector counts per namespace"""
+        return self.vectorstore.describe_index_stats()
+
+    def delete_all_vectors(self, namespace=DEFAULT_NAMESPACE):
+        """Delete all vectors in a namespace"""
+        try:
+            self.vectorstore.delete(delete_all=True, namespace=namespace)
+            logger.info(f"Successfully deleted all vectors from local index namespace '{namespace}'")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting vectors: {e}")
+            return False
+
+    def delete_vectors_by_ids(self, ids, namespace=DEFAULT_NAMESPACE):
+        """Delete specific vectors by their IDs"""
+        try:
+            self.vectorstore.delete(ids=ids, namespace=namespace)
+            logger.info(f"Successfully deleted {len(ids)} vectors")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting vectors: {e}")
+            return False
@@ -0,0 +1,120 @@
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    """
+    Collapse whitespace so trivially different copies of a chunk share a key
+    """
+    return " ".join(text.split())
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_vector_id(source, chunk):
+    """
+    Stable vector ID for a chunk: the same text from the same source always
+    maps to the same ID, so unchanged chunks can be skipped on re-upload
+    """
+    return f"{_digest(source)[:16]}-{_digest(normalize_text(chunk))[:32]}"
+
+class ManifestStore:
+    """
+    Local record of which vector IDs each source document currently owns.
+    One directory per namespace and one JSON file per source, written atomically.
+    """
+    def __init__(self, directory=".cache/manifests"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _namespace_dir(self, namespace):
+        return self.directory / _digest(namespace)[:16]
+
+    def _path(self, source, namespace):
+        return self._namespace_dir(namespace) / f"{_digest(source)}.json"
+
+    def load(self, source, namespace=""):
+        """
+        Return the manifest for source, or an empty one if it was never ingested
+        """
+        path = self._path(source, namespace)
+        if not path.exists():
+            return {"source": source, "namespace": namespace, "ids": [], "version": 0}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading manifest for {source}: {e}")
+            return {"source": source, "namespace": namespace, "ids": [], "version": 0}
+
+    def save(self, source, ids, version, namespace=""):
+        """
+        Record the full set of vector IDs for source
+        """
+        manifest = {
+            "source": source,
+            "namespace": namespace,
+            "ids": sorted(ids),
+            "version": version,
+            "updated_at": time.time()
+        }
+        path = self._path(source, namespace)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+        return manifest
+
+    def delete(self, source, namespace=""):
+        """
+        Forget a source
+        """
+        self._path(source, namespace).unlink(missing_ok=True)
+
+    def remove_ids(self, ids, namespace=""):
+        """
+        Drop vector IDs deleted outside a source-level delete from whichever
+        manifests own them, so the next incremental ingest re-adds those chunks.
+        Returns the affected sources.
+        """
+        ids = set(ids)
+        sources = []
+        for manifest in self.list_sources(namespace):
+            remaining = [vector_id for vector_id in manifest["ids"] if vector_id not in ids]
+            if len(remaining) == len(manifest["ids"]):
+                continue
+            if remaining:
+                self.save(manifest["source"], remaining, manifest["version"] + 1, namespace)
+            else:
+                self.delete(manifest["source"], namespace)
+            sources.append(manifest["source"])
+        return sources
+
+    def clear(self, namespace=None):
+        """
+        Forget every source in namespace, or in all namespaces if None,
+        e.g. after the vectors were wiped
+        """
+        pattern = "*/*.json" if namespace is None else f"{self._namespace_dir(namespace).name}/*.json"
+        for path in self.directory.glob(pattern):
+            path.unlink(missing_ok=True)
+
+    def list_sources(self, namespace=""):
+        """
+        Return the manifests of every source ingested into namespace
+        """
+        manifests = []
+        for path in sorted(self._namespace_dir(namespace).glob("*.json")):
+            try:
+                with open(path) as f:
+                    manifests.append(json.load(f))
+            except Exception as e:
+                logger.error(f"Error reading manifest {path}: {e}")
+        return manifests
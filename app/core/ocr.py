@@ -0,0 +1,181 @@
+from .metrics import ITEMS, observe_stage, record_cache
+from pathlib import Path
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() == "true"
+# Pages whose text layer has fewer characters than this are OCRed
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", ".cache/ocr.sqlite3")
+
+# Set once per process by ocr_available()
+_available = None
+# Worker processes keep the last document open between its pages
+_document = None
+# ... and one OCR cache connection for all of them
+_cache = None
+
+def ocr_available():
+    """
+    Whether pages can be OCRed here: pytesseract installed and the
+    tesseract binary on PATH. Checked once per process.
+    """
+    global _available
+    if _available is None:
+        if not OCR_ENABLED:
+            _available = False
+        else:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                _available = True
+            except Exception as e:
+                logger.warning(f"OCR unavailable ({e}); pages without a text layer will be empty")
+                _available = False
+    return _available
+
+def needs_ocr(page_text):
+    return len(page_text.strip()) < OCR_MIN_CHARS
+
+class OcrCache:
+    """
+    Recognized text keyed by a hash of the rendered page image (plus DPI and
+    language), shared in SQLite by the worker processes, so re-uploading a
+    scanned document skips OCR for every page it has seen
+    """
+    def __init__(self, db_path=OCR_CACHE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Several worker processes write concurrently; wait for the lock. In
+        # process, pages of one document may be OCRed from different threads.
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages (key, text, created_at) VALUES (?, ?, ?)", (key, text, time.time())
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+class OcrStats:
+    """
+    OCR work for one document; pages_per_second is measured over the wall
+    time from the first OCR task to the last result, so it reflects the
+    parallel speed rather than per-page latency
+    """
+    def __init__(self):
+        self.pages = 0
+        self.cached = 0
+        self.failed = 0
+        self.cpu_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def started(self):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def add(self, result):
+        """Account for one (text, cached, seconds, error) result from ocr_page"""
+        _, cached, seconds, error = result
+        self.pages += 1
+        self.cached += cached
+        self.failed += error is not None
+        self.cpu_seconds += seconds
+        self.finished_at = time.perf_counter()
+        observe_stage("ocr", seconds)
+        record_cache("ocr", cached)
+        ITEMS.inc(kind="ocr_pages")
+
+    @property
+    def wall_seconds(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def to_dict(self):
+        wall = self.wall_seconds
+        return {
+            "pages": self.pages,
+            "cached": self.cached,
+            "failed": self.failed,
+            "pages_per_second": round(self.pages / wall, 2) if wall > 0 else None,
+            "seconds_per_page": round(self.cpu_seconds / self.pages, 3) if self.pages else None,
+        }
+
+def _open_document(pdf_path):
+    global _document
+    import pypdfium2
+
+    if _document is None or _document[0] != pdf_path:
+        if _document is not None:
+            _document[1].close()
+        _document = (pdf_path, pypdfium2.PdfDocument(pdf_path))
+    return _document[1]
+
+def _open_cache(cache_path):
+    global _cache
+    if _cache is None or _cache[0] != cache_path:
+        if _cache is not None:
+            _cache[1].close()
+        _cache = (cache_path, OcrCache(cache_path))
+    return _cache[1]
+
+def close_document():
+    """Release the document and OCR cache kept open in this process"""
+    global _document, _cache
+    if _document is not None:
+        _document[1].close()
+        _document = None
+    if _cache is not None:
+        _cache[1].close()
+        _cache = None
+
+def ocr_page(pdf_path, page_number, dpi=OCR_DPI, language=OCR_LANGUAGE, cache_path=OCR_CACHE_PATH):
+    """
+    Render one page with pypdfium2 and recognize its text with tesseract,
+    consulting the OCR cache first. Runs in a worker process.
+    Returns (text, cached, seconds, error).
+    """
+    start = time.perf_counter()
+    try:
+        page = _open_document(pdf_path)[page_number - 1]
+        try:
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+        finally:
+            page.close()
+        digest = hashlib.sha256(image.tobytes()).hexdigest()
+        key = f"{digest}:{image.width}x{image.height}:{dpi}:{language}"
+        cache = _open_cache(cache_path) if cache_path else None
+        text = cache.get(key) if cache is not None else None
+        if text is not None:
+            return text, True, time.perf_counter() - start, None
+
+        import pytesseract
+        # Tesseract ends each page with a form feed
+        text = pytesseract.image_to_string(image, lang=language).replace("\x0c", "").strip()
+        if cache is not None:
+            cache.put(key, text)
+        return text, False, time.perf_counter() - start, None
+    except Exception as e:
+        logger.error(f"OCR failed on page {page_number}: {e}")
+        return "", False, time.perf_counter() - start, str(e)
@@ -1,35 +1,170 @@
 import pdfplumber
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from .chunker import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, PAGE_SEPARATOR, iter_token_chunks
+from .ocr import OcrStats, close_document, needs_ocr, ocr_available, ocr_page
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+def get_page_count(pdf_path):
+    """
+    Return the number of pages in a PDF file
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0
+
+def _page_text(page):
+    """
+    Page text with its layout structure kept: lines of a paragraph are
+    joined with newlines, and paragraphs are separated by a blank line.
+    A new paragraph starts at an unusually large vertical gap or where the
+    font size changes to or from a heading size.
+    """
+    lines = [line for line in page.extract_text_lines(return_chars=True) if line["text"].strip()]
+    if not lines:
+        return page.extract_text() or ""
+    sizes = [sum(char["size"] for char in line["chars"]) / len(line["chars"]) for line in lines]
+    body_size = _median(sizes)
+    gaps = [line["top"] - previous["bottom"] for previous, line in zip(lines, lines[1:])]
+    paragraph_gap = max(1.8 * _median(gaps), 0.5 * body_size)
+
+    paragraphs = [[lines[0]["text"]]]
+    heading = sizes[0] > 1.15 * body_size
+    for previous, line, gap, size in zip(lines, lines[1:], gaps, sizes[1:]):
+        is_heading = size > 1.15 * body_size
+        if gap > paragraph_gap or is_heading != heading or line["top"] < previous["top"]:
+            paragraphs.append([])
+        paragraphs[-1].append(line["text"])
+        heading = is_heading
+    return "\n\n".join("\n".join(paragraph) for paragraph in paragraphs)
+
+def _extract_page_range(pdf_path, start, stop):
+    """
+    Extract text from pages [start, stop) of a PDF file.
+    Runs inside a worker process, so it opens its own handle on the file.
+    """
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i in range(start, stop):
+            page = pdf.pages[i]
+            try:
+                page_text = _page_text(page)
+            except Exception as e:
+                logger.error(f"Error on page {i+1}: {e}")
+                page_text = ""
+            finally:
+                # Drop the parsed layout so memory doesn't grow with the page count
+                page.close()
+            pages.append((i + 1, page_text))
+    return pages
+
+def iter_pdf_pages(pdf_path, max_workers=None, pages_per_task=8, ocr_stats=None):
+    """
+    Yield (page_number, page_text) tuples in page order.
+    Page ranges are extracted in a process pool; only a bounded window of
+    ranges is in flight at once so memory doesn't scale with the document.
+    Pages without a text layer (scans) are rendered and OCRed one page per
+    task in the same pool when OCR is available (see ocr.py); ocr_stats, an
+    OcrStats, collects their count and pages/s.
+    """
+    page_count = get_page_count(pdf_path)
+    ranges = [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    ocr = ocr_available()
+    ocr_stats = ocr_stats if ocr_stats is not None else OcrStats()
+    # OCR parallelizes per page, so even a short scan can use every worker
+    max_workers = min(max_workers or os.cpu_count() or 1, page_count if ocr else len(ranges))
+    skipped = 0
+
+    def ocr_result(page_number, result):
+        ocr_stats.add(result)
+        return page_number, result[0]
+
+    if max_workers <= 1:
+        try:
+            for start, stop in ranges:
+                for page_number, page_text in _extract_page_range(pdf_path, start, stop):
+                    if needs_ocr(page_text) and ocr:
+                        ocr_stats.started()
+                        page_number, page_text = ocr_result(page_number, ocr_page(pdf_path, page_number))
+                    elif needs_ocr(page_text):
+                        skipped += 1
+                    yield page_number, page_text
+        finally:
+            close_document()
+        _log_skipped(skipped)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        remaining = deque(ranges)
+        extracting = deque()
+        # Pages in order: text, or a pending OCR future
+        pages = deque()
+
+        def expand(extracted):
+            nonlocal skipped
+            for page_number, page_text in extracted:
+                if needs_ocr(page_text) and ocr:
+                    ocr_stats.started()
+                    pages.append((page_number, executor.submit(ocr_page, pdf_path, page_number)))
+                else:
+                    skipped += needs_ocr(page_text)
+                    pages.append((page_number, page_text))
+
+        while remaining or extracting or pages:
+            while remaining and len(extracting) < max_workers * 2 and len(pages) < max_workers * 4:
+                start, stop = remaining.popleft()
+                extracting.append(executor.submit(_extract_page_range, pdf_path, start, stop))
+            # Queue OCR for finished ranges before waiting on earlier pages
+            while extracting and (extracting[0].done() or not pages):
+                expand(extracting.popleft().result())
+            page_number, page = pages.popleft()
+            if isinstance(page, Future):
+                yield ocr_result(page_number, page.result())
+            else:
+                yield page_number, page
+    _log_skipped(skipped)
+
+def _log_skipped(skipped):
+    if skipped:
+        logger.warning(f"{skipped} pages have no text layer and OCR is unavailable; they are left empty")
+
 # Function to extract text from a PDF file
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_pdf(pdf_path, max_workers=None):
     """
-    Extract text from PDF file using pdfplumber
+    Extract text from PDF file using pdfplumber, OCRing pages that have no
+    text layer
     """
     try:
         logger.info(f"Opening PDF file: {pdf_path}")
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                try:
-                    page_text = page.extract_text() or ""
-                    text += page_text + "\n"
-                    logger.info(f"Page {i+1}: extracted {len(page_text)} characters")
-                    if len(page_text) > 0:
-                        logger.info(f"Sample from page {i+1}: {page_text[:100]}...")
-                except Exception as e:
-                    logger.error(f"Error on page {i+1}: {e}")
-                    continue
+        page_texts = []
+        debug = logger.isEnabledFor(logging.DEBUG)
+        ocr_stats = OcrStats()
+        for page_number, page_text in iter_pdf_pages(pdf_path, max_workers=max_workers, ocr_stats=ocr_stats):
+            page_texts.append(page_text)
+            if debug:
+                logger.debug(f"Page {page_number}: extracted {len(page_text)} characters")
+                if len(page_text) > 0:
+                    logger.debug(f"Sample from page {page_number}: {page_text[:100]}...")
+        text = PAGE_SEPARATOR.join(page_texts) + PAGE_SEPARATOR if page_texts else ""
 
         if not text.strip():
             logger.error("No text could be extracted from the PDF")
             raise ValueError("PDF appears to be empty or unreadable")
 
         logger.info(f"Total extracted: {len(text)} characters")
-        logger.info(f"Sample of extracted text: {text[:200]}...")
+        if ocr_stats.pages:
+            logger.info(f"OCR: {ocr_stats.to_dict()}")
+        if debug:
+            logger.debug(f"Sample of extracted text: {text[:200]}...")
         return text
 
     except Exception as e:
@@ -37,49 +172,26 @@ def extract_text_from_pdf(pdf_path):
         raise
 
 # Function to chunk text
-def chunk_text(text, chunk_size=1000, chunk_overlap=200):
+def chunk_text(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
     """
-    Split text into overlapping chunks of specified size
+    Split text into token-bounded chunks along paragraph and sentence boundaries
     """
     try:
         if not text or not text.strip():
             logger.error("No text provided for chunking")
             return []
-            
-        # Clean the text
-        text = " ".join(text.split())
-        
-        # Adjust chunk size for document length
-        text_length = len(text)
-        if text_length < chunk_size:
-            chunk_size = max(100, text_length // 3)  # Smaller chunks for small docs
-            chunk_overlap = chunk_size // 3
-        
-        logger.info(f"Using chunk_size: {chunk_size}, overlap: {chunk_overlap}")
-        
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ".", " ", ""]  # More granular separators
-        )
-        
-        chunks = text_splitter.split_text(text)
-        
-        # Post-process chunks
-        processed_chunks = []
-        for chunk in chunks:
-            # Clean chunk
-            chunk = chunk.strip()
-            if len(chunk) > 50:  # Only keep substantial chunks
-                processed_chunks.append(chunk)
-        
-        logger.info(f"Created {len(processed_chunks)} non-empty chunks")
-        
-        if processed_chunks:
-            logger.info(f"First chunk sample: {processed_chunks[0][:200]}...")
-            
-        return processed_chunks
+
+        chunks = [chunk.text for chunk in iter_token_chunks([(1, text)], chunk_tokens, overlap_tokens)]
+        logger.info(f"Created {len(chunks)} chunks of up to {chunk_tokens} tokens")
+        return chunks
     except Exception as e:
         logger.error(f"Error chunking text: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def iter_chunks(pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, align_pages=False):
+    """
+    Stream Chunk objects (text plus page numbers, character offsets and
+    token count) out of an iterable of (page_number, page_text) pairs,
+    holding at most one chunk's worth of text at a time; see iter_token_chunks
+    """
+    return iter_token_chunks(pages, chunk_tokens, overlap_tokens, align_pages=align_pages)
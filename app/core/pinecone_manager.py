@@ -1,9 +1,8 @@
-from langchain_openai import OpenAIEmbeddings
-#from langchain.vectorstores import Pinecone
-from langchain_community.vectorstores import Pinecone
 from pinecone import Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
 from langchain_core.documents import Document
+from .vector_backends import DEFAULT_NAMESPACE, EMBEDDING_DIMENSION, build_embeddings
+from .upsert_engine import UpsertEngine
 import logging
 import time
 
@@ -14,20 +13,20 @@ import os
 load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-# Initialize embeddings
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+INDEX_STATS_TTL = float(os.getenv("INDEX_STATS_TTL", "30"))
 
 class PineconeManager:
     def __init__(self, index_name="doctalk"):
         self.index_name = index_name
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+        self.embeddings = build_embeddings()
         # Create index if it doesn't exist
         self._create_index_if_not_exists()
+        # One index handle for the life of the manager
+        self.index = self.pc.Index(self.index_name)
+        self._stats = None
+        self._stats_at = 0.0
+        self._upserts = []
         self.vectorstore = self.initialize_pinecone_index()
 
     def _create_index_if_not_exists(self):
@@ -40,15 +39,14 @@ class PineconeManager:
                 logger.info(f"Creating new index: {self.index_name}")
                 self.pc.create_index(
                     name=self.index_name,
-                    dimension=1536,
+                    dimension=EMBEDDING_DIMENSION,
                     metric='cosine',
                     spec=ServerlessSpec(
                         cloud="aws",
                         region="us-east-1"
                     )
                 )
-                # Wait for index to be ready
-                time.sleep(5)
+                self._wait_until_ready()
             else:
                 logger.info(f"Index {self.index_name} already exists")
                 
@@ -56,35 +54,73 @@ class PineconeManager:
             logger.error(f"Error creating index: {e}")
             raise
 
+    def _wait_until_ready(self, timeout=60.0):
+        """Poll a newly created index until it can serve requests"""
+        deadline = time.monotonic() + timeout
+        delay = 0.2
+        while time.monotonic() < deadline:
+            if self.pc.describe_index(self.index_name).status["ready"]:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+        logger.warning(f"Index {self.index_name} not ready after {timeout:.0f}s")
+
     def initialize_pinecone_index(self):
         """Initialize Pinecone vector store"""
         try:
+            # One store serves every namespace; callers pass namespace= per call
             return PineconeVectorStore(
-                index_name=self.index_name,
+                index=self.index,
                 embedding=self.embeddings,
-                namespace=""  # Add default namespace
+                namespace=DEFAULT_NAMESPACE
             )
         except Exception as e:
             logger.error(f"Error initializing vector store: {e}")
             raise
 
-    def delete_all_vectors(self):
-        """Delete all vectors from the index"""
+    def upserter(self, namespace=DEFAULT_NAMESPACE, on_stored=None, on_progress=None, **options):
+        """
+        Start a batched, concurrent, retrying upsert into namespace (see
+        UpsertEngine); submit documents to it and close() it when done
+        """
+        def upsert(vectors):
+            self.index.upsert(vectors=vectors, namespace=namespace)
+            self._stats = None
+
+        engine = UpsertEngine(self.embeddings, upsert, on_stored=on_stored, on_progress=on_progress, **options)
+        self._upserts = [active for active in self._upserts if active.finished_at is None] + [engine]
+        return engine
+
+    def upsert_progress(self):
+        """Progress of the upserts still running"""
+        return [engine.progress() for engine in self._upserts if engine.finished_at is None]
+
+    def describe_index_stats(self, max_age=INDEX_STATS_TTL):
+        """Return vector counts per namespace, cached for max_age seconds"""
+        if self._stats is None or time.monotonic() - self._stats_at > max_age:
+            self._stats = self.index.describe_index_stats().to_dict()
+            self._stats_at = time.monotonic()
+        return self._stats
+
+    def delete_all_vectors(self, namespace=DEFAULT_NAMESPACE):
+        """Delete all vectors in a namespace"""
         try:
-            index = self.pc.Index(self.index_name)
-            index.delete(delete_all=True, namespace="")  # Specify namespace
-            logger.info(f"Successfully deleted all vectors from index {self.index_name}")
+            self.index.delete(delete_all=True, namespace=namespace)
+            self._stats = None
+            logger.info(f"Successfully deleted all vectors from index {self.index_name} namespace '{namespace}'")
             return True
         except Exception as e:
             logger.error(f"Error deleting vectors: {e}")
             return False  # Return False instead of raising
 
-    def delete_vectors_by_ids(self, ids):
+    def delete_vectors_by_ids(self, ids, namespace=DEFAULT_NAMESPACE):
         """Delete specific vectors by their IDs"""
         try:
-            index = self.pc.Index(self.index_name)
-            index.delete(ids=ids, namespace="")  # Specify namespace
-            logger.info(f"Successfully deleted vectors with IDs: {ids}")
+            # Pinecone accepts at most 1000 IDs per delete request
+            for start in range(0, len(ids), 1000):
+                self.index.delete(ids=ids[start:start + 1000], namespace=namespace)
+            self._stats = None
+            logger.info(f"Successfully deleted {len(ids)} vectors")
             return True
         except Exception as e:
             logger.error(f"Error deleting vectors: {e}")
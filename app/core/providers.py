@@ -0,0 +1,60 @@
+from dotenv import load_dotenv
+import logging
+import os
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "live" uses OpenAI / ElevenLabs; "local" swaps in the deterministic offline
+# stand-ins from local_providers. Each component can be overridden on its own
+# with LLM_PROVIDER, EMBEDDING_PROVIDER or TTS_PROVIDER.
+PROVIDERS = os.getenv("PROVIDERS", "live").lower()
+
+def provider_for(component):
+    """Provider ("live" or "local") configured for a component"""
+    provider = os.getenv(f"{component.upper()}_PROVIDER", PROVIDERS).lower()
+    if provider not in ("live", "local"):
+        raise ValueError(f"Unknown {component} provider: {provider}. Use 'live' or 'local'")
+    return provider
+
+def build_llm():
+    """
+    Create the chat model used to answer questions
+    """
+    if provider_for("llm") == "local":
+        from .local_providers import FakeChatModel
+        logger.info("Using local fake LLM")
+        return FakeChatModel(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0.3")),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50")),
+            answer_tokens=int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "80"))
+        )
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model="gpt-4",
+        temperature=0.3,  # Slightly increased for more natural responses
+        stream_usage=True  # Report token usage on the last streamed chunk
+    )
+
+def build_tts():
+    """
+    Create the text-to-speech client (the live one validates its API key)
+    """
+    if provider_for("tts") == "local":
+        from .local_providers import SilentTTS
+        logger.info("Using local silent TTS")
+        return SilentTTS(
+            latency=float(os.getenv("FAKE_TTS_LATENCY", "0.2")),
+            max_concurrency=int(os.getenv("TTS_SENTENCE_CONCURRENCY", "4"))
+        )
+    from .text_to_speech import ElevenLabsTTS
+    from .audio_cache import AudioCache
+    return ElevenLabsTTS(
+        api_key=os.getenv("ELEVEN_LABS_API_KEY"),
+        cache=AudioCache(
+            os.getenv("TTS_CACHE_DIR", ".cache/tts"),
+            max_bytes=int(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024
+        ),
+        max_concurrency=int(os.getenv("TTS_SENTENCE_CONCURRENCY", "4"))
+    )
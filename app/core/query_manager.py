@@ -1,16 +1,19 @@
-from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain_core.prompts import PromptTemplate
+from .providers import build_llm
+from .metrics import record_usage
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize the language model
-llm = ChatOpenAI(
-    model="gpt-4",
-    temperature=0.3  # Slightly increased for more natural responses
-)
+# The language model (OpenAI, or the offline stand-in with PROVIDERS=local),
+# built on first use so importing this module stays cheap
+_llm = None
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        _llm = build_llm()
+    return _llm
 
 # Enhanced prompt template for better and more consistent responses
 CUSTOM_PROMPT = """You are DocTalk, an intelligent and helpful AI assistant that specializes in analyzing and explaining PDF documents. You have access to portions of a PDF document through the context provided below.
@@ -42,46 +45,72 @@ Remember to:
 
 Answer: """
 
-def setup_retrieval_chain(vectorstore):
+# Rewrites a follow-up into a question retrieval can answer on its own; the
+# question comes last so the offline model echoes it
+CONDENSE_PROMPT = """Given a conversation about a PDF document and a follow-up question, rewrite the follow-up as one standalone question that can be understood without the conversation. Keep the names, numbers and terms from the conversation that the follow-up refers to. Return only the question.
+
+Summary of the earlier conversation:
+{summary}
+
+Recent exchanges:
+{exchanges}
+
+Follow-up question:
+
+{question}"""
+
+# Folds the oldest exchanges into the running summary, one step at a time
+SUMMARY_PROMPT = """Progressively summarize a conversation about a PDF document. Extend the current summary with the new exchanges and return the new summary in at most {max_words} words, keeping the facts, names and numbers later questions may refer to.
+
+Current summary:
+{summary}
+
+New exchanges:
+
+{exchanges}"""
+
+def format_exchanges(turns):
+    return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns) or "(none)"
+
+async def acondense_question(question, summary, turns):
     """
-    Set up a retrieval chain for question answering using the provided vector store
+    Rewrite a follow-up question as a standalone one from the conversation
+    summary and the recent (question, answer) turns
     """
-    try:
-        qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=llm,
-            retriever=vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 6}  # Increased for better context
-            ),
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": PromptTemplate.from_template(CUSTOM_PROMPT)}
-        )
-        
-        logger.info("Retrieval chain setup successfully")
-        return qa_chain
-    
-    except Exception as e:
-        logger.error(f"Error setting up retrieval chain: {e}")
-        raise
-
-def get_answer(qa_chain, question, chat_history=[]):
+    prompt = CONDENSE_PROMPT.format(summary=summary or "(none)", exchanges=format_exchanges(turns), question=question)
+    response = await get_llm().ainvoke(prompt)
+    record_usage(response.usage_metadata)
+    return response.content.strip() or question
+
+async def asummarize_turns(summary, turns, max_words):
+    """
+    Extend a rolling conversation summary with the given (question, answer) turns
+    """
+    prompt = SUMMARY_PROMPT.format(max_words=max_words, summary=summary or "(none)", exchanges=format_exchanges(turns))
+    response = await get_llm().ainvoke(prompt)
+    record_usage(response.usage_metadata)
+    return response.content.strip()
+
+def build_prompt(question, documents):
+    """
+    Fill the QA prompt with retrieved documents (plain str.format, the same
+    rendering PromptTemplate does, without importing it at startup)
+    """
+    context = "\n\n".join(doc.page_content for doc in documents)
+    return CUSTOM_PROMPT.format(context=context, question=question)
+
+async def agenerate_answer(question, documents):
+    """
+    Answer a question from already-retrieved documents with a single LLM
+    call, awaited without holding a thread
+    """
+    response = await get_llm().ainvoke(build_prompt(question, documents))
+    record_usage(response.usage_metadata)
+    return response.content
+
+async def astream_answer(question, documents):
     """
-    Get answer for a question using the retrieval chain
+    Stream the answer for already-retrieved documents as LLM message chunks
     """
-    try:
-        # Get response from the chain
-        response = qa_chain({"question": question, "chat_history": chat_history})
-        
-        # Extract answer and source documents
-        answer = response["answer"]
-        source_docs = response["source_documents"]
-        
-        # Log sources used for the answer
-        sources = [doc.metadata.get('source', 'Unknown') for doc in source_docs]
-        logger.info(f"Sources used for answer: {sources}")
-        
-        return answer, source_docs
-    
-    except Exception as e:
-        logger.error(f"Error getting answer: {e}")
-        return f"Error: {str(e)}", [] 
\ No newline at end of file
+    async for chunk in get_llm().astream(build_prompt(question, documents)):
+        yield chunk
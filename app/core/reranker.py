@@ -0,0 +1,238 @@
+from .chunker import count_tokens
+from .context_packer import CONTEXT_TOKEN_BUDGET
+from .lexical_index import tokenize
+import numpy as np
+import logging
+import os
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+# Candidates retrieved for reranking, and how many of them reach the prompt
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "24"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "6"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+# Scoring stops after the batch that crosses this; the rest keep retrieval order
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "50"))
+# Candidates whose final score is below this share of the best one's are dropped;
+# empty: the scorer's default (off for the lexical scorer)
+RERANK_MIN_RELATIVE_SCORE = os.getenv("RERANK_MIN_RELATIVE_SCORE", "")
+# The best retrieval hits are never dropped, however they rescore
+RERANK_PROTECTED_HITS = int(os.getenv("RERANK_PROTECTED_HITS", "2"))
+# Weight of the retrieval rank in the final score (the rest is the reranker's relevance)
+RERANK_RETRIEVAL_WEIGHT = float(os.getenv("RERANK_RETRIEVAL_WEIGHT", "0.3"))
+# Empty: the lexical scorer; otherwise a sentence-transformers cross-encoder,
+# e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+
+class LexicalOverlapScorer:
+    """
+    Relevance in [0, 1] from term overlap, computed for a batch of
+    candidates at once over a (candidates x query terms) count matrix:
+    saturated BM25 with IDF taken over the batch, the IDF-weighted share of
+    query terms present, and the share of query bigrams found as phrases.
+    A chunk the embedding found for a paraphrase shares few words with the
+    question, so scores are only used to reorder, not to drop candidates.
+    """
+    name = "lexical"
+    min_relative_score = 0.0
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query, texts):
+        query_terms = tokenize(query)
+        columns = {term: i for i, term in enumerate(dict.fromkeys(query_terms))}
+        if not columns or not texts:
+            return np.zeros(len(texts), dtype=np.float32)
+        query_bigrams = set(zip(query_terms, query_terms[1:]))
+        counts = np.zeros((len(texts), len(columns)), dtype=np.float32)
+        lengths = np.empty(len(texts), dtype=np.float32)
+        phrases = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths[row] = len(terms)
+            for term in terms:
+                column = columns.get(term)
+                if column is not None:
+                    counts[row, column] += 1
+            if query_bigrams:
+                phrases[row] = len(query_bigrams.intersection(zip(terms, terms[1:]))) / len(query_bigrams)
+
+        present = counts > 0
+        df = present.sum(axis=0)
+        idf = np.log1p((len(texts) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norms = self.k1 * (1 - self.b + self.b * lengths / max(float(lengths.mean()), 1.0))
+        bm25 = (counts * (self.k1 + 1) / (counts + norms[:, None])) @ idf
+        coverage = (present @ idf) / max(float(idf.sum()), 1e-6)
+        return 0.5 * bm25 / (bm25 + 2.0) + 0.35 * coverage + 0.15 * phrases
+
+class CrossEncoderScorer:
+    """
+    Relevance from a small cross-encoder run on CPU (needs
+    sentence-transformers); logits are squashed to [0, 1]
+    """
+    min_relative_score = 0.2
+
+    def __init__(self, model_name, batch_size=RERANK_BATCH_SIZE):
+        from sentence_transformers import CrossEncoder
+
+        self.name = model_name
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query, texts):
+        logits = np.asarray(self.model.predict([(query, text) for text in texts], batch_size=self.batch_size))
+        return 1.0 / (1.0 + np.exp(-logits))
+
+class RerankStats:
+    """
+    What reranking did to one request's candidates
+    """
+    def __init__(self, budget_ms):
+        self.candidates = 0
+        self.scored = 0
+        self.kept = 0
+        self.dropped_irrelevant = 0
+        self.dropped_over_budget = 0
+        self.batches = 0
+        self.latency_ms = 0.0
+        self.budget_ms = budget_ms
+
+    def to_dict(self):
+        return {
+            "candidates": self.candidates,
+            "scored": self.scored,
+            "kept": self.kept,
+            "dropped_irrelevant": self.dropped_irrelevant,
+            "dropped_over_budget": self.dropped_over_budget,
+            "batches": self.batches,
+            "latency_ms": round(self.latency_ms, 2),
+            "budget_ms": self.budget_ms,
+            "within_budget": self.latency_ms <= self.budget_ms,
+        }
+
+class Reranker:
+    """
+    Rescores over-fetched retrieval candidates before they reach the LLM:
+    - candidates are scored in batches (best retrieved first) until
+      latency_budget_ms is spent; unscored ones keep their retrieval order
+      behind the scored ones
+    - the final score blends the scorer's relevance with the retrieval rank
+    - candidates whose final score is far below the best one's are dropped
+      (min_relative_score, defaulting to the scorer's), except the first
+      protected_hits retrieval hits, which are always kept
+    - at most top_n are kept, best first, within token_budget tokens
+    """
+    def __init__(self, scorer, candidates=RERANK_CANDIDATES, top_n=RERANK_TOP_N, batch_size=RERANK_BATCH_SIZE,
+                 latency_budget_ms=RERANK_LATENCY_BUDGET_MS, min_relative_score=None,
+                 protected_hits=RERANK_PROTECTED_HITS, retrieval_weight=RERANK_RETRIEVAL_WEIGHT,
+                 token_budget=CONTEXT_TOKEN_BUDGET):
+        self.scorer = scorer
+        self.candidates = candidates
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        if min_relative_score is None:
+            min_relative_score = getattr(scorer, "min_relative_score", 0.0)
+        self.min_relative_score = min_relative_score
+        self.protected_hits = min(protected_hits, top_n)
+        self.retrieval_weight = retrieval_weight
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.over_budget = 0
+        self.total_ms = 0.0
+        self.candidates_in = 0
+        self.kept_out = 0
+
+    def rerank(self, question, matches):
+        """
+        Rerank [(document, score), ...] in retrieval order.
+        Returns ([(document, rerank score), ...], RerankStats).
+        """
+        start = time.perf_counter()
+        stats = RerankStats(self.latency_budget_ms)
+        stats.candidates = len(matches)
+        relevance = np.zeros(len(matches), dtype=np.float32)
+        for offset in range(0, len(matches), self.batch_size):
+            if offset and (time.perf_counter() - start) * 1000 > self.latency_budget_ms:
+                break
+            batch = matches[offset:offset + self.batch_size]
+            relevance[offset:offset + len(batch)] = self.scorer.score(question, [doc.page_content for doc, _ in batch])
+            stats.scored += len(batch)
+            stats.batches += 1
+
+        prior = 1.0 - np.arange(len(matches), dtype=np.float32) / max(len(matches), 1)
+        final = (1 - self.retrieval_weight) * relevance + self.retrieval_weight * prior
+        scored = np.arange(len(matches)) < stats.scored
+        # Scored candidates first by final score, then the rest in retrieval order
+        order = sorted(range(len(matches)), key=lambda i: (not scored[i], -final[i] if scored[i] else i))
+        position = {i: rank for rank, i in enumerate(order)}
+        best = float(final[:stats.scored].max()) if stats.scored else 0.0
+        protected = list(range(min(self.protected_hits, len(matches))))
+
+        # Protected hits claim their places (and tokens) first
+        kept = []
+        tokens = 0
+        for i in protected + [i for i in order if i >= len(protected)]:
+            if len(kept) >= self.top_n:
+                break
+            doc = matches[i][0]
+            if i >= len(protected) and scored[i] and final[i] < self.min_relative_score * best:
+                stats.dropped_irrelevant += 1
+                continue
+            doc_tokens = doc.metadata.get("tokens") or count_tokens(doc.page_content)
+            if kept and tokens + doc_tokens > self.token_budget:
+                stats.dropped_over_budget += 1
+                continue
+            kept.append(i)
+            tokens += doc_tokens
+        kept.sort(key=position.get)
+        kept = [(matches[i][0], float(final[i])) for i in kept]
+        stats.kept = len(kept)
+        stats.latency_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.requests += 1
+            self.total_ms += stats.latency_ms
+            self.candidates_in += stats.candidates
+            self.kept_out += stats.kept
+            if stats.latency_ms > self.latency_budget_ms:
+                self.over_budget += 1
+        if stats.latency_ms > self.latency_budget_ms:
+            logger.warning(f"Reranking took {stats.latency_ms:.1f}ms (budget {self.latency_budget_ms:g}ms)")
+        return kept, stats
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scorer": self.scorer.name,
+                "candidates": self.candidates,
+                "top_n": self.top_n,
+                "latency_budget_ms": self.latency_budget_ms,
+                "min_relative_score": self.min_relative_score,
+                "protected_hits": self.protected_hits,
+                "requests": self.requests,
+                "over_budget": self.over_budget,
+                "mean_latency_ms": round(self.total_ms / self.requests, 2) if self.requests else None,
+                "kept_ratio": round(self.kept_out / self.candidates_in, 3) if self.candidates_in else None,
+            }
+
+def create_reranker():
+    """
+    The reranker for the ask pipeline: a cross-encoder when RERANK_MODEL is
+    set and sentence-transformers is installed, otherwise the lexical scorer
+    """
+    scorer = None
+    if RERANK_MODEL:
+        try:
+            scorer = CrossEncoderScorer(RERANK_MODEL)
+        except Exception as e:
+            logger.warning(f"Cross-encoder {RERANK_MODEL} unavailable ({e}); reranking with the lexical scorer")
+    min_relative_score = float(RERANK_MIN_RELATIVE_SCORE) if RERANK_MIN_RELATIVE_SCORE else None
+    return Reranker(scorer or LexicalOverlapScorer(), min_relative_score=min_relative_score)
@@ -1,6 +1,6 @@
+from .audio_decode import SAMPLE_RATE, decode_audio
 import whisper
 import logging
-import tempfile
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
@@ -20,19 +20,26 @@ class WhisperTranscriber:
             logger.error(f"Error loading Whisper model: {e}")
             raise
 
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio):
         """
-        Transcribe audio file to text
+        Transcribe audio to text
+        audio: a file path, or a 16 kHz mono float32 array (see decode_audio)
         """
         try:
-            logger.info(f"Transcribing audio file: {audio_path}")
-            result = self.model.transcribe(audio_path)
+            logger.info(f"Transcribing audio: {audio if isinstance(audio, str) else f'{len(audio) / SAMPLE_RATE:.1f}s in memory'}")
+            result = self.model.transcribe(audio)
             logger.info("Audio transcription completed")
             return result["text"].strip()
         except Exception as e:
             logger.error(f"Error transcribing audio: {e}")
             raise
 
+    def transcribe_bytes(self, data, filename=""):
+        """
+        Transcribe uploaded audio bytes without writing them to disk
+        """
+        return self.transcribe_audio(decode_audio(data, Path(filename).suffix))
+
     def transcribe_microphone(self, duration=5):
         """
         Record audio from microphone and transcribe it
@@ -40,28 +47,18 @@ class WhisperTranscriber:
         """
         try:
             import sounddevice as sd
-            import scipy.io.wavfile as wav
             import numpy as np
 
             # Record audio
             logger.info(f"Recording audio for {duration} seconds...")
-            sample_rate = 16000
+            sample_rate = SAMPLE_RATE
             recording = sd.rec(int(duration * sample_rate), 
                             samplerate=sample_rate, 
                             channels=1)
             sd.wait()
             
-            # Save recording to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-                wav.write(temp_audio.name, sample_rate, recording)
-                
-            # Transcribe the temporary file
-            text = self.transcribe_audio(temp_audio.name)
-            
-            # Clean up temporary file
-            Path(temp_audio.name).unlink()
-            
-            return text
+            # The recording is already 16 kHz float32, so hand it to Whisper directly
+            return self.transcribe_audio(recording[:, 0].astype(np.float32))
             
         except Exception as e:
             logger.error(f"Error recording/transcribing from microphone: {e}")
@@ -1,24 +1,60 @@
+from .audio_cache import AudioCache
 import requests
+import httpx
+import asyncio
 import logging
+import re
 from dotenv import load_dotenv
 import os
-import pygame
-from time import sleep
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel
+MODEL_ID = "eleven_monolingual_v1"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+def split_sentences(text, min_chars=40, max_chars=400):
+    """
+    Split text at sentence boundaries for incremental synthesis.
+    Very short sentences are merged with the next one (each request has a
+    fixed cost), and overlong ones are cut at the last space before max_chars.
+    """
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    sentences = []
+    for piece in pieces:
+        if sentences and len(sentences[-1]) < min_chars and len(sentences[-1]) + len(piece) < max_chars:
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
 class ElevenLabsTTS:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache=None, max_concurrency=4):
         if not api_key:
             raise ValueError("ElevenLabs API key is required. Please set ELEVEN_LABS_API_KEY in your .env file")
         self.api_key = api_key
         self.base_url = "https://api.elevenlabs.io/v1"
-        
-        # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
-        
+        # Synthesized audio per (voice, text), shared by sync and async paths
+        self.cache = cache
+        # Sentences of one answer synthesized at the same time
+        self.max_concurrency = max_concurrency
+        self._session = requests.Session()
+        # Pooled async HTTP client, created on first use inside the event loop
+        self._async_client = None
+
         # Validate API key on initialization
         self.validate_api_key()
 
@@ -28,77 +64,145 @@ class ElevenLabsTTS:
         """
         try:
             headers = {"xi-api-key": self.api_key}
-            response = requests.get(f"{self.base_url}/voices", headers=headers)
+            response = self._session.get(f"{self.base_url}/voices", headers=headers)
             response.raise_for_status()
             logger.info("ElevenLabs API key validated successfully")
         except Exception as e:
             logger.error(f"Invalid ElevenLabs API key: {e}")
             raise ValueError("Invalid ElevenLabs API key. Please check your API key in the .env file")
 
-    def synthesize_speech(self, text, voice_id="21m00Tcm4TlvDq8ikWAM"):  # Default voice ID (Rachel)
-        """
-        Convert text to speech using ElevenLabs API
-        """
-        if not text:
-            logger.warning("Empty text provided, skipping speech synthesis")
-            return
-
+    def _request(self, text):
         headers = {
             "xi-api-key": self.api_key,
             "Content-Type": "application/json"
         }
-        
+
         payload = {
             "text": text,
-            "model_id": "eleven_monolingual_v1",
+            "model_id": MODEL_ID,
             "voice_settings": {
                 "stability": 0.5,
                 "similarity_boost": 0.5
             }
         }
+        return headers, payload
+
+    def _client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=60.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        return self._async_client
+
+    def synthesize_speech(self, text, voice_id=DEFAULT_VOICE_ID):
+        """
+        Convert text to speech using ElevenLabs API and return the MP3 bytes
+        """
+        if not text:
+            logger.warning("Empty text provided, skipping speech synthesis")
+            return b""
+
+        if self.cache is not None:
+            audio = self.cache.get(voice_id, MODEL_ID, text)
+            if audio is not None:
+                return audio
+
+        headers, payload = self._request(text)
 
         try:
             # Make request to ElevenLabs API
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/text-to-speech/{voice_id}",
                 headers=headers,
                 json=payload
             )
             response.raise_for_status()
-            
-            # Save the audio to a file
-            with open("output.mp3", "wb") as audio_file:
-                audio_file.write(response.content)
-            logger.info("Speech synthesized successfully and saved to output.mp3")
-            
-            # Play the audio using pygame
-            try:
-                pygame.mixer.music.load("output.mp3")
-                pygame.mixer.music.play()
-                
-                # Wait for the audio to finish playing
-                while pygame.mixer.music.get_busy():
-                    sleep(0.1)
-                    
-                # Clean up
-                pygame.mixer.music.unload()
-                
-            except Exception as e:
-                logger.error(f"Error playing audio: {e}")
-                
+            logger.info("Speech synthesized successfully")
+            if self.cache is not None:
+                self.cache.put(voice_id, MODEL_ID, text, response.content)
+            return response.content
+
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
                 logger.error("Unauthorized: Please check your ElevenLabs API key")
             else:
                 logger.error(f"Error synthesizing speech: {e}")
+            raise
+
+    async def _synthesize_sentence(self, sentence, voice_id, output, semaphore):
+        """
+        Fetch one sentence, pushing audio chunks onto output as they arrive
+        and None when done; served from the cache when possible
+        """
+        try:
+            if self.cache is not None:
+                audio = await asyncio.to_thread(self.cache.get, voice_id, MODEL_ID, sentence)
+                if audio is not None:
+                    await output.put(audio)
+                    return
+
+            headers, payload = self._request(sentence)
+            parts = []
+            async with semaphore:
+                async with self._client().stream(
+                    "POST",
+                    f"/text-to-speech/{voice_id}/stream",
+                    headers=headers,
+                    json=payload
+                ) as response:
+                    if response.status_code == 401:
+                        logger.error("Unauthorized: Please check your ElevenLabs API key")
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        parts.append(chunk)
+                        await output.put(chunk)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, voice_id, MODEL_ID, sentence, b"".join(parts))
         except Exception as e:
-            logger.error(f"Error synthesizing speech: {e}")
+            await output.put(e)
+        finally:
+            await output.put(None)
 
-    def __del__(self):
+    async def stream_speech(self, text, voice_id=DEFAULT_VOICE_ID):
         """
-        Clean up pygame mixer when the object is destroyed
+        Async generator of MP3 bytes for text. Sentences are synthesized
+        concurrently (up to max_concurrency at a time) but yielded in order,
+        and the first sentence's bytes are passed on as soon as they arrive,
+        so time to first audio is one sentence's latency.
         """
+        sentences = split_sentences(text) if text else []
+        if not sentences:
+            logger.warning("Empty text provided, skipping speech synthesis")
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        outputs = [asyncio.Queue() for _ in sentences]
+        tasks = [
+            asyncio.create_task(self._synthesize_sentence(sentence, voice_id, output, semaphore))
+            for sentence, output in zip(sentences, outputs)
+        ]
         try:
-            pygame.mixer.quit()
-        except:
-            pass
\ No newline at end of file
+            for output in outputs:
+                while (chunk := await output.get()) is not None:
+                    if isinstance(chunk, Exception):
+                        logger.error(f"Error synthesizing speech: {chunk}")
+                        raise chunk
+                    yield chunk
+            logger.info(f"Streamed speech for {len(sentences)} sentences")
+        finally:
+            # Stop outstanding requests if the client went away
+            for task in tasks:
+                task.cancel()
+
+    async def asynthesize_speech(self, text, voice_id=DEFAULT_VOICE_ID):
+        """
+        Async variant of synthesize_speech built on stream_speech
+        """
+        return b"".join([chunk async for chunk in self.stream_speech(text, voice_id)])
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
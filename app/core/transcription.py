@@ -0,0 +1,247 @@
+from .concurrency import _Admission
+from .audio_decode import SAMPLE_RATE, decode_audio
+from .metrics import ITEMS, observe_stage
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing
+import asyncio
+import logging
+import os
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Clips up to one Whisper window (30 s) can share a padded batch decode
+WINDOW_SECONDS = 30
+
+# Whisper model loaded once per worker process
+_model = None
+
+def _load_model(model_name):
+    global _model
+    import whisper
+    logger.info(f"Worker {os.getpid()} loading Whisper model: {model_name}")
+    _model = whisper.load_model(model_name)
+
+def _ping():
+    return os.getpid()
+
+def _transcribe_batch(clips):
+    """
+    Transcribe [(audio bytes, suffix), ...] in a worker process.
+    Clips that fit in one window are padded to 30 s and decoded together in a
+    single batched forward pass; longer clips go through model.transcribe.
+    Returns ([{"text"} or {"error"}, ...], [audio seconds, ...]).
+    """
+    import torch
+    import whisper
+
+    results = [None] * len(clips)
+    durations = [0.0] * len(clips)
+    audios = {}
+    for i, (data, suffix) in enumerate(clips):
+        try:
+            audios[i] = decode_audio(data, suffix)
+            durations[i] = len(audios[i]) / SAMPLE_RATE
+        except Exception as e:
+            results[i] = {"error": str(e)}
+
+    fp16 = _model.device.type == "cuda"
+    short = [i for i, audio in audios.items() if len(audio) <= WINDOW_SECONDS * SAMPLE_RATE]
+    if short:
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), _model.dims.n_mels)
+            for i in short
+        ]).to(_model.device)
+        decoded = whisper.decode(_model, mel, whisper.DecodingOptions(fp16=fp16))
+        for i, result in zip(short, decoded):
+            results[i] = {"text": result.text.strip()}
+
+    for i in audios:
+        if results[i] is None:
+            try:
+                results[i] = {"text": _model.transcribe(audios[i], fp16=fp16)["text"].strip()}
+            except Exception as e:
+                results[i] = {"error": str(e)}
+    return results, durations
+
+class TranscriptionQueue(_Admission):
+    """
+    One Whisper model size served by a pool of worker processes, each with
+    the model preloaded. Requests wait in an asyncio queue; a batcher drains
+    up to max_batch clips (waiting at most batch_window seconds for more)
+    into a single worker call, so short clips share one padded decode.
+    At most one batch per worker is in flight, so batches grow under load.
+    """
+    def __init__(self, name, model_name="base", workers=1, max_batch=8, batch_window=0.05, max_queue=16):
+        super().__init__(name, workers * max_batch, max_queue)
+        self.model_name = model_name
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.batches = 0
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(model_name,)
+        )
+        self._queue = None
+        self._batcher = None
+        # Batch tasks in flight; the loop only keeps weak references to tasks
+        self._batch_tasks = set()
+
+    def warm(self):
+        """
+        Spawn every worker now so the models load before the first request
+        """
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    def _start(self):
+        # The queue and batcher belong to the event loop of the first request
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._run_batcher())
+
+    async def transcribe(self, data, suffix=".wav"):
+        """
+        Queue one clip and wait for its text
+        """
+        if self._batcher is None:
+            self._start()
+        self.admit()
+        start = time.perf_counter()
+        try:
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((data, suffix, future))
+            return await future
+        finally:
+            # Queueing, batching and decoding, as the caller sees it
+            observe_stage("stt", time.perf_counter() - start)
+            self.release()
+
+    async def _run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task):
+        self._batch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Transcription batch task crashed on queue '{self.name}': {task.exception()!r}")
+
+    async def _run_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            results, durations = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _transcribe_batch, [(data, suffix) for data, suffix, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Transcription batch failed on queue '{self.name}': {e}")
+            results, durations = [{"error": str(e)}] * len(batch), [0.0] * len(batch)
+        finally:
+            self._slots.release()
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.clips += len(batch)
+        self.audio_seconds += sum(durations)
+        self.processing_seconds += elapsed
+        observe_stage("stt_batch", elapsed)
+        ITEMS.inc(len(batch), kind="clips")
+        ITEMS.inc(sum(durations), kind="audio_seconds")
+        logger.info(f"Transcribed batch of {len(batch)} clips ({sum(durations):.1f}s audio) in {elapsed:.2f}s")
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # client went away
+            if "error" in result:
+                future.set_exception(RuntimeError(result["error"]))
+            else:
+                future.set_result(result["text"])
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "model": self.model_name,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else None,
+            "audio_seconds": round(self.audio_seconds, 2),
+            # Processing time per second of audio; below 1 is faster than real time
+            "real_time_factor": round(self.processing_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+        }
+
+    def shutdown(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+        for task in list(self._batch_tasks):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def parse_queue_config(config):
+    """
+    Parse "name=model:workers,..." e.g. "default=base:2,fast=tiny:1"
+    """
+    queues = {}
+    for entry in filter(None, (part.strip() for part in config.split(","))):
+        name, _, spec = entry.partition("=")
+        model_name, _, workers = spec.partition(":")
+        queues[name.strip()] = (model_name.strip() or "base", int(workers or 1))
+    return queues
+
+class TranscriptionService:
+    """
+    Named transcription queues, each with its own model size and workers.
+    Configured via TRANSCRIBE_QUEUES; the first queue is the default.
+    """
+    def __init__(self, config=None, max_batch=None, batch_window=None, max_queue=None):
+        config = config or os.getenv("TRANSCRIBE_QUEUES", "default=base:1")
+        max_batch = max_batch or int(os.getenv("TRANSCRIBE_MAX_BATCH", "8"))
+        batch_window = batch_window if batch_window is not None else float(os.getenv("TRANSCRIBE_BATCH_WINDOW", "0.05"))
+        max_queue = max_queue or int(os.getenv("TRANSCRIBE_MAX_QUEUE", "16"))
+        self.queues = {
+            name: TranscriptionQueue(name, model_name, workers, max_batch, batch_window, max_queue)
+            for name, (model_name, workers) in parse_queue_config(config).items()
+        }
+        self.default_queue = next(iter(self.queues))
+
+    def warm(self):
+        for queue in self.queues.values():
+            queue.warm()
+        logger.info(f"Transcription queues warming up: {', '.join(self.queues)}")
+
+    async def transcribe(self, data, filename=None, queue=None):
+        """
+        Transcribe audio bytes on the named (or default) queue
+        """
+        name = queue or self.default_queue
+        if name not in self.queues:
+            raise ValueError(f"Unknown transcription queue: {name}. Use one of {', '.join(self.queues)}")
+        suffix = Path(filename or "").suffix or ".wav"
+        return await self.queues[name].transcribe(data, suffix)
+
+    def stats(self):
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+    def shutdown(self):
+        for queue in self.queues.values():
+            queue.shutdown()
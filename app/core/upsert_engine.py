@@ -0,0 +1,227 @@
+from .chunker import count_tokens
+from .manifest import chunk_vector_id
+from .metrics import STAGE_SECONDS, TOKENS, observe_stage
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Embedding requests are cut at this many tokens (OpenAI allows 300k per request)
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "20000"))
+EMBED_BATCH_MAX_TEXTS = int(os.getenv("EMBED_BATCH_MAX_TEXTS", "512"))
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "5"))
+# Pinecone rejects upsert requests over 2 MB; stay under it with some margin
+_MAX_REQUEST_BYTES = 1_800_000
+# Upserts faster than this grow the batch size, slower ones shrink it
+_TARGET_REQUEST_SECONDS = 1.0
+
+class UpsertFailed(Exception):
+    """
+    Raised by UpsertEngine.close() when some vectors could not be stored
+    after retries; the vectors that were stored have already been reported
+    """
+    def __init__(self, failed, error):
+        super().__init__(f"{failed} vectors could not be stored: {error}")
+        self.failed = failed
+        self.error = error
+
+class AdaptiveBatchSize:
+    """
+    Upsert batch size shared by concurrent workers: grows while requests
+    are fast, halves when one fails or is slow, and never builds a request
+    larger than max_bytes
+    """
+    def __init__(self, initial=UPSERT_BATCH_SIZE, minimum=1, maximum=1000, max_bytes=_MAX_REQUEST_BYTES):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def next(self, vector_bytes):
+        """Batch size for vectors of about vector_bytes each"""
+        with self._lock:
+            return max(self.minimum, min(self.size, self.max_bytes // max(vector_bytes, 1)))
+
+    def succeeded(self, count, seconds):
+        with self._lock:
+            if count < self.size:
+                return  # a short tail batch says nothing about larger ones
+            if seconds < _TARGET_REQUEST_SECONDS / 2:
+                self.size = min(self.maximum, self.size + max(1, self.size // 2))
+            elif seconds > _TARGET_REQUEST_SECONDS:
+                self.size = max(self.minimum, self.size // 2)
+
+    def failed(self):
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+class UpsertEngine:
+    """
+    Embeds and upserts documents in the background for one ingestion:
+    - documents are grouped into embedding requests of at most
+      EMBED_BATCH_TOKENS tokens
+    - each group is embedded and upserted by one of `concurrency` workers,
+      in upsert requests sized by AdaptiveBatchSize
+    - failed embedding or upsert calls are retried with exponential
+      backoff; vector IDs are fixed before the first attempt, so a retry
+      overwrites rather than duplicates
+    - submit() blocks while `concurrency` * 2 groups are in flight, so a
+      fast producer cannot queue the whole document in memory
+    upsert(vectors) stores a list of {"id", "values", "metadata"} dicts.
+    on_stored(documents, ids) is called (serialized) after each request
+    succeeds; on_progress(stats) after each group finishes.
+    """
+    def __init__(self, embeddings, upsert, concurrency=UPSERT_CONCURRENCY, batch_size=None,
+                 max_retries=UPSERT_MAX_RETRIES, embed_batch_tokens=EMBED_BATCH_TOKENS,
+                 embed_batch_max_texts=EMBED_BATCH_MAX_TEXTS, text_key="text",
+                 on_stored=None, on_progress=None):
+        self.embeddings = embeddings
+        self.upsert = upsert
+        self.max_retries = max_retries
+        self.embed_batch_tokens = embed_batch_tokens
+        self.embed_batch_max_texts = embed_batch_max_texts
+        self.text_key = text_key
+        self.on_stored = on_stored
+        self.on_progress = on_progress
+        self.batch_size = batch_size or AdaptiveBatchSize()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="upsert")
+        self._slots = threading.BoundedSemaphore(concurrency * 2)
+        self._lock = threading.RLock()
+        self._futures = []
+        self._pending = []
+        self._pending_tokens = 0
+        self._error = None
+        self.submitted = 0
+        self.stored = 0
+        self.failed = 0
+        self.retries = 0
+        self.embed_requests = 0
+        self.upsert_requests = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def submit(self, documents, ids=None):
+        """
+        Queue documents for embedding and upsert; IDs default to the stable
+        content hash of each chunk's source and text
+        """
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        if ids is None or len(ids) == 0:
+            ids = [chunk_vector_id(doc.metadata.get("source", ""), doc.page_content) for doc in documents]
+        for doc, vector_id in zip(documents, ids):
+            tokens = doc.metadata.get("tokens") or count_tokens(doc.page_content)
+            if self._pending and (self._pending_tokens + tokens > self.embed_batch_tokens
+                                  or len(self._pending) >= self.embed_batch_max_texts):
+                self._dispatch()
+            self._pending.append((doc, vector_id))
+            self._pending_tokens += tokens
+            self.submitted += 1
+        return list(ids)
+
+    def _dispatch(self):
+        group, self._pending, self._pending_tokens = self._pending, [], 0
+        self._slots.acquire()
+        future = self._executor.submit(self._run_group, group)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _retry(self, action, description, on_failure=None):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return action()
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                if on_failure is not None:
+                    on_failure()
+                delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                with self._lock:
+                    self.retries += 1
+                logger.warning(f"{description} failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _run_group(self, group):
+        documents = [doc for doc, _ in group]
+        start = 0
+        try:
+            with STAGE_SECONDS.time(stage="embed"):
+                vectors = self._retry(
+                    lambda: self.embeddings.embed_documents([doc.page_content for doc in documents]), "embedding"
+                )
+            TOKENS.inc(sum(doc.metadata.get("tokens", 0) for doc in documents), kind="embedded")
+            with self._lock:
+                self.embed_requests += 1
+            records = [
+                {"id": vector_id, "values": vector, "metadata": {**doc.metadata, self.text_key: doc.page_content}}
+                for (doc, vector_id), vector in zip(group, vectors)
+            ]
+            while start < len(records):
+                # Estimate the request size from the next record's encoded size
+                vector_bytes = len(json.dumps(records[start]))
+
+                def attempt():
+                    # Sized per attempt, so a retry after a failure sends a smaller request
+                    batch = records[start:start + self.batch_size.next(vector_bytes)]
+                    began = time.perf_counter()
+                    self.upsert(batch)
+                    elapsed = time.perf_counter() - began
+                    observe_stage("upsert", elapsed)
+                    self.batch_size.succeeded(len(batch), elapsed)
+                    return batch
+
+                batch = self._retry(attempt, "upsert", on_failure=self.batch_size.failed)
+                with self._lock:
+                    self.upsert_requests += 1
+                    self.stored += len(batch)
+                    if self.on_stored is not None:
+                        self.on_stored(documents[start:start + len(batch)], [record["id"] for record in batch])
+                start += len(batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(group) - start
+                self._error = self._error or e
+            logger.error(f"Giving up on {len(group) - start} chunks after {self.max_retries} retries: {e}")
+        finally:
+            if self.on_progress is not None:
+                self.on_progress(self.progress())
+
+    def close(self):
+        """
+        Flush queued documents and wait for every group; raises UpsertFailed
+        if any vectors could not be stored
+        """
+        if self._pending:
+            self._dispatch()
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown(wait=True)
+        self.finished_at = time.perf_counter()
+        logger.info(f"Upsert finished: {self.progress()}")
+        if self._error is not None:
+            raise UpsertFailed(self.failed, self._error)
+
+    def progress(self):
+        with self._lock:
+            end = self.finished_at or time.perf_counter()
+            elapsed = end - self.started_at if self.started_at is not None else 0.0
+            return {
+                "submitted": self.submitted,
+                "stored": self.stored,
+                "failed": self.failed,
+                "retries": self.retries,
+                "embed_requests": self.embed_requests,
+                "upsert_requests": self.upsert_requests,
+                "batch_size": self.batch_size.size,
+                "elapsed_seconds": round(elapsed, 3),
+                "vectors_per_second": round(self.stored / elapsed, 2) if elapsed > 0 else None,
+            }
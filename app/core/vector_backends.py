@@ -0,0 +1,77 @@
+from .providers import PROVIDERS, provider_for
+from dotenv import load_dotenv
+import logging
+import os
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIMENSION = 1536
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "memory" if PROVIDERS == "local" else "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".cache/local_index")
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "flat")
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", ".cache/lexical_index")
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+DEFAULT_NAMESPACE = ""
+
+def tenant_namespace(tenant_id=None):
+    """Map a tenant to its namespace; no tenant uses the default namespace"""
+    return tenant_id or DEFAULT_NAMESPACE
+
+def document_filter(document_id):
+    """Metadata filter restricting retrieval to a single source document"""
+    return {"source": {"$eq": document_id}}
+
+def build_embeddings():
+    """
+    Create the OpenAI embedding model behind the persistent embedding cache,
+    so re-ingesting unchanged chunks costs no API calls.
+    EMBEDDING_PROVIDER=local uses the offline hash embedder instead.
+    """
+    if provider_for("embedding") == "local":
+        from .local_providers import HashEmbeddings
+        return HashEmbeddings(EMBEDDING_DIMENSION)
+
+    from langchain_openai import OpenAIEmbeddings
+    from .embedding_cache import CachedEmbeddings
+
+    return CachedEmbeddings(
+        OpenAIEmbeddings(model=EMBEDDING_MODEL),
+        model_name=EMBEDDING_MODEL,
+        db_path=EMBEDDING_CACHE_PATH,
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+    )
+
+def create_vector_manager(backend=None):
+    """
+    Create the vector store manager for the configured backend.
+    backend options: "pinecone" (default), "local", "memory" (local, not persisted)
+    """
+    backend = (backend or VECTOR_BACKEND).lower()
+    logger.info(f"Using vector backend: {backend}")
+    if backend == "pinecone":
+        from .pinecone_manager import PineconeManager
+        return PineconeManager()
+    if backend == "local":
+        from .local_vector_store import LocalVectorManager
+        ann_options = {"nprobe": LOCAL_INDEX_NPROBE} if LOCAL_INDEX_TYPE == "ivf" else {}
+        return LocalVectorManager(directory=LOCAL_INDEX_DIR, index_type=LOCAL_INDEX_TYPE, **ann_options)
+    if backend == "memory":
+        from .local_vector_store import LocalVectorManager
+        return LocalVectorManager(directory=None)
+    raise ValueError(f"Unknown vector backend: {backend}. Use 'pinecone', 'local' or 'memory'")
+
+def create_lexical_index(backend=None):
+    """
+    Create the BM25 index searched alongside the vector store; it is kept in
+    memory when the vector store is, and on disk otherwise
+    """
+    from .lexical_index import LexicalIndex
+
+    backend = (backend or VECTOR_BACKEND).lower()
+    return LexicalIndex(directory=None if backend == "memory" else LEXICAL_INDEX_DIR)
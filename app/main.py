@@ -1,18 +1,36 @@
-from .core.pdf_processor import extract_text_from_pdf, chunk_text
-from .core.pinecone_manager import PineconeManager
-from .core.query_manager import setup_retrieval_chain
-from .core.speech_to_text import WhisperTranscriber
-from .core.text_to_speech import ElevenLabsTTS
-from langchain_core.documents import Document
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from .core.manifest import ManifestStore
+from .core.vector_backends import (
+    create_vector_manager, create_lexical_index, DEFAULT_NAMESPACE, HYBRID_SEARCH, tenant_namespace, document_filter
+)
+from .core.ask_pipeline import answer_question, stream_answer_events
+from .core.answer_cache import SemanticAnswerCache
+from .core.concurrency import Overloaded, create_pools
+from .core.components import ComponentRegistry, ComponentUnavailable
+from .core.query_manager import get_llm
+from .core.transcription import TranscriptionService
+from .core.text_to_speech import DEFAULT_VOICE_ID
+from .core.providers import build_tts
+from .core.metrics import REGISTRY, REQUEST_SECONDS, observe_stage
+from .core.ingestion_jobs import IngestionJobQueue, JobStore
+from .core.conversation import SessionStore
+from .core.reranker import RERANK_ENABLED, create_reranker
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import functools
+import json
 import logging
 import os
+import time
+import uuid
 from pathlib import Path
 import uvicorn
-# Configure logging
+# Configure logging; LOG_LEVEL=DEBUG adds per-page and per-document payload previews
 logging.basicConfig(level=logging.INFO)
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -27,145 +45,358 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-try:
-    pinecone_manager = PineconeManager()
-    vectorstore = pinecone_manager.vectorstore
-    qa_chain = setup_retrieval_chain(vectorstore)
-    transcriber = WhisperTranscriber(model_name="base")
-    tts = ElevenLabsTTS(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
-    logger.info("All components initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing components: {e}")
-    raise
+# Bounded pools per class of blocking work; full pools shed load with 429s
+pools = create_pools()
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep the series bounded
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        route=route.path if route is not None else "unmatched",
+        method=request.method,
+        status=response.status_code
+    )
+    return response
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(ComponentUnavailable)
+async def unavailable_handler(request: Request, exc: ComponentUnavailable):
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "30"})
+
+def start_transcription():
+    service = TranscriptionService()
+    # Spawn the Whisper workers now so models load before the first request
+    service.warm()
+    return service
+
+# Subsystems are built on first use (or by the background warm-up), so the
+# server starts immediately and one failing dependency doesn't stop the rest
+components = ComponentRegistry()
+# VECTOR_BACKEND selects Pinecone (default) or the local in-process index
+components.register("vector_store", create_vector_manager, required=True)
+components.register("llm", get_llm, required=True)
+# BM25 index fused with vector results (HYBRID_SEARCH)
+if HYBRID_SEARCH:
+    components.register("lexical_index", create_lexical_index)
+# Rescores over-fetched candidates before the LLM (RERANK_*)
+if RERANK_ENABLED:
+    components.register("reranker", create_reranker)
+# Whisper worker processes per queue (TRANSCRIBE_QUEUES)
+components.register("transcription", start_transcription)
+# ElevenLabs, or silent audio with PROVIDERS=local / TTS_PROVIDER=local
+components.register("tts", build_tts)
+
+manifests = ManifestStore(os.getenv("MANIFEST_DIR", ".cache/manifests"))
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+)
+# Conversation history per session: rolling summary + recent turns (SESSION_*)
+sessions = SessionStore()
+
+@app.on_event("startup")
+async def warm_up():
+    warmup = os.getenv("WARMUP_COMPONENTS", ",".join(components.components))
+    components.warm_up([name.strip() for name in warmup.split(",") if name.strip()])
+    # Resume ingestion jobs queued or interrupted before a restart
+    ingestion_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    await ingestion_jobs.shutdown()
+    for pool in pools.values():
+        pool.shutdown()
+    if components["transcription"].peek() is not None:
+        components["transcription"].peek().shutdown()
+    if components["tts"].peek() is not None:
+        await components["tts"].peek().aclose()
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Per-component state; 503 until every required component is ready"""
+    ready, statuses = components.readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": statuses}
+    )
+
+async def get_lexical_index():
+    """
+    The BM25 index, or None when hybrid search is off or the index failed
+    to load; retrieval then uses the vector store alone
+    """
+    if not HYBRID_SEARCH:
+        return None
+    try:
+        return await components["lexical_index"].aget()
+    except ComponentUnavailable:
+        return None
+
+async def get_reranker():
+    """The reranker, or None when reranking is off or failed to load"""
+    if not RERANK_ENABLED:
+        return None
+    try:
+        return await components["reranker"].aget()
+    except ComponentUnavailable:
+        return None
 
 class Question(BaseModel):
     text: str
+    tenant_id: Optional[str] = None
+    document_id: Optional[str] = None
+    # Follow-ups in a session are answered with the conversation so far
+    session_id: Optional[str] = None
+
+def get_session(question: Question):
+    if not question.session_id:
+        return None
+    return sessions.get(tenant_namespace(question.tenant_id), question.session_id)
 
-@app.post("/api/process-pdf")
-async def process_pdf(file: UploadFile = File(...)):
+async def run_ingest_job(job, report):
+    """
+    Ingest one queued upload (see IngestionJobQueue); the blocking work runs
+    in the "ingest" pool and progress is reported after each stored batch
+    """
+    # Deferred: pulls in pdfplumber and the text splitters
+    from .core.ingestion import ingest_pdf
+
+    namespace = job["namespace"]
+    source = job["source"]
+    vector_manager = await components["vector_store"].aget()
+    lexical_index = await get_lexical_index()
+    logger.info(f"Processing PDF file: {source} (namespace '{namespace}', job {job['job_id']})")
+
+    def delete_existing_vectors():
+        vector_manager.delete_all_vectors(namespace)
+        if lexical_index is not None:
+            lexical_index.delete(delete_all=True, namespace=namespace)
+        manifests.clear(namespace)
+        answer_cache.invalidate(namespace)
+        logger.info("Deleted existing vectors")
+
+    def delete_ids(ids):
+        if lexical_index is not None:
+            lexical_index.delete(ids=ids, namespace=namespace)
+        return vector_manager.delete_vectors_by_ids(ids, namespace)
+
+    # Incremental mode only upserts new chunks and deletes vanished ones;
+    # otherwise the tenant's namespace is replaced by this document.
+    if job["options"].get("incremental", True):
+        ingest_kwargs = {
+            "manifests": manifests,
+            "delete_ids": delete_ids
+        }
+    else:
+        ingest_kwargs = {"before_upsert": delete_existing_vectors}
+    if hasattr(vector_manager, "upserter"):
+        # Pinecone: embed and upsert in concurrent, retried batches
+        ingest_kwargs["create_upserter"] = functools.partial(vector_manager.upserter, namespace)
     try:
-        # Save uploaded file temporarily
-        logger.info(f"Processing PDF file: {file.filename}")
-        with open("temp.pdf", "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Process PDF
-        extracted_text = extract_text_from_pdf("temp.pdf")
-        logger.info(f"Extracted text length: {len(extracted_text)}")
-        
-        if not extracted_text:
-            logger.error("No text extracted from PDF")
-            return {"error": "Could not extract text from PDF"}
-            
-        chunks = chunk_text(extracted_text)
-        logger.info(f"Created {len(chunks)} chunks")
-        
-        if not chunks:
-            logger.error("No chunks created from text")
-            return {"error": "Could not create chunks from PDF text"}
-
-        # Store chunks in Pinecone
-        documents = []
-        for i, chunk in enumerate(chunks):
-            doc = Document(
-                page_content=chunk,
-                metadata={
-                    "source": file.filename,
-                    "chunk_id": i,
-                    "text": chunk
-                }
-            )
-            documents.append(doc)
-        
-        try:
-            # Try to delete existing vectors
-            pinecone_manager.delete_all_vectors()
-            logger.info("Deleted existing vectors")
-            
-            # Add new documents
-            ids = vectorstore.add_documents(documents)
-            logger.info(f"Successfully stored {len(ids)} documents in Pinecone")
-            
-            # Clean up
-            os.remove("temp.pdf")
-            
-            return {
-                "message": "PDF processed successfully",
-                "chunks": len(chunks),
-                "stored_documents": len(ids),
-                "text_length": len(extracted_text)
-            }
-        except Exception as e:
-            logger.error(f"Error storing documents: {e}")
-            raise
-            
-    except Exception as e:
-        logger.error(f"Error processing PDF: {e}")
-        if os.path.exists("temp.pdf"):
-            os.remove("temp.pdf")
-        return {"error": str(e)}
+        stats = await pools["ingest"].run(
+            ingest_pdf,
+            job["path"],
+            vector_manager.vectorstore,
+            source=source,
+            namespace=namespace,
+            lexical_index=lexical_index,
+            on_progress=lambda stats: report(stats.to_dict()),
+            **ingest_kwargs
+        )
+    except Exception:
+        # A failed upload may still have stored part of the document
+        answer_cache.invalidate(namespace, source)
+        raise
+    logger.info(f"Successfully stored {stats.vectors} documents in the vector store")
+    if stats.vectors or stats.deleted:
+        # Cached answers may have been built from the old chunks
+        answer_cache.invalidate(namespace, source)
+    report(stats.to_dict(), force=True)
+    return {
+        "message": "PDF processed successfully",
+        "document_id": source,
+        "chunks": stats.chunks,
+        "stored_documents": stats.vectors,
+        "unchanged_documents": stats.unchanged,
+        "deleted_documents": stats.deleted,
+        "text_length": stats.characters,
+        "throughput": stats.to_dict()
+    }
+
+# Uploads are queued in SQLite and ingested by as many workers as the
+# "ingest" pool runs at once
+ingestion_jobs = IngestionJobQueue(JobStore(), run_ingest_job, workers=pools["ingest"].max_running)
+
+def job_status(job):
+    """A job as reported by the API (without its local upload path)"""
+    return {key: value for key, value in job.items() if key != "path"}
+
+@app.post("/api/process-pdf", status_code=202)
+async def process_pdf(file: UploadFile = File(...), incremental: bool = True, tenant_id: Optional[str] = None):
+    """
+    Queue a PDF for ingestion and return its job ID at once; poll
+    /api/jobs/{job_id} for progress and the result
+    """
+    namespace = tenant_namespace(tenant_id)
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    job_id = await ingestion_jobs.submit(content, file.filename, namespace, {"incremental": incremental})
+    return {
+        "message": "PDF queued for processing",
+        "job_id": job_id,
+        "document_id": file.filename,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}"
+    }
+
+@app.post("/api/sessions")
+async def create_session():
+    """A new conversation ID to send as session_id with each question"""
+    return {"session_id": uuid.uuid4().hex}
+
+@app.get("/api/sessions")
+async def session_stats():
+    """Sessions held in memory, their size and spill/restore counters"""
+    return sessions.stats()
+
+@app.get("/api/sessions/{session_id}")
+async def get_session_summary(session_id: str, tenant_id: Optional[str] = None):
+    """Turn count and rolling summary of a conversation"""
+    session = sessions.peek(tenant_namespace(tenant_id), session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session.describe()
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str, tenant_id: Optional[str] = None):
+    """Forget a conversation"""
+    return {"deleted": sessions.delete(tenant_namespace(tenant_id), session_id)}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress (pages, chunks, vectors and their rates) and result of an ingestion job"""
+    job = await asyncio.to_thread(ingestion_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, tenant_id: Optional[str] = None, limit: int = 50):
+    """Recent ingestion jobs, newest first, plus queue counters"""
+    namespace = tenant_namespace(tenant_id) if tenant_id is not None else None
+    jobs = await asyncio.to_thread(ingestion_jobs.store.list, status, namespace, limit)
+    return {"jobs": [job_status(job) for job in jobs], "queue": ingestion_jobs.stats()}
 
 @app.post("/api/ask")
 async def ask_question(question: Question):
-    logger.info(f"Query received: {question.text}")
+    logger.debug(f"Query received: {question.text}")
+    namespace = tenant_namespace(question.tenant_id)
+    search_kwargs = {"namespace": namespace}
+    if question.document_id:
+        search_kwargs["filter"] = document_filter(question.document_id)
+    vector_manager = await components["vector_store"].aget()
+    await components["llm"].aget()
+    lexical_index = await get_lexical_index()
+    reranker = await get_reranker()
     try:
-        # First verify documents exist in vectorstore
-        index = pinecone_manager.pc.Index(pinecone_manager.index_name)
-        stats = index.describe_index_stats()
-        logger.info(f"Index stats: {stats}")
-        
-        # Get relevant documents with higher k value
-        relevant_docs = vectorstore.similarity_search(
+        # Embed once, retrieve once and call the LLM once with those documents
+        result = await answer_question(
             question.text,
-            k=8  # Increased from 5
+            vector_manager.vectorstore,
+            vector_manager.embeddings,
+            k=8,
+            search_kwargs=search_kwargs,
+            answer_cache=answer_cache,
+            cache_scope=answer_cache.scope(namespace, question.document_id),
+            run_blocking=pools["ask"].run,
+            lexical_index=lexical_index,
+            session=get_session(question),
+            reranker=reranker
         )
         
-        logger.info(f"Retrieved {len(relevant_docs)} relevant documents")
-        
-        if len(relevant_docs) == 0:
-            # Fallback search with different parameters
-            query_embedding = pinecone_manager.embeddings.embed_query(question.text)
-            query_response = index.query(
-                vector=query_embedding,
-                top_k=8,
-                include_metadata=True,
-                score_threshold=0.5  # Add threshold here instead
-            )
-            
-            if query_response.matches:
-                relevant_docs = [
-                    Document(
-                        page_content=match.metadata.get('text', ''),
-                        metadata=match.metadata
-                    )
-                    for match in query_response.matches
-                ]
-                logger.info(f"Retrieved {len(relevant_docs)} documents through fallback query")
-        
-        if len(relevant_docs) == 0:
-            return {"answer": "I'm sorry, I couldn't find any relevant information in the document. Please try rephrasing your question."}
-        
-        # Log retrieved content for debugging
-        for i, doc in enumerate(relevant_docs):
-            logger.info(f"Document {i+1} content preview: {doc.page_content[:200]}...")
-        
-        # Use the chain to get the answer with chat history
-        response = qa_chain.invoke({
-            "question": question.text,
-            "chat_history": [],
-            "context": "\n\n".join(doc.page_content for doc in relevant_docs)
-        })
-        
-        logger.info(f"Generated response: {response['answer'][:200]}...")
-        return {"answer": response["answer"]}
+        logger.debug(f"Generated response: {result['answer'][:200]}...")
+        return {"answer": result["answer"], "context": result["context"], "rerank": result["rerank"],
+                "standalone_question": result["standalone_question"],
+                "timings": result["timings"], "cached": result["cached"]}
         
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         logger.exception("Full traceback:")
         return {"error": str(e)}
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/ask/stream")
+async def ask_question_stream(question: Question):
+    """
+    Stream the answer as Server-Sent Events: a "sources" event with the
+    retrieved chunk IDs, "token" events as the LLM generates, then "done"
+    with token usage, reranking and context packing stats, the standalone
+    question and timings
+    """
+    logger.debug(f"Streaming query received: {question.text}")
+    namespace = tenant_namespace(question.tenant_id)
+    search_kwargs = {"namespace": namespace}
+    if question.document_id:
+        search_kwargs["filter"] = document_filter(question.document_id)
+    vector_manager = await components["vector_store"].aget()
+    await components["llm"].aget()
+    lexical_index = await get_lexical_index()
+    session = get_session(question)
+    reranker = await get_reranker()
+    # Shed load with a real 429 while the status can still be set; a pool
+    # that fills up after this reports it as an error event
+    pools["ask"].check()
+
+    async def events():
+        try:
+            async for event, data in stream_answer_events(
+                question.text,
+                vector_manager.vectorstore,
+                vector_manager.embeddings,
+                k=8,
+                search_kwargs=search_kwargs,
+                answer_cache=answer_cache,
+                cache_scope=answer_cache.scope(namespace, question.document_id),
+                run_blocking=pools["ask"].run,
+                lexical_index=lexical_index,
+                session=session,
+                reranker=reranker
+            ):
+                yield sse_event(event, data)
+        except Overloaded as e:
+            yield sse_event("error", {"error": str(e), "status": 429})
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def format_response(answer: str) -> str:
     # Split the answer into sections
     sections = answer.split("\n")
@@ -179,32 +410,52 @@ def format_response(answer: str) -> str:
     return formatted
 
 @app.post("/api/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(file: UploadFile = File(...), queue: Optional[str] = None):
+    transcription = await components["transcription"].aget()
     try:
-        # Save uploaded audio temporarily
-        with open("temp_audio.wav", "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Transcribe
-        text = transcriber.transcribe_audio("temp_audio.wav")
-        
-        # Clean up
-        os.remove("temp_audio.wav")
-        
+        # Audio stays in memory until a worker decodes it; short clips are batched
+        content = await file.read()
+        text = await transcription.transcribe(content, file.filename, queue)
         return {"text": text}
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error transcribing audio: {e}")
         return {"error": str(e)}
 
+@app.get("/api/transcription")
+async def transcription_stats():
+    """Report queue depth, batch sizes and real-time factor per transcription queue"""
+    transcription = components["transcription"].peek()
+    return transcription.stats() if transcription is not None else {}
+
 @app.post("/api/synthesize")
-async def synthesize_speech(text: str):
-    try:
-        audio_path = tts.synthesize_speech(text)
-        return {"audio_path": str(audio_path)}
-    except Exception as e:
-        logger.error(f"Error synthesizing speech: {e}")
-        return {"error": str(e)}
+async def synthesize_speech(text: str, voice_id: str = DEFAULT_VOICE_ID):
+    """Stream MP3 audio for text, sentence by sentence, as it is synthesized"""
+    if not text.strip():
+        return {"error": "No text provided"}
+    tts = await components["tts"].aget()
+    # Admission happens here so a full pool is a 429, not a broken stream
+    slot = pools["tts"].slot()
+
+    async def audio():
+        start = time.perf_counter()
+        first = True
+        async with slot:
+            async for chunk in tts.stream_speech(text, voice_id):
+                if first:
+                    observe_stage("tts_first_audio", time.perf_counter() - start)
+                    first = False
+                yield chunk
+        observe_stage("tts", time.perf_counter() - start)
+
+    return StreamingResponse(audio(), media_type="audio/mpeg")
+
+@app.get("/api/tts-cache")
+async def tts_cache_stats():
+    """Report synthesized-audio cache size and hit rate"""
+    tts = components["tts"].peek()
+    return tts.cache.stats() if tts is not None and tts.cache is not None else {}
 
 @app.get("/")
 async def root():
@@ -213,49 +464,185 @@ async def root():
         "endpoints": {
             "PDF Processing": "/api/process-pdf",
             "Ask Questions": "/api/ask",
+            "Ask Questions (streaming)": "/api/ask/stream",
             "Speech to Text": "/api/transcribe",
-            "Text to Speech": "/api/synthesize"
+            "Text to Speech": "/api/synthesize",
+            "Ingestion Jobs": "/api/jobs",
+            "Documents": "/api/documents",
+            "Readiness": "/health/ready",
+            "Metrics": "/metrics"
         },
         "documentation": "/docs"
     }
 
 @app.get("/api/test-vectorstore")
 async def test_vectorstore():
+    vector_manager = await components["vector_store"].aget()
     try:
         # Perform a simple similarity search with a test query
         test_query = "test"
-        results = vectorstore.similarity_search(test_query, k=1)
+        results = await pools["io"].run(vector_manager.vectorstore.similarity_search, test_query, k=1)
         return {
             "status": "success",
             "document_found": len(results) > 0,
             "sample_content": results[0].page_content if results else None
         }
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error testing vectorstore: {e}")
         return {"error": str(e)}
 
+@app.get("/api/index-stats")
+async def index_stats():
+    """Report vector counts per namespace (cached briefly by the manager)"""
+    vector_manager = await components["vector_store"].aget()
+    return await pools["io"].run(vector_manager.describe_index_stats)
+
+@app.get("/api/pools")
+async def pool_stats():
+    """Report running, queued and rejected work per pool"""
+    return {name: pool.stats() for name, pool in pools.items()}
+
+@app.get("/api/answer-cache")
+async def answer_cache_stats():
+    """Report semantic answer cache hit rate and evictions"""
+    return answer_cache.stats()
+
+@app.get("/api/embedding-cache")
+async def embedding_cache_stats():
+    """Report embedding cache hit/miss counters"""
+    vector_manager = components["vector_store"].peek()
+    if vector_manager is None or not hasattr(vector_manager.embeddings, "stats"):
+        return {}
+    return vector_manager.embeddings.stats()
+
+def _pool_gauge(field):
+    return lambda: {(name,): pool.stats()[field] for name, pool in pools.items()}
+
+def _component_readiness():
+    return {(name,): int(component.ready) for name, component in components.components.items()}
+
+def _transcription_queue_depth():
+    transcription = components["transcription"].peek()
+    if transcription is None:
+        return {}
+    return {(name,): queue["queue_depth"] for name, queue in transcription.stats().items()}
+
+REGISTRY.gauge("doctalk_pool_pending", "Calls running or queued per work pool", ("pool",), _pool_gauge("pending"))
+REGISTRY.gauge("doctalk_component_ready", "1 when a component is initialized", ("component",), _component_readiness)
+REGISTRY.gauge(
+    "doctalk_ingest_jobs", "Ingestion jobs by status", ("status",),
+    lambda: {(status,): count for status, count in ingestion_jobs.store.counts().items()}
+)
+REGISTRY.gauge(
+    "doctalk_transcription_queue_depth", "Clips waiting per transcription queue", ("queue",), _transcription_queue_depth
+)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, token and cache counters, pool gauges"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/upserts")
+async def upsert_progress():
+    """Progress and vectors/s of the uploads currently being upserted"""
+    vector_manager = components["vector_store"].peek()
+    if vector_manager is None or not hasattr(vector_manager, "upsert_progress"):
+        return {"upserts": []}
+    return {"upserts": vector_manager.upsert_progress()}
+
+@app.get("/api/reranker")
+async def reranker_stats():
+    """Reranker scorer, latency against its budget and share of candidates kept"""
+    reranker = components["reranker"].peek() if RERANK_ENABLED else None
+    return reranker.stats() if reranker is not None else {}
+
+@app.get("/api/lexical-index")
+async def lexical_index_stats():
+    """Report BM25 index size (chunks, terms, postings)"""
+    lexical_index = components["lexical_index"].peek() if HYBRID_SEARCH else None
+    return lexical_index.stats() if lexical_index is not None else {}
+
+@app.get("/api/documents")
+async def list_documents(tenant_id: Optional[str] = None):
+    """List the documents ingested for a tenant"""
+    namespace = tenant_namespace(tenant_id)
+    return {
+        "namespace": namespace,
+        "documents": [
+            {"document_id": m["source"], "chunks": len(m["ids"]), "version": m["version"]}
+            for m in manifests.list_sources(namespace)
+        ]
+    }
+
 @app.delete("/api/delete-all-documents")
-async def delete_all_documents():
-    """Delete all documents from the vector store"""
+async def delete_all_documents(tenant_id: Optional[str] = None):
+    """Delete all documents in a tenant's namespace from the vector store"""
+    namespace = tenant_namespace(tenant_id)
+    vector_manager = await components["vector_store"].aget()
     try:
-        success = pinecone_manager.delete_all_vectors()
+        if not await pools["io"].run(vector_manager.delete_all_vectors, namespace):
+            raise HTTPException(status_code=500, detail="Error deleting documents from the vector store")
+        lexical_index = await get_lexical_index()
+        if lexical_index is not None:
+            await pools["io"].run(lexical_index.delete, delete_all=True, namespace=namespace)
+        manifests.clear(namespace)
+        answer_cache.invalidate(namespace)
         return {
             "message": "Successfully deleted all documents from the vector store",
             "status": "success"
         }
+    except (Overloaded, HTTPException):
+        raise
     except Exception as e:
         logger.error(f"Error deleting documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/api/documents/{document_id}")
+async def delete_document(document_id: str, tenant_id: Optional[str] = None):
+    """Delete every vector belonging to one source document"""
+    namespace = tenant_namespace(tenant_id)
+    manifest = manifests.load(document_id, namespace)
+    if not manifest["ids"]:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    vector_manager = await components["vector_store"].aget()
+    if not await pools["io"].run(vector_manager.delete_vectors_by_ids, manifest["ids"], namespace):
+        raise HTTPException(status_code=500, detail=f"Error deleting document {document_id}")
+    lexical_index = await get_lexical_index()
+    if lexical_index is not None:
+        await pools["io"].run(lexical_index.delete, ids=manifest["ids"], namespace=namespace)
+    manifests.delete(document_id, namespace)
+    answer_cache.invalidate(namespace, document_id)
+    return {
+        "message": f"Successfully deleted document {document_id}",
+        "deleted_vectors": len(manifest["ids"]),
+        "status": "success"
+    }
+
 @app.delete("/api/delete-documents/{document_id}")
-async def delete_documents(document_id: str):
+async def delete_documents(document_id: str, tenant_id: Optional[str] = None):
     """Delete specific document by ID"""
+    vector_manager = await components["vector_store"].aget()
     try:
-        success = pinecone_manager.delete_vectors_by_ids([document_id])
+        namespace = tenant_namespace(tenant_id)
+        if not await pools["io"].run(vector_manager.delete_vectors_by_ids, [document_id], namespace):
+            raise HTTPException(status_code=500, detail=f"Error deleting document {document_id}")
+        lexical_index = await get_lexical_index()
+        if lexical_index is not None:
+            await pools["io"].run(lexical_index.delete, ids=[document_id], namespace=namespace)
+        sources = manifests.remove_ids([document_id], namespace)
+        if sources:
+            for source in sources:
+                answer_cache.invalidate(namespace, source)
+        else:
+            answer_cache.invalidate(namespace)
         return {
             "message": f"Successfully deleted document {document_id}",
             "status": "success"
         }
+    except (Overloaded, HTTPException):
+        raise
     except Exception as e:
         logger.error(f"Error deleting document: {e}")
         raise HTTPException(status_code=500, detail=str(e)) 
@@ -0,0 +1,96 @@
+"""
+Recall-vs-brute-force benchmark for the local vector store's IVF index.
+
+Builds a flat and an IVF LocalVectorStore over the same synthetic clustered
+embeddings, then reports recall@k and query latency for a range of nprobe
+values at several corpus sizes.
+
+    python -m benchmarks.ann_recall --sizes 10000 100000 --nprobe 1 4 8 16
+"""
+from app.core.local_vector_store import LocalVectorStore
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+
+def synthetic_embeddings(count, dimension, clusters, rng):
+    """
+    Unit vectors drawn around random cluster centres, like topic-clustered chunks
+    """
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centres[labels] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build_store(directory, vectors, batch_size=10000, **options):
+    store = LocalVectorStore(directory, embedding=None, dimension=vectors.shape[1], **options)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        store.add_vectors(
+            batch,
+            [""] * len(batch),
+            ids=[str(i) for i in range(start, start + len(batch))]
+        )
+    return store
+
+def timed_search(store, queries, k, **options):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.similarity_search_by_vector_with_score(query, k=k, **options)
+        latencies.append(time.perf_counter() - start)
+        results.append({doc.id for doc, _ in matches})
+    return results, np.array(latencies) * 1000
+
+def run(sizes, nprobes, dimension, k, queries_per_size, clusters, seed):
+    rng = np.random.default_rng(seed)
+    report = []
+    for size in sizes:
+        vectors = synthetic_embeddings(size, dimension, clusters, rng)
+        queries = synthetic_embeddings(queries_per_size, dimension, clusters, rng)
+        with tempfile.TemporaryDirectory() as flat_dir, tempfile.TemporaryDirectory() as ivf_dir:
+            flat = build_store(flat_dir, vectors)
+            start = time.perf_counter()
+            ivf = build_store(ivf_dir, vectors, index_type="ivf", min_train_size=min(4096, size))
+            ivf.wait_for_training()
+            if not ivf.ann_index.trained or ivf.ann_index.trained_size < size:
+                ivf.ann_index.train(ivf._matrix, np.arange(size))
+            build_seconds = time.perf_counter() - start
+
+            truth, flat_ms = timed_search(flat, queries, k)
+            report.append({
+                "size": size, "index": "flat", "recall": 1.0,
+                "p50_ms": round(float(np.percentile(flat_ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(flat_ms, 95)), 3),
+            })
+            for nprobe in nprobes:
+                found, ivf_ms = timed_search(ivf, queries, k, nprobe=nprobe)
+                recall = np.mean([len(t & f) / k for t, f in zip(truth, found)])
+                report.append({
+                    "size": size, "index": "ivf", "nprobe": nprobe,
+                    "nlist": len(ivf.ann_index.centroids),
+                    "recall": round(float(recall), 4),
+                    "p50_ms": round(float(np.percentile(ivf_ms, 50)), 3),
+                    "p95_ms": round(float(np.percentile(ivf_ms, 95)), 3),
+                    "build_seconds": round(build_seconds, 2),
+                })
+            for row in report[-(len(nprobes) + 1):]:
+                print(json.dumps(row))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.nprobe, args.dimension, args.k, args.queries, args.clusters, args.seed)
+
+if __name__ == "__main__":
+    main()
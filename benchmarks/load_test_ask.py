@@ -0,0 +1,100 @@
+"""
+Load test showing /api/ask latency while transcriptions run.
+
+Sends a steady stream of concurrent /api/ask requests to a running server,
+first on its own and then while a second group of clients keeps
+/api/transcribe busy with synthetic audio. Reports p50/p95/p99 ask latency
+for both phases and how many requests were shed with 429.
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.load_test_ask --url http://localhost:8000 --duration 30
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import time
+import wave
+import httpx
+import numpy as np
+
+def synthetic_wav(seconds=10.0, rate=16000):
+    """
+    A mono 16-bit WAV tone, enough to keep Whisper busy for a while
+    """
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (0.3 * np.sin(2 * math.pi * 220 * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(values, p)), 1) for p in (50, 95, 99)}
+
+async def ask_client(client, question, deadline, results):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/api/ask", json={"text": question})
+        elapsed = time.perf_counter() - start
+        if response.status_code == 429:
+            results["rejected"] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        elif response.status_code == 200 and "error" not in response.json():
+            results["latencies"].append(elapsed)
+        else:
+            results["errors"] += 1
+
+async def transcribe_client(client, audio, deadline, results):
+    while time.perf_counter() < deadline:
+        response = await client.post(
+            "/api/transcribe",
+            files={"file": ("load_test.wav", audio, "audio/wav")}
+        )
+        if response.status_code == 429:
+            results["rejected"] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        else:
+            results["completed"] += 1
+
+async def run_phase(url, question, duration, ask_clients, transcribe_clients, audio):
+    deadline = time.perf_counter() + duration
+    asks = {"latencies": [], "rejected": 0, "errors": 0}
+    transcriptions = {"completed": 0, "rejected": 0}
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        tasks = [ask_client(client, question, deadline, asks) for _ in range(ask_clients)]
+        tasks += [transcribe_client(client, audio, deadline, transcriptions) for _ in range(transcribe_clients)]
+        await asyncio.gather(*tasks)
+    return {
+        "ask_requests": len(asks["latencies"]),
+        **percentiles(asks["latencies"]),
+        "ask_rejected": asks["rejected"],
+        "ask_errors": asks["errors"],
+        "transcriptions": transcriptions["completed"],
+        "transcribe_rejected": transcriptions["rejected"],
+    }
+
+async def main(args):
+    audio = synthetic_wav(args.audio_seconds)
+    report = {"ask_only": await run_phase(args.url, args.question, args.duration, args.ask_clients, 0, audio)}
+    report["ask_with_transcribe"] = await run_phase(
+        args.url, args.question, args.duration, args.ask_clients, args.transcribe_clients, audio
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--question", default="What is this document about?")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per phase")
+    parser.add_argument("--ask-clients", type=int, default=8)
+    parser.add_argument("--transcribe-clients", type=int, default=4)
+    parser.add_argument("--audio-seconds", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
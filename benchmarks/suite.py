@@ -0,0 +1,288 @@
+"""
+End-to-end benchmark suite for the ingest, retrieval, ask and speech paths.
+
+Runs fully offline with the local providers (hash embeddings, fake LLM,
+in-memory vector store) on synthetic inputs, so numbers are comparable
+between runs and machines. Measures:
+
+- extraction pages/s and chunking MB/s per PDF size
+- embedding and end-to-end ingest (embed + upsert) throughput
+- /api/ask pipeline p50/p95/p99 latency at several concurrency levels, and
+  prompt context tokens per question after reranking and packing, and
+  reranker p95 latency
+- Whisper real-time factor (skipped when whisper is not installed)
+
+Each run is appended to a JSON-lines history file and compared against the
+median of recent runs with the same configuration using the regression
+thresholds in benchmarks/thresholds.json.
+
+    python -m benchmarks.suite --pages 1 10 100 1000 --concurrency 1 8 32
+    python -m benchmarks.suite --quick --check
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.synthetic import make_clip, make_pdf, make_queries
+
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+BASELINE_RUNS = 5
+
+def _percentiles(seconds):
+    values = np.asarray(seconds) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(values, p)), 2) for p in (50, 95, 99)}
+
+def bench_extract(pdf_path):
+    from app.core.pdf_processor import iter_pdf_pages
+
+    start = time.perf_counter()
+    pages = list(iter_pdf_pages(pdf_path))
+    elapsed = time.perf_counter() - start
+    return pages, {"pages_per_s": round(len(pages) / elapsed, 2)}
+
+def bench_chunk(pages):
+    from app.core.chunker import get_tokenizer
+    from app.core.pdf_processor import iter_chunks
+
+    get_tokenizer()  # load the encoding outside the timed region
+    size = sum(len(text.encode("utf-8")) for _, text in pages)
+    start = time.perf_counter()
+    chunks = [chunk.text for chunk in iter_chunks(pages)]
+    elapsed = time.perf_counter() - start
+    return chunks, {
+        "mb_per_s": round(size / elapsed / 1e6, 3),
+        "chunks_per_s": round(len(chunks) / elapsed, 1),
+    }
+
+def bench_embed(embeddings, chunks):
+    start = time.perf_counter()
+    embeddings.embed_documents(chunks)
+    elapsed = time.perf_counter() - start
+    return {"chunks_per_s": round(len(chunks) / elapsed, 1)}
+
+def bench_ingest(pdf_path, vectorstore, source, lexical_index=None):
+    from app.core.ingestion import ingest_pdf
+
+    stats = ingest_pdf(pdf_path, vectorstore, source, lexical_index=lexical_index)
+    result = stats.to_dict()
+    return {
+        "vectors_per_s": result["vectors_per_second"],
+        "total_pages_per_s": round(stats.pages / stats.total_seconds, 2),
+    }
+
+async def _ask_load(vectorstore, embeddings, queries, concurrency, lexical_index=None, reranker=None):
+    from app.core.ask_pipeline import answer_question
+    from app.core.concurrency import WorkPool
+
+    pool = WorkPool("bench-ask", max_workers=16, max_queue=len(queries))
+    pending = iter(queries)
+    latencies = []
+    context_tokens = []
+    rerank_ms = []
+
+    async def client():
+        for question in pending:
+            start = time.perf_counter()
+            result = await answer_question(question, vectorstore, embeddings, k=8, run_blocking=pool.run,
+                                           lexical_index=lexical_index, reranker=reranker)
+            latencies.append(time.perf_counter() - start)
+            if result["context"] is not None:
+                context_tokens.append((result["context"]["tokens_in"], result["context"]["tokens_out"]))
+            if result["rerank"] is not None:
+                rerank_ms.append(result["rerank"]["latency_ms"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    tokens_in, tokens_out = np.sum(context_tokens, axis=0) if context_tokens else (0, 0)
+    return {
+        **_percentiles(latencies),
+        "requests_per_s": round(len(latencies) / elapsed, 2),
+        "context_tokens": round(float(tokens_out) / max(1, len(context_tokens)), 1),
+        "context_tokens_saved_pct": round(100 * float(tokens_in - tokens_out) / tokens_in, 1) if tokens_in else None,
+        "rerank_p95_ms": round(float(np.percentile(rerank_ms, 95)), 2) if rerank_ms else None,
+    }
+
+def bench_ask(vectorstore, embeddings, queries, concurrency, lexical_index=None, reranker=None):
+    return asyncio.run(_ask_load(vectorstore, embeddings, queries, concurrency, lexical_index, reranker))
+
+def bench_transcribe(clip_seconds, model_name):
+    try:
+        from app.core.speech_to_text import WhisperTranscriber
+    except ImportError:
+        return None
+    from app.core.audio_decode import decode_audio
+
+    transcriber = WhisperTranscriber(model_name=model_name)
+    results = {}
+    for seconds in clip_seconds:
+        audio = decode_audio(make_clip(seconds), ".wav")
+        start = time.perf_counter()
+        transcriber.transcribe_audio(audio)
+        results[f"{seconds:g}s"] = {"rtf": round((time.perf_counter() - start) / seconds, 4)}
+    return results
+
+def run(args):
+    from app.core.lexical_index import LexicalIndex
+    from app.core.local_providers import HashEmbeddings
+    from app.core.local_vector_store import LocalVectorStore
+    from app.core.reranker import create_reranker
+    from app.core.vector_backends import EMBEDDING_DIMENSION
+
+    metrics = {}
+    embeddings = HashEmbeddings(EMBEDDING_DIMENSION)
+    vectorstore = LocalVectorStore(None, embeddings)
+    lexical_index = None if args.vector_only else LexicalIndex(None)
+    reranker = None if args.no_rerank else create_reranker()
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in args.pages:
+            pdf_path = make_pdf(os.path.join(directory, f"synthetic_{pages}.pdf"), pages, seed=pages)
+            page_texts, metrics[f"extract@{pages}p"] = bench_extract(pdf_path)
+            chunks, metrics[f"chunk@{pages}p"] = bench_chunk(page_texts)
+            metrics[f"embed@{pages}p"] = bench_embed(embeddings, chunks)
+            metrics[f"ingest@{pages}p"] = bench_ingest(
+                pdf_path, vectorstore, f"synthetic_{pages}.pdf", lexical_index
+            )
+            print(json.dumps({"pages": pages, **{k: v for k, v in metrics.items() if k.endswith(f"@{pages}p")}}))
+
+    queries = make_queries(args.queries, seed=args.seed)
+    for concurrency in args.concurrency:
+        metrics[f"ask@c{concurrency}"] = bench_ask(
+            vectorstore, embeddings, queries, concurrency, lexical_index, reranker
+        )
+        print(json.dumps({"concurrency": concurrency, **metrics[f"ask@c{concurrency}"]}))
+
+    if args.clips:
+        transcription = bench_transcribe(args.clips, args.whisper_model)
+        if transcription is None:
+            print("whisper not installed; skipping transcription")
+        else:
+            for clip, result in transcription.items():
+                metrics[f"transcribe@{clip}"] = result
+            print(json.dumps({"transcribe": transcription}))
+    return metrics
+
+def flatten(metrics):
+    """{"extract@10p": {"pages_per_s": 5}} -> {"extract@10p.pages_per_s": 5}"""
+    return {f"{group}.{name}": value for group, values in metrics.items() for name, value in values.items()}
+
+def _rule_for(metric, thresholds):
+    stage = metric.split("@", 1)[0]
+    name = metric.rsplit(".", 1)[-1]
+    return thresholds.get(f"{stage}.{name}")
+
+def find_regressions(metrics, history, thresholds):
+    """
+    Compare each metric to the median of the last BASELINE_RUNS runs.
+    A rule {"better": "higher"|"lower", "tolerance": 0.2} flags a metric that
+    got worse than the baseline by more than tolerance (as a fraction).
+    """
+    regressions = []
+    for metric, value in flatten(metrics).items():
+        rule = _rule_for(metric, thresholds)
+        past = [run["metrics"][metric] for run in history[-BASELINE_RUNS:] if run["metrics"].get(metric) is not None]
+        if rule is None or value is None or not past:
+            continue
+        baseline = float(np.median(past))
+        if rule["better"] == "higher":
+            change = (baseline - value) / baseline if baseline else 0.0
+        else:
+            change = (value - baseline) / baseline if baseline else 0.0
+        if change > rule["tolerance"]:
+            regressions.append({
+                "metric": metric,
+                "value": value,
+                "baseline": round(baseline, 4),
+                "worse_by": round(change, 4),
+                "tolerance": rule["tolerance"],
+            })
+    return regressions
+
+def load_history(path, config):
+    if not path.exists():
+        return []
+    with open(path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    return [run for run in runs if run.get("config") == config]
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clips", type=float, nargs="*", default=[5, 30], help="clip lengths in seconds")
+    parser.add_argument("--whisper-model", default="base")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-only", action="store_true", help="retrieve without the BM25 index")
+    parser.add_argument("--no-rerank", action="store_true", help="send retrieved chunks to the LLM without reranking")
+    parser.add_argument("--quick", action="store_true", help="small sizes for CI smoke runs")
+    parser.add_argument("--history", type=Path, default=Path(__file__).with_name("history.jsonl"))
+    parser.add_argument("--check", action="store_true", help="exit 1 when a metric regresses")
+    args = parser.parse_args()
+    if args.quick:
+        args.pages, args.concurrency, args.queries, args.clips = [1, 10, 100], [1, 8], 50, []
+
+    # Offline providers must be selected before the app modules are imported
+    os.environ["PROVIDERS"] = "local"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+
+    config = {
+        "pages": args.pages,
+        "concurrency": args.concurrency,
+        "queries": args.queries,
+        "clips": args.clips,
+        "whisper_model": args.whisper_model,
+        "llm_latency": args.llm_latency,
+        "llm_tokens_per_second": args.llm_tokens_per_second,
+        "seed": args.seed,
+        "hybrid": not args.vector_only,
+        "rerank": not args.no_rerank,
+    }
+    metrics = run(args)
+
+    history = load_history(args.history, config)
+    with open(THRESHOLDS_PATH) as f:
+        thresholds = json.load(f)
+    regressions = find_regressions(metrics, history, thresholds)
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "metrics": flatten(metrics),
+        "regressions": regressions,
+    }
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    for regression in regressions:
+        print(f"REGRESSION {json.dumps(regression)}")
+    print(f"{len(regressions)} regressions against {min(len(history), BASELINE_RUNS)} previous runs; "
+          f"history written to {args.history}")
+    if args.check and regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
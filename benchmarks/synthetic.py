@@ -0,0 +1,120 @@
+"""
+Synthetic benchmark inputs: text PDFs, query sets and audio clips.
+
+Everything is generated from a seed, so runs on different machines see the
+same documents and questions. The PDF writer is a minimal standalone one
+(Helvetica text, one content stream per page) to avoid a PDF-authoring
+dependency.
+"""
+import io
+import math
+import wave
+import numpy as np
+
+_WORDS = (
+    "the of and to in is that for it as with was on be by this are from at or an which "
+    "system data model process result value analysis method report section table figure "
+    "energy market policy design network signal memory cell protein climate revenue "
+    "contract patient sample voltage orbit archive budget league harvest engine"
+).split()
+
+_TOPICS = (
+    "mitochondria photosynthesis inflation tariffs turbine reactor glacier sediment "
+    "antibody vaccine satellite telescope ledger dividend pipeline compiler kernel "
+    "spectrum isotope enzyme aquifer monsoon tectonics cathedral sonnet symphony"
+).split()
+
+def page_topic(page):
+    return _TOPICS[page % len(_TOPICS)]
+
+def page_lines(page, lines_per_page, rng):
+    """
+    Filler sentences with the page's topic word sprinkled in, so queries
+    about a topic have a small set of relevant pages
+    """
+    topic = page_topic(page)
+    lines = [f"Section {page + 1}: notes on {topic}"]
+    for _ in range(lines_per_page - 1):
+        words = list(rng.choice(_WORDS, size=rng.integers(8, 14)))
+        words.insert(int(rng.integers(0, len(words))), topic)
+        lines.append(" ".join(words).capitalize() + ".")
+    return lines
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(path, pages, lines_per_page=45, seed=0):
+    """
+    Write a text PDF with the given number of US Letter pages
+    """
+    rng = np.random.default_rng(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        text = " T* ".join(f"({_escape(line)}) Tj" for line in page_lines(page, lines_per_page, rng))
+        stream = f"BT /F1 10 Tf 12 TL 50 750 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+    return path
+
+def make_queries(count, seed=0):
+    """
+    Questions about topics that appear in the synthetic PDFs
+    """
+    rng = np.random.default_rng(seed)
+    templates = [
+        "What does the document say about {topic}?",
+        "Summarize the notes on {topic}",
+        "How is {topic} related to the {word} {other}?",
+        "Which section discusses {topic} and {word}?",
+    ]
+    queries = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        queries.append(template.format(
+            topic=rng.choice(_TOPICS), other=rng.choice(_TOPICS), word=rng.choice(_WORDS[20:])
+        ))
+    return queries
+
+def make_clip(seconds, rate=16000, seed=0):
+    """
+    A speech-like WAV clip: a gliding, amplitude-modulated tone with noise
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 40 * np.sin(2 * math.pi * 0.7 * t)
+    envelope = 0.5 + 0.5 * np.sin(2 * math.pi * 3.0 * t) ** 2
+    signal = envelope * np.sin(2 * math.pi * np.cumsum(pitch) / rate) + 0.02 * rng.standard_normal(len(t))
+    samples = (0.3 * signal * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
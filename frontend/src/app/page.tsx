@@ -13,10 +13,14 @@ export default function Home() {
   const [loading, setLoading] = useState(false)
   const [message, setMessage] = useState<{type: 'success' | 'error', text: string} | null>(null)
   const [uploadedPdf, setUploadedPdf] = useState<string | null>(null)
+  // The server keeps every uploaded PDF; questions are scoped to this one
+  const [documentId, setDocumentId] = useState<string | null>(null)
   const [showUploadSection, setShowUploadSection] = useState(true)
   const [messages, setMessages] = useState<Message[]>([])
   const [inputMessage, setInputMessage] = useState('')
   const [isAsking, setIsAsking] = useState(false)
+  // Server-side conversation, so follow-up questions keep their context
+  const [sessionId, setSessionId] = useState(() => crypto.randomUUID())
 
   // Clear success message after 2 seconds
   useEffect(() => {
@@ -37,16 +41,21 @@ export default function Home() {
 
   const handleDelete = async () => {
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/delete-all-documents`, {
+      const url = documentId
+        ? `${process.env.NEXT_PUBLIC_API_URL}/api/documents/${encodeURIComponent(documentId)}`
+        : `${process.env.NEXT_PUBLIC_API_URL}/api/delete-all-documents`
+      const response = await fetch(url, {
         method: 'DELETE',
       })
 
       if (response.ok) {
         setUploadedPdf(null)
+        setDocumentId(null)
         setShowUploadSection(true)
         setMessage({ type: 'success', text: 'PDF deleted successfully!' })
         // Clear chat history when PDF is deleted
         setMessages([])
+        setSessionId(crypto.randomUUID())
         setInputMessage('')
       } else {
         throw new Error('Failed to delete PDF')
@@ -75,14 +84,30 @@ export default function Home() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
-      console.log('Upload response:', data);
+      const queued = await response.json();
+      console.log('Upload response:', queued);
 
-      setMessage({ 
+      // Ingestion runs in the background; poll the job until it finishes
+      let job = queued;
+      while (job.status !== 'succeeded' && job.status !== 'failed') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}${queued.status_url}`);
+        if (!jobResponse.ok) {
+          throw new Error(`HTTP error! status: ${jobResponse.status}`);
+        }
+        job = await jobResponse.json();
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Failed to process PDF');
+      }
+      const data = job.result;
+
+      setMessage({
         type: 'success', 
         text: `PDF processed successfully! Created ${data.chunks} chunks and stored ${data.stored_documents} documents.` 
       });
       setUploadedPdf(file.name);
+      setDocumentId(data.document_id);
       setShowUploadSection(false);
       setFile(null);
       
@@ -117,7 +142,7 @@ export default function Home() {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ text: userMessage }),
+        body: JSON.stringify({ text: userMessage, session_id: sessionId, document_id: documentId }),
       });
 
       const data = await response.json();